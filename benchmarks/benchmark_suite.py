@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Tuple, Callable, Union, Optional
+
+import numpy as np
+
+from data.loaders import BiPartiteDataset
+from factories.cache_factory import PolicyType, get_policy, get_client_cache_connections, \
+    get_client_cache_incidence
+from policies.ftpl_policy import FTPLPolicy
+from policies.lfu_policy import LFUPolicy
+from policies.frequency_buckets import TieBreak
+from policies.network_policies.adaptive_lead_cache import AdaptiveLeadCache
+from policies.network_policies.decentralized.network_adaptive_ftpl import NetworkAdaptiveFTPL
+from policies.network_policies.decentralized.network_ftpl import NetworkFTPL
+from policies.network_policies.decentralized.network_lfu import NetworkLFU
+from policies.network_policies.decentralized.network_lru import NetworkLRU
+from policies.network_policies.lead_cache import LeadCache
+from policies.network_policies.network_policy import NetworkPolicy
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolver, LeadCacheSolverParams, \
+    get_opt_lead_cache
+from policies.policy import Policy
+from simulation.simulation_parameters import SimulationParameters
+from simulation.simulation_runner import SimulationRunner
+from simulation.statistics_collector import SamplingParameters, Sampling
+
+Parameters = Dict[str, Union[int, str]]
+
+"""
+Cheap benchmarks are repeated until they ran this long in total, at most MAX_TIMED_RUNS times, and the
+fastest run counts.
+"""
+MIN_TIMED_SECONDS: float = 0.2
+MAX_TIMED_RUNS: int = 5
+
+"""
+Results are written to this directory by default, it is ignored by git.
+"""
+RESULTS_DIRECTORY: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+"""
+Statistics modes of the runner benchmarks: full series, or log sampled series as for long traces.
+"""
+RUNNER_MODES: Dict[str, Optional[SamplingParameters]] = {
+    "full": None,
+    "sampled": SamplingParameters(Sampling.LOG, points=1000)
+}
+
+
+@dataclass
+class BenchmarkGrid:
+    """
+    Sizes the benchmarks run over. Single cache policies run over every combination of cache size, catalog
+    size and trace length, expert policies also over every expert count. A network size is a
+    (clients, caches, degree) triple.
+    """
+    cache_sizes: List[int]
+    catalog_sizes: List[int]
+    trace_lengths: List[int]
+    expert_counts: List[int]
+    network_sizes: List[Tuple[int, int, int]]
+    network_catalog_size: int
+    network_cache_size: int
+    network_time_horizon: int
+
+    """
+    Network sizes up to which the SLSQP solver is benchmarked, it does not scale to the larger ones.
+    """
+    slsqp_network_size: int
+    solver_repeats: int
+
+
+GRIDS: Dict[str, BenchmarkGrid] = {
+    "quick": BenchmarkGrid(
+        cache_sizes=[10, 100],
+        catalog_sizes=[1_000, 10_000],
+        trace_lengths=[5_000],
+        expert_counts=[2, 8],
+        network_sizes=[(4, 3, 2), (12, 6, 2)],
+        network_catalog_size=50,
+        network_cache_size=5,
+        network_time_horizon=50,
+        slsqp_network_size=4,
+        solver_repeats=1
+    ),
+    "full": BenchmarkGrid(
+        cache_sizes=[10, 100, 1_000],
+        catalog_sizes=[1_000, 10_000, 100_000],
+        trace_lengths=[20_000, 200_000],
+        expert_counts=[2, 8, 32],
+        network_sizes=[(4, 3, 2), (12, 6, 2), (30, 10, 3)],
+        network_catalog_size=200,
+        network_cache_size=10,
+        network_time_horizon=300,
+        slsqp_network_size=12,
+        solver_repeats=5
+    )
+}
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    parameters: Parameters
+
+    """
+    Number of requests served, or of problems solved for solver benchmarks.
+    """
+    operations: int
+    seconds: float
+
+    """
+    Peak memory allocated while building and running the benchmark, in bytes.
+    """
+    peak_memory: int
+
+    @property
+    def key(self) -> str:
+        return f'{self.name} ' + ' '.join(f'{name}={value}' for name, value in sorted(self.parameters.items()))
+
+    @property
+    def operations_per_second(self) -> float:
+        return self.operations / self.seconds if self.seconds > 0 else float('inf')
+
+    @staticmethod
+    def from_dict(result: dict) -> BenchmarkResult:
+        return BenchmarkResult(
+            name=result["name"],
+            parameters=result["parameters"],
+            operations=result["operations"],
+            seconds=result["seconds"],
+            peak_memory=result["peak_memory"]
+        )
+
+
+def get_zipf_trace(catalog_size: int, length: int, rng: np.random.Generator, exponent: float = 0.8) -> np.ndarray:
+    """
+    Draws requests from a Zipf distribution truncated to the catalog, the item i having weight 1 / (i + 1)^exponent.
+
+    :param catalog_size: Catalog size
+    :param length: Number of requests
+    :param rng: Random generator
+    :param exponent: Zipf exponent
+    :return: Requests
+    """
+    weights = 1 / np.arange(1, catalog_size + 1) ** exponent
+    return rng.choice(catalog_size, size=length, p=weights / weights.sum())
+
+
+def measure(name: str, parameters: Parameters, build: Callable[[], Callable[[], int]]) -> BenchmarkResult:
+    """
+    Times a benchmark, then runs it again with tracemalloc to find its peak memory, since tracing slows
+    down allocations. Every run starts from the same random states.
+
+    :param name: Benchmark name
+    :param parameters: Sizes of the benchmark
+    :param build: Builds the benchmark state and returns a function that runs it and returns the number of
+    operations
+    :return: Result
+    """
+    seconds = float('inf')
+    total_seconds = 0.0
+    runs = 0
+    while runs == 0 or (total_seconds < MIN_TIMED_SECONDS and runs < MAX_TIMED_RUNS):
+        _seed_random()
+        run = build()
+        start = time.perf_counter()
+        operations = run()
+        run_seconds = time.perf_counter() - start
+        seconds = min(seconds, run_seconds)
+        total_seconds += run_seconds
+        runs += 1
+
+    _seed_random()
+    tracemalloc.start()
+    try:
+        build()()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = BenchmarkResult(name, parameters, operations, seconds, peak_memory)
+    print(f'{result.key:<72} {result.operations_per_second:>12,.1f}/s {peak_memory / 1e6:>9.2f} MB')
+    return result
+
+
+def _seed_random() -> None:
+    random.seed(0)
+    np.random.seed(0)
+
+
+def _get_single_cache_policies(
+        cache_size: int,
+        catalog_size: int,
+        time_horizon: int,
+        expert_count: int
+) -> Dict[str, Callable[[], Policy]]:
+    discount_rates = list(np.linspace(0.5, 1.0, expert_count))
+    policies = {
+        policy_type: lambda policy_type=policy_type: get_policy(
+            policy_type, cache_size, catalog_size, time_horizon, discount_rates
+        )
+        for policy_type in [PolicyType.LRU, PolicyType.LFU, PolicyType.FTPL, PolicyType.EXPERT_FTPL, PolicyType.IAWM]
+    }
+    policies["LFU, lru ties"] = lambda: LFUPolicy(cache_size, TieBreak.LRU)
+    policies["LFU, random ties"] = lambda: LFUPolicy(cache_size, TieBreak.RANDOM)
+    policies["Perfect LFU"] = lambda: LFUPolicy(cache_size, perfect=True)
+    policies["FTPL, d=0.9"] = lambda: FTPLPolicy(cache_size, catalog_size, time_horizon, 0.9)
+    return policies
+
+
+def run_single_cache_benchmarks(grid: BenchmarkGrid) -> List[BenchmarkResult]:
+    """
+    Serves synthetic traces with run_trace, as the simulation runner does. Expert policies run for every
+    expert count, other policies once per size.
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    for catalog_size in grid.catalog_sizes:
+        for trace_length in grid.trace_lengths:
+            trace = get_zipf_trace(catalog_size, trace_length, rng)
+            for cache_size in filter(lambda size: size < catalog_size, grid.cache_sizes):
+                for index, expert_count in enumerate(grid.expert_counts):
+                    policies = _get_single_cache_policies(cache_size, catalog_size, trace_length, expert_count)
+                    for name, get_single_policy in policies.items():
+                        is_expert_policy = name in PolicyType.EXPERTS
+                        if not is_expert_policy and index > 0:
+                            continue
+
+                        parameters = {
+                            "cache size": cache_size,
+                            "catalog size": catalog_size,
+                            "trace length": trace_length
+                        }
+                        if is_expert_policy:
+                            parameters["experts"] = expert_count
+
+                        def build(get_single_policy=get_single_policy) -> Callable[[], int]:
+                            policy = get_single_policy()
+                            return lambda: policy.run_trace(trace).size
+
+                        results.append(measure(name, parameters, build))
+    return results
+
+
+def run_runner_benchmarks(grid: BenchmarkGrid) -> List[BenchmarkResult]:
+    """
+    Runs single cache policies through SimulationRunner.run_simulations, which also tracks the optimal static
+    configuration and the regret, once for every statistics mode. Expert policies run with the smallest
+    expert count.
+    """
+    results = []
+    rng = np.random.default_rng(3)
+    runner = SimulationRunner()
+    for catalog_size in grid.catalog_sizes:
+        for trace_length in grid.trace_lengths:
+            trace = get_zipf_trace(catalog_size, trace_length, rng)
+            for cache_size in filter(lambda size: size < catalog_size, grid.cache_sizes):
+                expert_count = grid.expert_counts[0]
+                policies = _get_single_cache_policies(cache_size, catalog_size, trace_length, expert_count)
+                for name, get_single_policy in policies.items():
+                    for mode, sampling in RUNNER_MODES.items():
+                        parameters = {
+                            "cache size": cache_size,
+                            "catalog size": catalog_size,
+                            "trace length": trace_length,
+                            "statistics": mode
+                        }
+                        if name in PolicyType.EXPERTS:
+                            parameters["experts"] = expert_count
+
+                        def build(get_single_policy=get_single_policy, sampling=sampling) -> Callable[[], int]:
+                            simulation = SimulationParameters(trace, [get_single_policy()], sampling=sampling)
+
+                            def run() -> int:
+                                runner.run_simulations(simulation)
+                                return trace.size
+                            return run
+
+                        results.append(measure(f'runner: {name}', parameters, build))
+    return results
+
+
+def _get_network_policies(
+        grid: BenchmarkGrid,
+        connections: List[List[int]],
+        caches: int,
+        degree: int
+) -> Dict[str, Callable[[], NetworkPolicy]]:
+    catalog_size, cache_size = grid.network_catalog_size, grid.network_cache_size
+    time_horizon = grid.network_time_horizon
+    discount_rates = [0.9, 0.99, 1.0]
+    return {
+        "Network LRU": lambda: NetworkLRU(caches, connections, catalog_size, cache_size),
+        "Network LFU": lambda: NetworkLFU(caches, connections, catalog_size, cache_size),
+        "Network FTPL": lambda: NetworkFTPL(caches, connections, catalog_size, cache_size, time_horizon),
+        "Network Adaptive FTPL": lambda: NetworkAdaptiveFTPL(
+            caches, connections, catalog_size, cache_size, discount_rates, time_horizon
+        ),
+        "LeadCache": lambda: LeadCache(
+            caches, connections, catalog_size, degree, cache_size, LeadCacheSolver.LINEAR_PROGRAM
+        ),
+        "Adaptive LeadCache": lambda: AdaptiveLeadCache(
+            caches, connections, catalog_size, degree, cache_size, discount_rates, time_horizon,
+            LeadCacheSolver.LINEAR_PROGRAM
+        )
+    }
+
+
+def run_network_benchmarks(grid: BenchmarkGrid) -> List[BenchmarkResult]:
+    """
+    Serves one synthetic trace per client through SimulationRunner.run_bipartite_simulations, which also records
+    the rewards and the optimal static configurations of the caches, once for every statistics mode.
+    LeadCache policies use the linear program.
+    """
+    results = []
+    rng = np.random.default_rng(1)
+    runner = SimulationRunner()
+    for clients, caches, degree in grid.network_sizes:
+        _seed_random()
+        connections = get_client_cache_connections(clients, caches, degree)
+        dataset = BiPartiteDataset(
+            catalog_size=grid.network_catalog_size,
+            name="zipf",
+            traces=np.array([
+                get_zipf_trace(grid.network_catalog_size, grid.network_time_horizon, rng) for _ in range(clients)
+            ])
+        )
+        for name, get_network_policy in _get_network_policies(grid, connections, caches, degree).items():
+            for mode, sampling in RUNNER_MODES.items():
+                def build(get_network_policy=get_network_policy, sampling=sampling) -> Callable[[], int]:
+                    policy = get_network_policy()
+
+                    def run() -> int:
+                        runner.run_bipartite_simulations([policy], dataset, sampling)
+                        return dataset.traces.size
+                    return run
+
+                parameters = {
+                    "clients": clients,
+                    "caches": caches,
+                    "degree": degree,
+                    "time horizon": dataset.traces.shape[1],
+                    "statistics": mode
+                }
+                results.append(measure(name, parameters, build))
+    return results
+
+
+def run_solver_benchmarks(grid: BenchmarkGrid) -> List[BenchmarkResult]:
+    """
+    Solves and rounds the LeadCache relaxation for perturbed counts of synthetic traces, with every solver.
+    """
+    results = []
+    rng = np.random.default_rng(2)
+    for clients, caches, degree in grid.network_sizes:
+        _seed_random()
+        incidence = get_client_cache_incidence(clients, caches, degree)
+        counts = np.array([
+            np.bincount(
+                get_zipf_trace(grid.network_catalog_size, grid.network_time_horizon, rng),
+                minlength=grid.network_catalog_size
+            )
+            for _ in range(clients)
+        ])
+        theta = counts + rng.normal(scale=np.sqrt(grid.network_time_horizon), size=counts.shape)
+        for solver in [LeadCacheSolver.LINEAR_PROGRAM, LeadCacheSolver.SLSQP]:
+            if solver == LeadCacheSolver.SLSQP and clients > grid.slsqp_network_size:
+                continue
+
+            params = LeadCacheSolverParams(
+                theta=theta,
+                incidence=incidence,
+                cache_size=grid.network_cache_size,
+                catalog_size=grid.network_catalog_size,
+                cache_count=caches,
+                solver=solver
+            )
+
+            def build(params=params) -> Callable[[], int]:
+                def run() -> int:
+                    for _ in range(grid.solver_repeats):
+                        get_opt_lead_cache(params)
+                    return grid.solver_repeats
+                return run
+
+            parameters = {
+                "clients": clients,
+                "caches": caches,
+                "degree": degree,
+                "catalog size": grid.network_catalog_size,
+                "solver": solver
+            }
+            results.append(measure("get_opt_lead_cache", parameters, build))
+    return results
+
+
+def compare_results(
+        results: List[BenchmarkResult],
+        baseline: List[BenchmarkResult],
+        tolerance: float = 0.25
+) -> List[str]:
+    """
+    Compares results with a baseline run of the same benchmarks. Benchmarks missing from either are skipped.
+
+    :param results: Current results
+    :param baseline: Baseline results
+    :param tolerance: Relative slowdown or memory growth that is still accepted
+    :return: A message for every benchmark that is slower or uses more memory than the tolerance allows
+    """
+    baseline_results = {result.key: result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(result.key)
+        if reference is None:
+            continue
+        if result.operations_per_second < reference.operations_per_second * (1 - tolerance):
+            regressions.append(
+                f'{result.key}: {result.operations_per_second:,.1f}/s, '
+                f'baseline {reference.operations_per_second:,.1f}/s'
+            )
+        if result.peak_memory > reference.peak_memory * (1 + tolerance):
+            regressions.append(
+                f'{result.key}: {result.peak_memory / 1e6:.2f} MB, baseline {reference.peak_memory / 1e6:.2f} MB'
+            )
+    return regressions
+
+
+def save_results(results: List[BenchmarkResult], grid_name: str, file_path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w') as f:
+        json.dump({
+            "grid": grid_name,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "results": [
+                dict(asdict(result), operations_per_second=result.operations_per_second)
+                for result in results
+            ]
+        }, f, indent=2)
+
+
+def load_results(file_path: str) -> List[BenchmarkResult]:
+    with open(file_path) as f:
+        return list(map(BenchmarkResult.from_dict, json.load(f)["results"]))
+
+
+def run_benchmarks(grid: BenchmarkGrid, suites: Optional[List[str]] = None) -> List[BenchmarkResult]:
+    """
+    :param grid: Sizes to benchmark
+    :param suites: Any of "single", "runner", "network" and "solver", all if not set
+    :return: Results of every benchmark
+    """
+    runs = {
+        "single": run_single_cache_benchmarks,
+        "runner": run_runner_benchmarks,
+        "network": run_network_benchmarks,
+        "solver": run_solver_benchmarks
+    }
+    return [result for suite in (suites or list(runs)) for result in runs[suite](grid)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks policies, network policies and the LeadCache solver.")
+    parser.add_argument('--grid', choices=list(GRIDS), default="quick")
+    parser.add_argument('--suite', choices=["single", "runner", "network", "solver"], action='append')
+    parser.add_argument(
+        '--output',
+        default=os.path.join(RESULTS_DIRECTORY, "benchmark_results.json"),
+        help="File the results are written to"
+    )
+    parser.add_argument('--baseline', help="Results of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Accepted relative slowdown or memory growth")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(GRIDS[arguments.grid], arguments.suite)
+    save_results(results, arguments.grid, arguments.output)
+    if arguments.baseline is None:
+        return 0
+
+    regressions = compare_results(results, load_results(arguments.baseline), arguments.tolerance)
+    for regression in regressions:
+        print(f'regression: {regression}')
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import time
+from typing import List
+
+import numpy as np
+
+from policies.lru_policy import LRUPolicy
+
+
+def get_requests_per_second(cache_size: int, trace: np.ndarray) -> float:
+    """
+    Measures how many requests per second LRU serves with the simulation's is_present + update protocol.
+    The cache is filled with the items 0, ..., cache_size - 1 before timing, so that misses evict even
+    when the trace is shorter than the cache.
+
+    :param cache_size: Cache size
+    :param trace: Requests
+    :return: Requests per second
+    """
+    policy = LRUPolicy(cache_size)
+    for request in range(cache_size):
+        policy.update(request)
+    start = time.perf_counter()
+    for request in trace:
+        policy.is_present(request)
+        policy.update(request)
+    return trace.size / (time.perf_counter() - start)
+
+
+def run_lru_benchmark(
+        cache_sizes: List[int] = (10, 100, 1_000, 10_000, 100_000, 1_000_000),
+        trace_length: int = 200_000,
+        catalog_factor: int = 4,
+        seed: int = 0
+) -> None:
+    """
+    Prints LRU requests per second against the cache size, on uniform traces over a catalog that is
+    catalog_factor times the cache size. The cache starts full, so that most requests cause an eviction.
+    """
+    rng = np.random.default_rng(seed)
+    for cache_size in cache_sizes:
+        trace = rng.integers(0, cache_size * catalog_factor, size=trace_length)
+        print(f'cache size {cache_size:>9}: {get_requests_per_second(cache_size, trace):>12,.0f} requests/s')
+
+
+if __name__ == '__main__':
+    run_lru_benchmark()
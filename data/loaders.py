@@ -1,12 +1,15 @@
+import os
 import pickle
+import tempfile
 from dataclasses import dataclass
-from typing import List
+from typing import List, Iterator, Dict, Callable, Tuple
 
 
 import numpy as np
 import pandas as pd
 
 from data.path import DataPath
+from data.trace_format import get_source_hash, open_trace, read_trace_header, write_trace
 
 
 @dataclass
@@ -31,6 +34,34 @@ class BiPartiteDataset(AbstractDataset):
     traces: np.ndarray
 
 
+def _open_prepared(file_path: str) -> AbstractDataset:
+    header, trace = open_trace(file_path)
+    if trace.ndim == 1:
+        return Dataset(catalog_size=header.catalog_size, name=header.name, trace=trace)
+    return BiPartiteDataset(catalog_size=header.catalog_size, name=header.name, traces=trace)
+
+
+def _load_prepared(file_path: str, source_hash: str, load: Callable[[], AbstractDataset]) -> AbstractDataset:
+    """
+    Memory maps the prepared trace, preparing it with the loader first if it is missing or out of date.
+
+    :param file_path: Prepared trace file
+    :param source_hash: Hash of the sources the trace is derived from
+    :param load: Loads the dataset from its sources
+    :return: Dataset backed by the prepared trace
+    """
+    if not os.path.exists(file_path) or read_trace_header(file_path)[0].source_hash != source_hash:
+        dataset = load()
+        write_trace(
+            file_path,
+            dataset.trace if isinstance(dataset, Dataset) else dataset.traces,
+            dataset.name,
+            dataset.catalog_size,
+            source_hash
+        )
+    return _open_prepared(file_path)
+
+
 class MovielensColumns:
     movie_id: str = "movieId"
     timestamp: str = "timestamp"
@@ -38,29 +69,182 @@ class MovielensColumns:
     id: str = "id"
 
 
+MOVIELENS_CHUNK_SIZE: int = 1_000_000
+
+
 def with_compressed_ids(df: pd.DataFrame):
     df[MovielensColumns.id] = pd.factorize(df[MovielensColumns.movie_id])[0]
     return df
 
 
-def load_movielens(file_path: str, catalog_size: int, trace_length: int) -> Dataset:
-    df = with_compressed_ids(
-        pd.read_csv(
-            file_path,
-            usecols=[MovielensColumns.timestamp, MovielensColumns.movie_id]
+def _read_movielens_chunks(file_path: str, catalog_size: int, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Reads the ratings in file order, compressing movie IDs to 0, 1, ... in order of first appearance,
+    which matches with_compressed_ids on the whole file. Ratings of movies with compressed IDs of at
+    least catalog_size are filtered out, so only catalog_size movie IDs are ever kept in memory.
+    """
+    compressed_ids: Dict[int, int] = dict()
+    with pd.read_csv(
+        file_path,
+        usecols=[MovielensColumns.timestamp, MovielensColumns.movie_id],
+        dtype={MovielensColumns.timestamp: np.int64, MovielensColumns.movie_id: np.int64},
+        chunksize=chunk_size
+    ) as reader:
+        for chunk in reader:
+            codes, movie_ids = pd.factorize(chunk[MovielensColumns.movie_id])
+            for movie_id in movie_ids:
+                if len(compressed_ids) == catalog_size:
+                    break
+                compressed_ids.setdefault(movie_id, len(compressed_ids))
+            chunk_ids = np.array([compressed_ids.get(movie_id, catalog_size) for movie_id in movie_ids])[codes]
+            chunk = chunk.assign(**{MovielensColumns.id: chunk_ids})
+            yield chunk[chunk[MovielensColumns.id] < catalog_size]
+
+
+def _write_sorted_run(directory: str, index: int, chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorts the ratings of a chunk by timestamp, keeping ties in file order, and writes them to the directory.
+
+    :return: Memory mapped timestamps and compressed movie IDs of the run
+    """
+    chunk = chunk.sort_values(by=MovielensColumns.timestamp, ascending=True, kind="stable")
+    run = []
+    for column in [MovielensColumns.timestamp, MovielensColumns.id]:
+        run_path = os.path.join(directory, f'{column}_{index}.npy')
+        np.save(run_path, chunk[column].to_numpy())
+        run.append(np.load(run_path, mmap_mode='r'))
+    return run[0], run[1]
+
+
+def _merge_sorted_runs(runs: List[Tuple[np.ndarray, np.ndarray]], block_size: int) -> Iterator[np.ndarray]:
+    """
+    Merges runs that are sorted by timestamp into the order of a stable sort of their concatenation,
+    reading about block_size ratings of every run at a time. Every step emits the ratings that are earlier
+    than the smallest last timestamp of the blocks, or the ratings at that timestamp in run order if there
+    are none.
+
+    :param runs: Timestamps and compressed movie IDs of every run, runs in file order
+    :param block_size: Number of ratings of every run to look at in a step
+    :return: Iterator over arrays of compressed movie IDs
+    """
+    positions = [0] * len(runs)
+    while any(position < timestamps.size for position, (timestamps, _) in zip(positions, runs)):
+        block_ends = [min(position + block_size, timestamps.size) for position, (timestamps, _) in zip(positions, runs)]
+        bounds = [
+            timestamps[block_end - 1]
+            for block_end, (timestamps, _) in zip(block_ends, runs)
+            if block_end < timestamps.size
+        ]
+        threshold = min(bounds) if len(bounds) > 0 else None
+        ends = [
+            block_end if threshold is None
+            else position + int(np.searchsorted(timestamps[position:block_end], threshold, side='left'))
+            for position, block_end, (timestamps, _) in zip(positions, block_ends, runs)
+        ]
+        if ends == positions:
+            ends = [
+                position + int(np.searchsorted(timestamps[position:], threshold, side='right'))
+                for position, (timestamps, _) in zip(positions, runs)
+            ]
+
+        timestamps = np.concatenate([run[0][position:end] for position, end, run in zip(positions, ends, runs)])
+        ids = np.concatenate([run[1][position:end] for position, end, run in zip(positions, ends, runs)])
+        positions = ends
+        yield ids[np.argsort(timestamps, kind="stable")]
+
+
+def stream_movielens(
+        file_path: str,
+        catalog_size: int,
+        trace_length: int,
+        chunk_size: int = MOVIELENS_CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    """
+    Streams the trace of load_movielens with the same arguments without materializing it. The first
+    trace_length requests are sorted by timestamp chunk by chunk into temporary files, which are then
+    merged, so that memory is bounded by the chunk size instead of the trace length.
+
+    :param file_path: Path to the MovieLens ratings file
+    :param catalog_size: Number of distinct movies to keep
+    :param trace_length: Number of requests
+    :param chunk_size: Number of rows read at once
+    :return: Iterator over arrays of compressed movie IDs, in timestamp order
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        runs: List[Tuple[np.ndarray, np.ndarray]] = []
+        remaining = trace_length
+        for chunk in _read_movielens_chunks(file_path, catalog_size, chunk_size):
+            chunk = chunk.head(remaining)
+            remaining -= chunk.shape[0]
+            if chunk.shape[0] > 0:
+                runs.append(_write_sorted_run(directory, len(runs), chunk))
+            if remaining == 0:
+                break
+
+        for requests in _merge_sorted_runs(runs, max(chunk_size // max(len(runs), 1), 1)):
+            if requests.size > 0:
+                yield requests
+
+
+def load_movielens(
+        file_path: str,
+        catalog_size: int,
+        trace_length: int,
+        chunk_size: int = MOVIELENS_CHUNK_SIZE,
+        prepared: bool = False
+) -> Dataset:
+    """
+    Loads the first trace_length ratings of the movies with the catalog_size first compressed IDs,
+    sorted by timestamp.
+
+    :param file_path: Path to the MovieLens ratings file
+    :param catalog_size: Number of distinct movies to keep
+    :param trace_length: Number of requests
+    :param chunk_size: Number of rows read at once
+    :param prepared: If set, the trace is written to DataPath.get_prepared once and memory mapped from there.
+    The trace is then a read-only array of the narrowest unsigned type that fits the IDs, e.g. uint16,
+    instead of an int64 array
+    :return: Dataset
+    """
+    if prepared:
+        return _load_prepared(
+            DataPath.get_prepared(file_path, f'_{catalog_size}_{trace_length}'),
+            get_source_hash([file_path], catalog_size=catalog_size, trace_length=trace_length),
+            lambda: load_movielens(file_path, catalog_size, trace_length, chunk_size, prepared=False)
         )
-    )
-    df = df[df[MovielensColumns.id] < catalog_size].head(trace_length)
-    df.sort_values(by=MovielensColumns.timestamp, ascending=True)
-    assert df.shape[0] == trace_length, "Too many movies filtered out, provided trace length was not achieved."
+
+    chunks: List[pd.DataFrame] = []
+    remaining = trace_length
+    for chunk in _read_movielens_chunks(file_path, catalog_size, chunk_size):
+        chunks.append(chunk.head(remaining))
+        remaining -= chunks[-1].shape[0]
+        if remaining == 0:
+            break
+
+    assert remaining == 0, "Too many movies filtered out, provided trace length was not achieved."
+    df = pd.concat(chunks).sort_values(by=MovielensColumns.timestamp, ascending=True, kind="stable")
     return Dataset(
-        catalog_size=df[MovielensColumns.id].max(),
+        catalog_size=df[MovielensColumns.id].max() + 1,
         trace=df[MovielensColumns.id].to_numpy(),
         name=f'MovieLens {trace_length}'
     )
 
 
-def load_online_cache_trace(file_name: str) -> Dataset:
+def load_online_cache_trace(file_name: str, prepared: bool = False) -> Dataset:
+    """
+    :param file_name: Pickled trace
+    :param prepared: If set, the trace is written to DataPath.get_prepared once and memory mapped from there.
+    The trace is then a read-only array of the narrowest unsigned type that fits the IDs, instead of the
+    pickled array
+    :return: Dataset
+    """
+    if prepared:
+        return _load_prepared(
+            DataPath.get_prepared(file_name),
+            get_source_hash([file_name]),
+            lambda: load_online_cache_trace(file_name, prepared=False)
+        )
+
     with open(file_name, 'rb') as f:
         trace = pickle.load(f)
         return Dataset(
@@ -70,16 +254,29 @@ def load_online_cache_trace(file_name: str) -> Dataset:
         )
 
 
-def load_bipartite_traces() -> BiPartiteDataset:
+def load_bipartite_traces(prepared: bool = False) -> BiPartiteDataset:
+    """
+    :param prepared: If set, the traces are written to DataPath.get_prepared once and memory mapped from
+    there. The traces are then a read-only array of the narrowest unsigned type that fits the IDs
+    :return: Traces of the synthetic and MovieLens clients
+    """
+    synthetic_paths = [
+        DataPath.OSCILLATOR,
+        DataPath.SN_OSCILLATOR,
+        DataPath.CHANGING_OSCILLATOR,
+        DataPath.CHANGING_POPULARITY_CATALOG,
+        DataPath.FIXED_POPULARITY_CATALOG,
+    ]
+    if prepared:
+        return _load_prepared(
+            DataPath.get_prepared("bipartite"),
+            get_source_hash(synthetic_paths + [DataPath.MOVIE_LENS]),
+            lambda: load_bipartite_traces(prepared=False)
+        )
+
     synthetic_datasets: List[Dataset] = list(map(
         lambda file_name: load_online_cache_trace(file_name),
-        [
-            DataPath.OSCILLATOR,
-            DataPath.SN_OSCILLATOR,
-            DataPath.CHANGING_OSCILLATOR,
-            DataPath.CHANGING_POPULARITY_CATALOG,
-            DataPath.FIXED_POPULARITY_CATALOG,
-        ]
+        synthetic_paths
     ))
     catalog_size = min(synthetic_datasets, key=lambda ds: ds.catalog_size).catalog_size
     for dataset in synthetic_datasets:
@@ -1,5 +1,9 @@
+import os
+
+
 class DataPath:
     _shared_path = "./data/raw_data/"
+    _prepared_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prepared", "")
     MOVIE_LENS = f'{_shared_path}ml_25m.csv'
     CHANGING_OSCILLATOR = f'{_shared_path}changing_oscillator.pkl'
     OSCILLATOR = f'{_shared_path}oscillator.pkl'
@@ -7,3 +11,10 @@ class DataPath:
     FIXED_POPULARITY_CATALOG = f'{_shared_path}fixed_popularity_catalog.pkl'
     PSN_CATALOG = f'{_shared_path}PSN_catalog_100.pkl'
     SN_OSCILLATOR = f'{_shared_path}SN_oscillator.pkl'
+
+    @staticmethod
+    def get_prepared(source_path: str, suffix: str = "") -> str:
+        """
+        Gets the path of the prepared binary trace derived from a source file.
+        """
+        return f'{DataPath._prepared_path}{os.path.splitext(os.path.basename(source_path))[0]}{suffix}.trace'
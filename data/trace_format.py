@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import List, Tuple
+
+import numpy as np
+
+
+MAGIC: bytes = b'CSTRACE1'
+HEADER_ALIGNMENT: int = 64
+
+
+@dataclass
+class TraceHeader:
+    """
+    Header of a prepared trace file. The file starts with MAGIC, the header length as a little-endian
+    uint32 and the header as JSON, padded to HEADER_ALIGNMENT bytes. The raw array follows.
+    """
+    name: str
+    catalog_size: int
+    dtype: str
+    shape: List[int]
+    source_hash: str
+
+
+def get_narrowest_dtype(max_value: int) -> np.dtype:
+    """
+    Gets the narrowest little-endian unsigned integer type that can hold the value.
+
+    :param max_value: Largest value to store
+    :return: Data type
+    """
+    for dtype in [np.uint8, np.uint16, np.uint32, np.uint64]:
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype).newbyteorder('<')
+    raise ValueError(f'{max_value} does not fit in an unsigned 64 bit integer')
+
+
+def get_source_hash(file_paths: List[str], **parameters) -> str:
+    """
+    Gets a hash that changes whenever a source file or a loading parameter changes. Files are identified
+    by their path, size and modification time, so that checking the hash does not read them.
+
+    :param file_paths: Source files the trace is derived from
+    :param parameters: Loading parameters the trace depends on
+    :return: Source hash
+    """
+    sources = [
+        [file_path, os.stat(file_path).st_size, os.stat(file_path).st_mtime_ns]
+        for file_path in file_paths
+    ]
+    description = json.dumps([sources, sorted(parameters.items())], default=str)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def write_trace(file_path: str, trace: np.ndarray, name: str, catalog_size: int, source_hash: str) -> None:
+    """
+    Writes the trace in the prepared format with the narrowest type that fits its IDs.
+
+    :param file_path: Prepared trace file
+    :param trace: Trace of non-negative IDs, 1 x T or clients x T
+    :param name: Dataset name
+    :param catalog_size: Catalog size
+    :param source_hash: Hash of the sources, see get_source_hash
+    :return: None
+    """
+    assert trace.size == 0 or trace.min() >= 0, "Only non-negative IDs can be prepared."
+    dtype = get_narrowest_dtype(max(int(trace.max(initial=0)), int(catalog_size) - 1))
+    header = json.dumps(asdict(TraceHeader(
+        name=name,
+        catalog_size=int(catalog_size),
+        dtype=dtype.str,
+        shape=list(trace.shape),
+        source_hash=source_hash
+    ))).encode()
+    header_size = len(MAGIC) + 4 + len(header)
+    header += b' ' * (-header_size % HEADER_ALIGNMENT)
+
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    temporary_path = f'{file_path}.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header)).astype('<u4').tobytes())
+        f.write(header)
+        f.write(np.ascontiguousarray(trace, dtype=dtype).tobytes())
+    os.replace(temporary_path, file_path)
+
+
+def read_trace_header(file_path: str) -> Tuple[TraceHeader, int]:
+    """
+    Reads the header of a prepared trace.
+
+    :param file_path: Prepared trace file
+    :return: Header and the offset of the array in the file
+    """
+    with open(file_path, 'rb') as f:
+        assert f.read(len(MAGIC)) == MAGIC, f'{file_path} is not a prepared trace.'
+        header_length = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        header = TraceHeader(**json.loads(f.read(header_length)))
+    return header, len(MAGIC) + 4 + header_length
+
+
+def open_trace(file_path: str) -> Tuple[TraceHeader, np.ndarray]:
+    """
+    Memory maps a prepared trace read-only, pages are only read when they are accessed.
+
+    :param file_path: Prepared trace file
+    :return: Header and trace
+    """
+    header, offset = read_trace_header(file_path)
+    if int(np.prod(header.shape)) == 0:
+        return header, np.zeros(header.shape, dtype=header.dtype)
+    return header, np.memmap(file_path, dtype=header.dtype, mode='r', offset=offset, shape=tuple(header.shape))
@@ -1,9 +1,57 @@
 import random
-from typing import List
+from typing import List, Optional
 
+from policies.expert_policies.expert_bank import ExpertBank
 from policies.expert_policies.ftpl_policy import ExpertFTPLPolicy
 from policies.expert_policies.iawm_policy import IAWMPolicy
 from policies.ftpl_policy import FTPLPolicy
+from policies.lfu_policy import LFUPolicy
+from policies.lru_policy import LRUPolicy
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence
+from policies.policy import Policy
+
+
+class PolicyType:
+    LRU: str = "LRU"
+    LFU: str = "LFU"
+    FTPL: str = "FTPL"
+    EXPERT_FTPL: str = "Expert FTPL"
+    IAWM: str = "IAWM+FTPL"
+
+    """
+    Policy types that combine multiple FTPL experts, one per discount rate.
+    """
+    EXPERTS: List[str] = [EXPERT_FTPL, IAWM]
+
+
+def get_policy(
+        policy_type: str,
+        cache_size: int,
+        catalog_size: int,
+        time_horizon: int,
+        discount_rates: List[float]
+) -> Policy:
+    """
+    Gets a single cache policy by its type.
+
+    :param policy_type: One of the PolicyType values
+    :param cache_size: Cache size
+    :param catalog_size: Catalog size
+    :param time_horizon: Number of requests the policy will serve
+    :param discount_rates: Discount rates of the experts, ignored by non-expert policies
+    :return: The policy
+    """
+    if policy_type == PolicyType.LRU:
+        return LRUPolicy(cache_size)
+    if policy_type == PolicyType.LFU:
+        return LFUPolicy(cache_size)
+    if policy_type == PolicyType.FTPL:
+        return FTPLPolicy(cache_size, catalog_size, time_horizon)
+    if policy_type == PolicyType.EXPERT_FTPL:
+        return get_expert_ftpl_policy(cache_size, catalog_size, time_horizon, list(discount_rates))
+    if policy_type == PolicyType.IAWM:
+        return get_expert_iawm_policy(cache_size, catalog_size, time_horizon, list(discount_rates))
+    raise ValueError(f'Unknown policy type {policy_type}')
 
 
 def get_expert_ftpl_policy(
@@ -14,7 +62,7 @@ def get_expert_ftpl_policy(
 ) -> ExpertFTPLPolicy:
     return ExpertFTPLPolicy(
         cache_size,
-        get_ftpl_policies(cache_size, catalog_size, time_horizon, discount_rates)
+        get_expert_bank(cache_size, catalog_size, time_horizon, discount_rates)
     )
 
 
@@ -22,23 +70,28 @@ def get_expert_iawm_policy(
         cache_size: int,
         catalog_size: int,
         time_horizon: int,
-        discount_rates: List[float]
+        discount_rates: List[float],
+        seed: Optional[int] = None
 ) -> IAWMPolicy:
     return IAWMPolicy(
         cache_size,
-        get_ftpl_policies(cache_size, catalog_size, time_horizon, discount_rates)
+        get_expert_bank(cache_size, catalog_size, time_horizon, discount_rates),
+        seed
     )
 
 
-def get_ftpl_policies(
+def get_expert_bank(
         cache_size: int,
         catalog_size: int,
         time_horizon: int,
         discount_rates: List[float]
-) -> List[FTPLPolicy]:
+) -> ExpertBank:
+    """
+    Gets FTPL experts, one per discount rate. An expert without discounting is always included.
+    """
     if 1.0 not in discount_rates:
         discount_rates.append(1.0)
-    return list(map(lambda d: FTPLPolicy(cache_size, catalog_size, time_horizon, discount_rate=d), discount_rates))
+    return ExpertBank(cache_size, catalog_size, time_horizon, discount_rates)
 
 
 def get_client_cache_connections(clients: int, caches: int, d_regular_degree: int) -> List[List[int]]:
@@ -56,3 +109,16 @@ def get_client_cache_connections(clients: int, caches: int, d_regular_degree: in
         for client in random.sample(clients, k=d_regular_degree):
             connections[client].append(cache)
     return connections
+
+
+def get_client_cache_incidence(clients: int, caches: int, d_regular_degree: int) -> ClientCacheIncidence:
+    """
+    Gets the incidence of client cache connections where every cache has d connections, which can be
+    shared by the network policies.
+
+    :param clients: Number of clients
+    :param caches: Number of caches
+    :param d_regular_degree: Number of connections per cache
+    :return: Client - cache incidence
+    """
+    return ClientCacheIncidence.from_connections(get_client_cache_connections(clients, caches, d_regular_degree), caches)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import Dict, List, Iterator, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class CacheStore:
+    """
+    Fixed capacity cache of integer items. Items live in a typed slot array, a map from item to slot
+    makes lookups, insertions and evictions O(1) and a stack keeps track of the free slots.
+    Iterating over the store yields the cached items, and size is the capacity, like for the object
+    arrays that were used before. Unlike for those arrays, len is the number of cached items and not
+    the capacity.
+    """
+
+    EMPTY: int = -1
+
+    """
+    Slot array, EMPTY elements represent free slots.
+    """
+    slots: np.ndarray
+
+    """
+    Maps a cached item to its slot.
+    """
+    _slot_index: Dict[int, int]
+
+    """
+    Free slots, the lowest one on top.
+    """
+    _free_slots: List[int]
+
+    """
+    Net changes since they were last taken, True for inserted and False for evicted items.
+    None while changes are not tracked.
+    """
+    _changes: Optional[Dict[int, bool]]
+
+    def __init__(self, capacity: int):
+        self.slots = np.full(capacity, CacheStore.EMPTY, dtype=np.int64)
+        self._slot_index = dict()
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self._changes = None
+
+    @staticmethod
+    def from_items(capacity: int, items: Iterable[int]) -> CacheStore:
+        store = CacheStore(capacity)
+        store.assign(items)
+        return store
+
+    @property
+    def size(self) -> int:
+        return self.slots.size
+
+    def __contains__(self, item) -> bool:
+        return item in self._slot_index
+
+    def __len__(self) -> int:
+        return len(self._slot_index)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._slot_index)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.get_items() if dtype is None else self.get_items().astype(dtype)
+
+    def get_items(self) -> np.ndarray:
+        return self.slots[self.slots != CacheStore.EMPTY]
+
+    def is_full(self) -> bool:
+        return len(self._free_slots) == 0
+
+    def insert(self, item: int) -> int:
+        """
+        Inserts an item that is not cached yet into a free slot.
+
+        :param item: Item to insert
+        :return: Slot of the item
+        """
+        assert not self.is_full()
+        item = int(item)
+        assert item not in self._slot_index
+        slot = self._free_slots.pop()
+        self.slots[slot] = item
+        self._slot_index[item] = slot
+        if self._changes is not None:
+            self._record_change(item, True)
+        return slot
+
+    def evict(self, item: int) -> int:
+        """
+        Evicts a cached item.
+
+        :param item: Item to evict
+        :return: The freed slot
+        """
+        item = int(item)
+        slot = self._slot_index.pop(item)
+        self.slots[slot] = CacheStore.EMPTY
+        self._free_slots.append(slot)
+        if self._changes is not None:
+            self._record_change(item, False)
+        return slot
+
+    def assign(self, items: Iterable[int]) -> None:
+        """
+        Replaces the contents of the cache with the given distinct items.
+
+        :param items: Items to cache, at most the capacity
+        :return: None
+        """
+        items = np.asarray(items, dtype=np.int64)
+        assert items.size <= self.size
+        if self._changes is not None:
+            previous_items = set(self._slot_index)
+            new_items = set(items.tolist())
+            for item in previous_items - new_items:
+                self._record_change(item, False)
+            for item in new_items - previous_items:
+                self._record_change(item, True)
+        self.slots[:items.size] = items
+        self.slots[items.size:] = CacheStore.EMPTY
+        self._slot_index = dict(zip(items.tolist(), range(items.size)))
+        self._free_slots = list(range(self.size - 1, items.size - 1, -1))
+
+    def clear(self) -> None:
+        self.assign([])
+
+    def track_changes(self) -> None:
+        """
+        Starts recording insertions and evictions, forgetting earlier ones.
+
+        :return: None
+        """
+        self._changes = dict()
+
+    def pop_changes(self) -> Tuple[List[int], List[int]]:
+        """
+        Takes the net changes since tracking started or since they were last taken. An item that was
+        evicted and inserted again in between is not reported.
+
+        :return: Inserted and evicted items
+        """
+        assert self._changes is not None, "Changes are not tracked."
+        changes, self._changes = self._changes, dict()
+        return [item for item, inserted in changes.items() if inserted], \
+            [item for item, inserted in changes.items() if not inserted]
+
+    def _record_change(self, item: int, inserted: bool) -> None:
+        if self._changes.get(item) == (not inserted):
+            del self._changes[item]
+        else:
+            self._changes[item] = inserted
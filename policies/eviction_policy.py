@@ -1,5 +1,3 @@
-import numpy as np
-
 from policies.policy import Policy
 
 
@@ -30,15 +28,14 @@ class EvictionPolicy(Policy):
     """
     def evict_item(self) -> int:
         victim = self.get_victim()
-        self.cache[np.where(self.cache == victim)] = None
+        self.cache.evict(victim)
         return victim
 
     """
     Adds an item to a cache, assumes that the cache is not full.
     """
     def add_file(self, file: int) -> None:
-        assert not self.is_full()
-        self.cache[np.where(self.cache == None)[0][0]] = file
+        self.cache.insert(file)
 
     """
     Get the item to be popped.
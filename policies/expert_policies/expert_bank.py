@@ -0,0 +1,168 @@
+from typing import List
+
+import numpy as np
+
+from policies.ftpl_policy import LOG_SCALE_LIMIT
+
+
+class ExpertBank:
+    """
+    FTPL experts that only differ in their discount rate, run side by side. Each expert is a row of the
+    count and perturbation matrices, so hit checks, loss accounting, count updates and top-k selection
+    are single NumPy operations over all experts. Every row behaves like an FTPLPolicy with the same
+    parameters, and the perturbations are drawn from the same random stream in the same order.
+    """
+
+    discount_rates: np.ndarray
+
+    """
+    Number of requests each expert missed.
+    """
+    losses: np.ndarray
+
+    """
+    Cached items of every expert, experts x cache size.
+    """
+    caches: np.ndarray
+
+    """
+    Current time.
+    """
+    time: int
+
+    """
+    Raw request counts, experts x catalog size. Row i times exp(_log_scales[i]) are the discounted counts.
+    """
+    _raw_request_counts: np.ndarray
+
+    """
+    Only scales below -LOG_SCALE_LIMIT are folded into the counts. For discount rates above 1 the scale
+    grows without bound, and once it exceeds about 745 new additions times exp(-scale) underflow to 0,
+    so those experts stop counting requests.
+    """
+    _log_scales: np.ndarray
+
+    """
+    Logarithms of the discount rates, 0 where the scale never changes, i.e. for rates of 0 and 1.
+    """
+    _log_discount_rates: np.ndarray
+
+    """
+    Experts that forget a request as soon as the next one arrives.
+    """
+    _forgetful: np.ndarray
+    _previous_request: int
+    _capacity: int
+    _permutation_constant: float
+    _fresh_noise: bool
+
+    """
+    Fixed perturbations, experts x catalog size, only used without fresh noise.
+    """
+    _perturbations: np.ndarray
+
+    def __init__(
+            self,
+            capacity: int,
+            catalog_size: int,
+            time_horizon: int,
+            discount_rates: List[float],
+            fresh_noise: bool = False
+    ):
+        """
+        :param capacity: Cache size of every expert
+        :param catalog_size: Catalog size
+        :param time_horizon: Number of requests the experts will serve
+        :param discount_rates: Discount rate of every expert
+        :param fresh_noise: If set, new perturbations are drawn for every request
+        """
+        self.discount_rates = np.array(discount_rates, dtype=float)
+        self._capacity = capacity
+        self._fresh_noise = fresh_noise
+        self._forgetful = self.discount_rates == 0
+        self._log_discount_rates = np.zeros(self.discount_rates.size)
+        scaled = ~self._forgetful & (self.discount_rates != 1)
+        self._log_discount_rates[scaled] = np.log(self.discount_rates[scaled])
+        self._permutation_constant = \
+            (1 / (4 * np.pi * np.log(catalog_size)) ** (1.0 / 4.0)) * np.sqrt(time_horizon / capacity)
+        self._raw_request_counts = np.zeros((self.discount_rates.size, catalog_size))
+        self._perturbations = np.zeros((0, catalog_size)) if fresh_noise else self._get_perturbations()
+        self.reset()
+
+    @property
+    def size(self) -> int:
+        return self.discount_rates.size
+
+    def get_hits(self, request: int) -> np.ndarray:
+        """
+        Checks which experts have the item cached.
+
+        :param request: Requested item
+        :return: Boolean hit per expert
+        """
+        return np.any(self.caches == request, axis=1)
+
+    def update(self, request: int) -> None:
+        """
+        Charges every expert that misses the request, then updates the counts and the caches of all experts.
+
+        :param request: Requested item
+        :return: None
+        """
+        self.losses += ~self.get_hits(request)
+        self.time += 1
+        self._update_request_counts(request)
+        self.caches = self._get_updated_caches()
+
+    def get_request_counts(self, expert: int) -> np.ndarray:
+        """
+        Gets the discounted request counts of an expert.
+
+        :param expert: Row of the expert
+        :return: Discounted request counts
+        """
+        raw_request_counts = self._raw_request_counts[expert]
+        with np.errstate(over='ignore', invalid='ignore'):
+            counts = raw_request_counts * np.exp(self._log_scales[expert])
+        counts[raw_request_counts == 0] = 0
+        return counts
+
+    def reset(self) -> None:
+        self.time = 0
+        self.losses = np.zeros(self.size, dtype=np.int64)
+        self._raw_request_counts[:] = 0
+        self._log_scales = np.zeros(self.size)
+        self._previous_request = 0
+        self.caches = self._get_updated_caches()
+
+    def _update_request_counts(self, request: int) -> None:
+        if self.time == 1:
+            additions = np.ones(self.size)
+        else:
+            additions = self.time - self.discount_rates * (self.time - 1)
+            self._raw_request_counts[self._forgetful, self._previous_request] = 0
+            self._log_scales += self._log_discount_rates
+
+        self._raw_request_counts[:, request] += additions * np.exp(-self._log_scales)
+        self._previous_request = request
+        folded = self._log_scales < -LOG_SCALE_LIMIT
+        if np.any(folded):
+            self._raw_request_counts[folded] *= np.exp(self._log_scales[folded])[:, np.newaxis]
+            self._log_scales[folded] = 0.0
+
+    """
+    Selects the items with the highest perturbed counts for every expert at once.
+    """
+    def _get_updated_caches(self) -> np.ndarray:
+        perturbations = self._get_perturbations() if self._fresh_noise else self._perturbations
+        perturbed_counts = self._raw_request_counts + perturbations * np.exp(-self._log_scales)[:, np.newaxis]
+        if self._capacity >= perturbed_counts.shape[1]:
+            return np.argsort(-perturbed_counts, axis=1)
+        return np.argpartition(-perturbed_counts, self._capacity - 1, axis=1)[:, :self._capacity]
+
+    def _get_perturbations(self) -> np.ndarray:
+        return np.random.normal(
+            loc=0,
+            scale=self._permutation_constant,
+            size=self._raw_request_counts.shape
+        )
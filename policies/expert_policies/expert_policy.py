@@ -1,23 +1,29 @@
-from typing import List
+import numpy as np
 
-from policies.expert_policies.expert import Expert
+from policies.expert_policies.expert_bank import ExpertBank
 from policies.policy import Policy
 
 
 class ExpertPolicy(Policy):
 
-    experts: List[Expert]
+    bank: ExpertBank
 
-    def __init__(self, capacity: int, policies: List[Policy]):
+    def __init__(self, capacity: int, bank: ExpertBank):
         super().__init__(capacity)
-        self.experts = list(map(lambda p: Expert(p), policies))
+        self.bank = bank
 
     """
     Updates caches of all experts.
     """
     def update(self, request: int) -> None:
         super().update(request)
-        for expert in self.experts:
-            expert.update_expert(request)
+        self.bank.update(request)
 
+    """
+    Follows an expert, loading its cache.
+    """
+    def follow_expert(self, expert: int) -> None:
+        self.cache.assign(self.bank.caches[expert])
 
+    def get_losses(self) -> np.ndarray:
+        return self.bank.losses
@@ -1,10 +1,7 @@
-from typing import List
-
 import numpy as np
 
-from policies.expert_policies.expert import Expert
+from policies.expert_policies.expert_bank import ExpertBank
 from policies.expert_policies.expert_policy import ExpertPolicy
-from policies.policy import Policy
 
 
 PERMUTATION_FACTOR: float = 1.0
@@ -12,8 +9,8 @@ PERMUTATION_FACTOR: float = 1.0
 
 class ExpertFTPLPolicy(ExpertPolicy):
 
-    def __init__(self, capacity: int, policies: List[Policy]):
-        super().__init__(capacity, policies)
+    def __init__(self, capacity: int, bank: ExpertBank):
+        super().__init__(capacity, bank)
 
     @staticmethod
     def get_name() -> str:
@@ -24,12 +21,12 @@ class ExpertFTPLPolicy(ExpertPolicy):
     """
     def update(self, request: int) -> None:
         super().update(request)
-        self.cache = self.get_lowest_loss_expert().policy.cache
+        self.follow_expert(self.get_lowest_loss_expert())
 
-    def get_lowest_loss_expert(self) -> Expert:
-        losses = np.array(list(map(lambda e: e.loss, self.experts))) + np.random.normal(
+    def get_lowest_loss_expert(self) -> int:
+        losses = self.get_losses() + np.random.normal(
             loc=0,
             scale=PERMUTATION_FACTOR,
-            size=len(self.experts)
+            size=self.bank.size
         )
-        return self.experts[np.argmin(losses)]
+        return int(np.argmin(losses))
@@ -1,11 +1,9 @@
-import random
-from typing import List
+from typing import Optional
 
 import numpy as np
 
-from policies.expert_policies.expert import Expert
+from policies.expert_policies.expert_bank import ExpertBank
 from policies.expert_policies.expert_policy import ExpertPolicy
-from policies.ftpl_policy import FTPLPolicy
 
 
 def get_optimal_last_loss(previous_losses: np.ndarray) -> float:
@@ -17,13 +15,30 @@ def get_optimal_last_loss(previous_losses: np.ndarray) -> float:
 
 
 class IAWMPolicy(ExpertPolicy):
+    """
+    Samples the expert to follow with weights a_t^-loss, where a_t depends on the lowest loss so far.
+    The weights are computed in the log domain relative to the lowest loss, so they stay finite for
+    arbitrarily large losses.
+    """
 
     weights: np.ndarray
-    current_expert: Expert
+    current_expert: int
+
+    """
+    Generator the experts are sampled with.
+    """
+    _random: np.random.Generator
 
-    def __init__(self, capacity: int, policies: List[FTPLPolicy]):
-        super().__init__(capacity, policies)
-        self.weights = np.zeros(len(policies))
+    def __init__(self, capacity: int, bank: ExpertBank, seed: Optional[int] = None):
+        """
+        :param capacity: Cache size
+        :param bank: Experts to follow
+        :param seed: Seed of the expert sampling, drawn from the global NumPy random state if not set
+        """
+        super().__init__(capacity, bank)
+        self.weights = np.full(bank.size, 1 / bank.size)
+        self.current_expert = 0
+        self.seed_random(seed)
 
     @staticmethod
     def get_name() -> str:
@@ -33,23 +48,27 @@ class IAWMPolicy(ExpertPolicy):
     Updates caches of all experts and selects the one with the largest weight.
     """
     def update(self, request: int) -> None:
-        previous_losses = np.array(list(map(lambda e: e.loss, self.experts)))
+        self.weights = self.get_updated_weights(self.get_losses())
         super().update(request)
-        self.weights = self.get_updated_weights(previous_losses)
-        self.current_expert = random.choices(self.experts, weights=self.weights)[0]
-        self.cache = self.current_expert.policy.cache
+        self.current_expert = self._sample_expert()
+        self.follow_expert(self.current_expert)
+
+    def seed_random(self, seed: Optional[int] = None) -> None:
+        self._random = np.random.default_rng(np.random.randint(2 ** 32) if seed is None else seed)
+
+    def get_current_request_counts(self) -> np.ndarray:
+        return self.bank.get_request_counts(self.current_expert)
 
     def get_updated_weights(self, previous_losses: np.ndarray) -> np.ndarray:
-        optimal_last_loss = np.min(previous_losses)
+        optimal_last_loss = get_optimal_last_loss(previous_losses)
         e_t = 0.25 \
             if optimal_last_loss == 0 \
             else min([0.25, np.sqrt((2 * np.log(self.weights.size) / optimal_last_loss))])
-        a_t = 1 / (1 - e_t)
-        w_t = sum([
-            np.power(a_t, -previous_losses[i])
-            for i in range(len(self.experts))
-        ])
-
-        return np.array(
-            [np.power(a_t, -previous_losses[i]) / w_t for i in range(self.weights.size)]
-        )
+        log_weights = (previous_losses - optimal_last_loss) * np.log(1 - e_t)
+        weights = np.exp(log_weights)
+        return weights / np.sum(weights)
+
+    def _sample_expert(self) -> int:
+        cumulative_weights = np.cumsum(self.weights)
+        expert = np.searchsorted(cumulative_weights, self._random.random() * cumulative_weights[-1], side='right')
+        return int(min(expert, self.weights.size - 1))
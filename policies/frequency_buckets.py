@@ -0,0 +1,210 @@
+import heapq
+import random
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional, Union, Iterator
+
+
+class TieBreak:
+    """
+    Decides which of the items with the lowest count is the victim.
+    FIFO picks the item that entered the buckets first, LRU the one whose count changed least recently.
+    """
+    FIFO: str = "fifo"
+    LRU: str = "lru"
+    RANDOM: str = "random"
+
+
+class _LRUBucket:
+
+    _items: OrderedDict[int, None]
+
+    def __init__(self):
+        self._items = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items)
+
+    def add(self, item: int, sequence: int) -> None:
+        self._items[item] = None
+
+    def remove(self, item: int) -> None:
+        del self._items[item]
+
+    def get_victim(self) -> int:
+        return next(iter(self._items))
+
+
+class _FIFOBucket:
+    """
+    Heap of (sequence, item) pairs. Removed items stay in the heap until they reach the top or the heap
+    is rebuilt, which makes every operation O(log n) amortized.
+    """
+
+    _sequences: Dict[int, int]
+    _heap: List[Tuple[int, int]]
+
+    def __init__(self):
+        self._sequences = dict()
+        self._heap = []
+
+    def __len__(self) -> int:
+        return len(self._sequences)
+
+    def add(self, item: int, sequence: int) -> None:
+        self._sequences[item] = sequence
+        heapq.heappush(self._heap, (sequence, item))
+
+    def remove(self, item: int) -> None:
+        del self._sequences[item]
+        if len(self._heap) > 2 * len(self._sequences) + 16:
+            self._heap = [(sequence, item) for item, sequence in self._sequences.items()]
+            heapq.heapify(self._heap)
+
+    def get_victim(self) -> int:
+        while self._sequences.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][1]
+
+
+class _RandomBucket:
+
+    _items: List[int]
+    _positions: Dict[int, int]
+
+    def __init__(self):
+        self._items = []
+        self._positions = dict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items)
+
+    def add(self, item: int, sequence: int) -> None:
+        self._positions[item] = len(self._items)
+        self._items.append(item)
+
+    def remove(self, item: int) -> None:
+        position = self._positions.pop(item)
+        last = self._items.pop()
+        if last != item:
+            self._items[position] = last
+            self._positions[last] = position
+
+    def get_victim(self) -> int:
+        return self._items[random.randrange(len(self._items))]
+
+
+Bucket = Union[_LRUBucket, _FIFOBucket, _RandomBucket]
+
+
+class FrequencyBuckets:
+    """
+    Counts of a set of items, grouped into buckets of items with equal counts. Counts only grow by one,
+    so the lowest count can be tracked in O(1), which makes finding a victim O(1) for LRU and random
+    tie-breaking and O(log n) for FIFO tie-breaking.
+    """
+
+    _tie_break: str
+    _counts: Dict[int, int]
+
+    """
+    Order in which the items were added, used for FIFO tie-breaking.
+    """
+    _sequences: Dict[int, int]
+    _next_sequence: int
+    _buckets: Dict[int, Bucket]
+
+    """
+    The lowest count, None if it has to be searched for.
+    """
+    _min_count: Optional[int]
+
+    def __init__(self, tie_break: str = TieBreak.FIFO):
+        assert tie_break in [TieBreak.FIFO, TieBreak.LRU, TieBreak.RANDOM]
+        self._tie_break = tie_break
+        self._counts = dict()
+        self._sequences = dict()
+        self._next_sequence = 0
+        self._buckets = dict()
+        self._min_count = None
+
+    def __contains__(self, item: int) -> bool:
+        return item in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def get_count(self, item: int) -> int:
+        return self._counts[item]
+
+    def add(self, item: int, count: int = 0) -> None:
+        assert item not in self._counts
+        self._counts[item] = count
+        self._sequences[item] = self._next_sequence
+        self._next_sequence += 1
+        self._add_to_bucket(item, count)
+        if self._min_count is not None:
+            self._min_count = min(self._min_count, count)
+        elif count == 0 or len(self._counts) == 1:
+            self._min_count = count
+
+    def increment(self, item: int) -> None:
+        count = self._counts[item]
+        self._remove_from_bucket(item, count)
+        self._counts[item] = count + 1
+        self._add_to_bucket(item, count + 1)
+        if self._min_count == count and count not in self._buckets:
+            self._min_count = count + 1
+
+    def remove(self, item: int) -> int:
+        count = self._counts.pop(item)
+        self._remove_from_bucket(item, count)
+        del self._sequences[item]
+        if self._min_count == count and count not in self._buckets:
+            self._min_count = None
+        return count
+
+    def get_victim(self) -> int:
+        """
+        Gets an item with the lowest count, according to the tie-break.
+
+        :return: Victim
+        """
+        assert len(self._counts) > 0
+        if self._min_count is None:
+            self._min_count = min(self._buckets)
+        return self._buckets[self._min_count].get_victim()
+
+    def get_ordered_items(self) -> List[Tuple[int, int]]:
+        """
+        Gets the items with their counts, in the order they were added for FIFO tie-breaking and bucket by
+        bucket in tie-break order otherwise. Adding them in this order to empty buckets restores the same victims.
+
+        :return: (item, count) pairs
+        """
+        if self._tie_break == TieBreak.FIFO:
+            return [(item, self._counts[item]) for item in sorted(self._counts, key=self._sequences.get)]
+        return [(item, count) for count, bucket in self._buckets.items() for item in bucket]
+
+    def _add_to_bucket(self, item: int, count: int) -> None:
+        if count not in self._buckets:
+            self._buckets[count] = self._get_empty_bucket()
+        self._buckets[count].add(item, self._sequences[item])
+
+    def _remove_from_bucket(self, item: int, count: int) -> None:
+        bucket = self._buckets[count]
+        bucket.remove(item)
+        if len(bucket) == 0:
+            del self._buckets[count]
+
+    def _get_empty_bucket(self) -> Bucket:
+        if self._tie_break == TieBreak.LRU:
+            return _LRUBucket()
+        if self._tie_break == TieBreak.RANDOM:
+            return _RandomBucket()
+        return _FIFOBucket()
@@ -1,28 +1,74 @@
+import heapq
+from typing import List, Tuple, Dict
+
 import numpy as np
 
 from policies.policy import Policy
+from profiling import profiled
+
+
+LOG_SCALE_LIMIT: float = 50.0
 
 
 class FTPLPolicy(Policy):
     """
     (Non-expert) Follow the Perturbed Leader policy.
+
+    By default the perturbation is drawn once and reused, which is the lazy form of FTPL. Without
+    discounting only the requested item's perturbed count changes per request, so the cache is kept up
+    to date with a heap over the cached items in O(log k) instead of ranking the whole catalog.
+    With fresh_noise a new perturbation is drawn for every request, as in the original formulation.
+
+    Discounted counts are stored as raw counts times a global scale, kept as its logarithm, so that a
+    request only touches the requested count. The raw counts are rescaled when the scale gets small.
+    Discount rates above 1 make the scale grow instead, which is never folded, so requests stop adding
+    to the counts once its logarithm passes about 745.
     """
 
-    file_request_counts: np.ndarray
+    """
+    Raw request counts, the discounted counts are these times exp(_log_scale).
+    """
+    _raw_request_counts: np.ndarray
+    _log_scale: float
+    _previous_request: int
     _capacity: int
     _permutation_constant: float
     _discount_rate: float
     _addition: float
+    _fresh_noise: bool
 
-    def __init__(self, capacity: int, catalog_size: int, time_horizon: int, discount_rate: float = 1):
+    """
+    Fixed perturbation, only used without fresh noise.
+    """
+    _perturbation: np.ndarray
+
+    """
+    Min-heap of (perturbed count, item) of the cached items. Entries whose count is no longer the one in
+    _cached_counts are outdated and skipped.
+    """
+    _cached_heap: List[Tuple[float, int]]
+    _cached_counts: Dict[int, float]
+
+    def __init__(
+            self,
+            capacity: int,
+            catalog_size: int,
+            time_horizon: int,
+            discount_rate: float = 1,
+            fresh_noise: bool = False
+    ):
         super().__init__(capacity)
         self._capacity = capacity
         self._discount_rate = discount_rate
-        self.file_request_counts = np.zeros(catalog_size)
+        self._fresh_noise = fresh_noise
+        self._raw_request_counts = np.zeros(catalog_size)
+        self._log_scale = 0.0
+        self._previous_request = 0
         self._permutation_constant = \
             (1 / (4 * np.pi * np.log(catalog_size)) ** (1.0 / 4.0)) * np.sqrt(time_horizon / capacity)
         self._addition = 1
-        self.cache = self.get_updated_cache()
+        self._perturbation = np.zeros(0) if fresh_noise else self._get_perturbation()
+        self._refresh_cache()
 
     def get_name(self) -> str:
         return f'FTPL, d={self._discount_rate}'
@@ -33,15 +79,78 @@ class FTPLPolicy(Policy):
     def update(self, request: int) -> None:
         super().update(request)
         self.update_request_counts(request)
-        self.cache = self.get_updated_cache()
+        if self._is_incremental():
+            self._update_cached_heap(int(request))
+        else:
+            self.cache.assign(self.get_updated_cache())
+
+    @profiled("run_trace")
+    def run_trace(self, trace: np.ndarray) -> np.ndarray:
+        """
+        Serves the requests with the counts and the perturbation as plain lists when the cache is kept up
+        to date incrementally. Discounted FTPL and FTPL with fresh noise rank the catalog for every request,
+        which dominates the cost, so they fall back to the per-request is_present and update loop.
+        Within the batch hits only update the cached count, heap entries are then lower bounds of the
+        counts and are refreshed when they reach the top. The heap is rebuilt at the end.
+
+        :param trace: Requests
+        :return: Whether each request was a hit
+        """
+        if not self._is_incremental():
+            return self._serve_requests(trace)
+
+        requests = trace.tolist()
+        raw_request_counts = self._raw_request_counts.tolist()
+        perturbation = self._perturbation.tolist()
+        cached_counts = self._cached_counts
+        cached_heap = [(count, item) for item, count in cached_counts.items()]
+        heapq.heapify(cached_heap)
+        hits = bytearray(len(requests))
+        for index, request in enumerate(requests):
+            raw_request_counts[request] += 1.0
+            count = raw_request_counts[request] + perturbation[request]
+            if request in cached_counts:
+                cached_counts[request] = count
+                hits[index] = True
+                continue
+
+            while cached_counts[cached_heap[0][1]] != cached_heap[0][0]:
+                heapq.heapreplace(cached_heap, (cached_counts[cached_heap[0][1]], cached_heap[0][1]))
+            if count > cached_heap[0][0]:
+                del cached_counts[heapq.heapreplace(cached_heap, (count, request))[1]]
+                cached_counts[request] = count
+
+        self.time += len(requests)
+        if len(requests) > 0:
+            self._previous_request = requests[-1]
+        self._raw_request_counts = np.array(raw_request_counts)
+        self._cached_heap = [(count, item) for item, count in cached_counts.items()]
+        heapq.heapify(self._cached_heap)
+        self.cache.assign(list(cached_counts))
+        return np.frombuffer(hits, dtype=bool).copy()
+
+    @property
+    def file_request_counts(self) -> np.ndarray:
+        """
+        Discounted request counts, computed from the raw counts.
+        """
+        with np.errstate(over='ignore', invalid='ignore'):
+            counts = self._raw_request_counts * np.exp(self._log_scale)
+        counts[self._raw_request_counts == 0] = 0
+        return counts
 
     def update_request_counts(self, request: int):
-        if self.time == 1:
-            self.file_request_counts[request] += 1.0
-            return
+        addition = 1.0 if self.time == 1 else self.time - self._discount_rate * (self.time - 1)
+        if self.time > 1 and self._discount_rate == 0:
+            self._raw_request_counts[self._previous_request] = 0
+        elif self.time > 1 and self._discount_rate != 1:
+            self._log_scale += np.log(self._discount_rate)
 
-        self.file_request_counts *= self._discount_rate
-        self.file_request_counts[request] += self.time - self._discount_rate * (self.time - 1)
+        self._raw_request_counts[request] += addition * np.exp(-self._log_scale)
+        self._previous_request = request
+        if self._log_scale < -LOG_SCALE_LIMIT:
+            self._raw_request_counts *= np.exp(self._log_scale)
+            self._log_scale = 0.0
 
     """
     Gets a new cache configuration by selecting the most requested items, where the request count
@@ -49,16 +158,63 @@ class FTPLPolicy(Policy):
     the permutation constant.
     """
     def get_updated_cache(self) -> np.ndarray:
-        perturbed_counts = self.file_request_counts + np.random.normal(
+        perturbation = self._get_perturbation() if self._fresh_noise else self._perturbation
+        perturbed_counts = self._raw_request_counts + perturbation * np.exp(-self._log_scale)
+        if self._capacity >= perturbed_counts.size:
+            return np.argsort(-perturbed_counts)
+        return np.argpartition(-perturbed_counts, self._capacity - 1)[:self._capacity]
+
+    def _get_perturbation(self) -> np.ndarray:
+        return np.random.normal(
             loc=0,
             scale=self._permutation_constant,
-            size=self.file_request_counts.size
+            size=self._raw_request_counts.size
         )
-        return np.argsort(-perturbed_counts)[:self._capacity]
+
+    def _is_incremental(self) -> bool:
+        return not self._fresh_noise and self._discount_rate == 1
+
+    def _refresh_cache(self) -> None:
+        self.cache.assign(self.get_updated_cache())
+        self._cached_counts = {
+            item: self._raw_request_counts[item] + self._perturbation[item]
+            for item in self.cache
+        } if self._is_incremental() else dict()
+        self._cached_heap = [(count, item) for item, count in self._cached_counts.items()]
+        heapq.heapify(self._cached_heap)
+
+    """
+    Updates the cache after the perturbed count of the request grew. The request replaces the cached item
+    with the lowest perturbed count if it now exceeds it. Other items did not change, so the cache stays
+    the set of items with the highest perturbed counts.
+    """
+    def _update_cached_heap(self, request: int) -> None:
+        count = self._raw_request_counts[request] + self._perturbation[request]
+        if request not in self.cache:
+            lowest_count, lowest_item = self._get_lowest_cached()
+            if count <= lowest_count:
+                return
+            heapq.heappop(self._cached_heap)
+            del self._cached_counts[lowest_item]
+            self.cache.evict(lowest_item)
+            self.cache.insert(request)
+
+        self._cached_counts[request] = count
+        heapq.heappush(self._cached_heap, (count, request))
+        if len(self._cached_heap) > 2 * len(self._cached_counts) + 16:
+            self._cached_heap = [(count, item) for item, count in self._cached_counts.items()]
+            heapq.heapify(self._cached_heap)
+
+    def _get_lowest_cached(self) -> Tuple[float, int]:
+        while self._cached_counts.get(self._cached_heap[0][1]) != self._cached_heap[0][0]:
+            heapq.heappop(self._cached_heap)
+        return self._cached_heap[0]
 
     """
     Resets the cache, deleting all entries.
     """
     def reset(self) -> None:
         super().reset()
-        self.file_request_counts = np.zeros(self.file_request_counts.size)
+        self._raw_request_counts = np.zeros(self._raw_request_counts.size)
+        self._log_scale = 0.0
+        self._refresh_cache()
@@ -1,41 +1,131 @@
+import heapq
+
+import numpy as np
+
 from policies.eviction_policy import EvictionPolicy
+from policies.frequency_buckets import FrequencyBuckets, TieBreak
+from profiling import profiled
 
 
 class LFUPolicy(EvictionPolicy):
 
     """
-    Map that maps a file to a how many times it has been used.
+    Request counts of the cached items, grouped by count.
     """
-    _frequency_map: dict[int, int]
+    _frequencies: FrequencyBuckets
 
-    def __init__(self, capacity: int):
+    """
+    Request counts of every requested item, only kept by perfect LFU.
+    """
+    _request_counts: dict[int, int]
+
+    _tie_break: str
+    _perfect: bool
+
+    def __init__(self, capacity: int, tie_break: str = TieBreak.FIFO, perfect: bool = False):
+        """
+        :param capacity: Cache size
+        :param tie_break: One of the TieBreak values, decides between cached items with equal counts
+        :param perfect: If set, counts include requests made before the item was last inserted
+        """
         super().__init__(capacity)
-        self._frequency_map = dict()
+        self._tie_break = tie_break
+        self._perfect = perfect
+        self._frequencies = FrequencyBuckets(tie_break)
+        self._request_counts = dict()
 
-    @staticmethod
-    def get_name() -> str:
-        return "LFU"
+    def get_name(self) -> str:
+        name = "Perfect LFU" if self._perfect else "LFU"
+        return name if self._tie_break == TieBreak.FIFO else f'{name}, {self._tie_break} ties'
 
     """
-    Learns from the request. Updates the frequency map.
+    Learns from the request. Updates the request counts.
     """
     def learn(self, request: int):
+        request = int(request)
+        if self._perfect:
+            self._request_counts[request] = self._request_counts.get(request, 0) + 1
         if self.is_present(request):
-            self._frequency_map[request] += 1
+            self._frequencies.increment(request)
+
+    @profiled("run_trace")
+    def run_trace(self, trace: np.ndarray) -> np.ndarray:
+        """
+        Serves the requests with plain dictionaries of counts and sequences, where the sequence is the
+        insertion order for FIFO ties and the time of the last count change for LRU ties. The victim is
+        the item with the lowest (count, sequence), found with a heap whose entries are only refreshed
+        when they reach the top, since counts and sequences only grow. Random ties are served one by one.
+
+        :param trace: Requests
+        :return: Whether each request was a hit
+        """
+        if self._tie_break == TieBreak.RANDOM:
+            return self._serve_requests(trace)
+
+        requests = trace.tolist()
+        counts = dict()
+        sequences = dict()
+        for sequence, (item, count) in enumerate(self._frequencies.get_ordered_items()):
+            counts[item] = count
+            sequences[item] = sequence
+        next_sequence = len(counts)
+        heap = [(count, sequences[item], item) for item, count in counts.items()]
+        heapq.heapify(heap)
+
+        request_counts = self._request_counts
+        perfect, lru_ties = self._perfect, self._tie_break == TieBreak.LRU
+        capacity = self.cache.size
+        size = len(counts)
+        hits = bytearray(len(requests))
+        for index, request in enumerate(requests):
+            if perfect:
+                request_counts[request] = request_counts.get(request, 0) + 1
+            if request in counts:
+                hits[index] = True
+                counts[request] += 1
+                if lru_ties:
+                    sequences[request] = next_sequence
+                    next_sequence += 1
+                continue
+
+            count = request_counts[request] if perfect else 1
+            if size < capacity:
+                size += 1
+                heapq.heappush(heap, (count, next_sequence, request))
+            else:
+                while True:
+                    victim_count, victim_sequence, victim = heap[0]
+                    if counts[victim] == victim_count and sequences[victim] == victim_sequence:
+                        break
+                    heapq.heapreplace(heap, (counts[victim], sequences[victim], victim))
+                heapq.heapreplace(heap, (count, next_sequence, request))
+                del counts[victim], sequences[victim]
+
+            counts[request] = count
+            sequences[request] = next_sequence
+            next_sequence += 1
+
+        self.time += len(requests)
+        self.cache.assign(list(counts))
+        self._frequencies = FrequencyBuckets(self._tie_break)
+        for item in sorted(counts, key=sequences.get):
+            self._frequencies.add(item, counts[item])
+        return np.frombuffer(hits, dtype=bool).copy()
 
     """
     Adds an item to a cache, assumes that the cache is not full.
     """
     def add_file(self, file: int) -> None:
+        file = int(file)
         super().add_file(file)
-        self._frequency_map[file] = 0
+        self._frequencies.add(file, self._request_counts.get(file, 0))
 
     """
     Evicts an item from the cache.
     """
     def evict_item(self) -> int:
         victim = super().evict_item()
-        self._frequency_map.pop(victim)
+        self._frequencies.remove(victim)
         return victim
 
     """
@@ -43,10 +133,11 @@ class LFUPolicy(EvictionPolicy):
     """
     def reset(self) -> None:
         super().reset()
-        self._frequency_map = dict()
+        self._frequencies = FrequencyBuckets(self._tie_break)
+        self._request_counts = dict()
 
     """
     Get the least frequently used element.
     """
     def get_victim(self) -> int:
-        return min(self._frequency_map.items(), key=lambda item: item[1])[0]
+        return self._frequencies.get_victim()
@@ -1,45 +1,81 @@
+from collections import OrderedDict
+
+import numpy as np
+
 from policies.eviction_policy import EvictionPolicy
+from profiling import profiled
 
 
 class LRUPolicy(EvictionPolicy):
 
     """
-    Map that maps an item to a time slot when it was last used.
+    Ordered map of the cached items, from the least to the most recently used.
     """
-    _usage_map: dict[int, int]
+    _usage_order: OrderedDict[int, None]
 
     def __init__(self, capacity: int):
         super().__init__(capacity)
-        self._usage_map = dict()
+        self._usage_order = OrderedDict()
 
     @staticmethod
     def get_name() -> str:
         return "LRU"
 
     """
-    Learns from the request. Updates the usage map.
+    Learns from the request. Moves the item to the most recently used end.
     """
     def learn(self, request: int):
         assert request in self.cache
-        self._usage_map[request] = self.time
+        self._usage_order[request] = None
+        self._usage_order.move_to_end(request)
+
+    @profiled("run_trace")
+    def run_trace(self, trace: np.ndarray) -> np.ndarray:
+        """
+        Serves the requests with the usage order alone, which is the LRU stack cut off at the capacity,
+        and loads the resulting items into the cache at the end.
+
+        :param trace: Requests
+        :return: Whether each request was a hit
+        """
+        requests = trace.tolist()
+        usage_order = self._usage_order
+        move_to_end, pop_least_recent = usage_order.move_to_end, usage_order.popitem
+        capacity = self.cache.size
+        size = len(usage_order)
+        hits = bytearray(len(requests))
+        for index, request in enumerate(requests):
+            if request in usage_order:
+                move_to_end(request)
+                hits[index] = True
+            else:
+                if size == capacity:
+                    pop_least_recent(False)
+                else:
+                    size += 1
+                usage_order[request] = None
+
+        self.time += len(requests)
+        self.cache.assign(list(usage_order))
+        return np.frombuffer(hits, dtype=bool).copy()
 
     """
     Removes the item from the cache that has been least recently used.
     """
     def evict_item(self) -> int:
         victim = super().evict_item()
-        self._usage_map.pop(victim)
+        self._usage_order.pop(victim)
         return victim
 
     """
     Get the least recently used element.
     """
     def get_victim(self) -> int:
-        return min(self._usage_map.items(), key=lambda item: item[1])[0]
+        return next(iter(self._usage_order))
 
     """
     Resets the cache, deleting all entries.
     """
     def reset(self) -> None:
         super().reset()
-        self._usage_map = dict()
+        self._usage_order = OrderedDict()
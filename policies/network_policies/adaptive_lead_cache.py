@@ -2,8 +2,10 @@ from typing import List
 
 import numpy as np
 
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
 from policies.network_policies.decentralized.network_adaptive_ftpl import NetworkAdaptiveFTPL
-from policies.network_policies.lead_cache import LeadCache
+from policies.network_policies.lead_cache import LeadCache, ResolveSchedule
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolver
 
 
 class AdaptiveLeadCache(LeadCache):
@@ -13,34 +15,48 @@ class AdaptiveLeadCache(LeadCache):
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             max_degree: int,
             cache_size: int,
             discount_rates: List[float],
-            time_horizon: int
+            time_horizon: int,
+            solver: str = LeadCacheSolver.SLSQP,
+            warm_start: bool = False,
+            resolve_schedule: str = ResolveSchedule.EVERY_STEP,
+            resolve_period: int = 1
     ):
-        super().__init__(cache_count, client_cache_connections, catalog_size, max_degree, cache_size)
-        self.network_ftpl = NetworkAdaptiveFTPL(
+        super().__init__(
             cache_count,
             client_cache_connections,
             catalog_size,
+            max_degree,
+            cache_size,
+            solver,
+            warm_start,
+            resolve_schedule,
+            resolve_period
+        )
+        self._cache_rankings = None
+        self.network_ftpl = NetworkAdaptiveFTPL(
+            cache_count,
+            self.incidence,
+            catalog_size,
             cache_size,
             discount_rates,
             time_horizon
         )
 
-    @staticmethod
-    def get_name() -> str:
-        return "Adaptive LeadCache"
+    def get_name(self) -> str:
+        return self._get_schedule_name("Adaptive LeadCache")
 
     def update(self, requests: np.ndarray) -> None:
         super().update(requests)
         for cache in range(self.cache_count):
-            self.network_ftpl.policies[cache].cache = self.configuration[cache]
+            self.network_ftpl.policies[cache].cache.assign(np.flatnonzero(np.round(self.configuration[cache])))
 
     def _update_counts(self, requests: np.ndarray) -> None:
         self.network_ftpl.update(requests)
         for cache in range(self.cache_count):
-            self.request_counts[cache] = self.network_ftpl.policies[cache].current_expert.policy.file_request_counts
+            self.request_counts.assign(cache, self.network_ftpl.policies[cache].get_current_request_counts())
 
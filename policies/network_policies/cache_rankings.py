@@ -0,0 +1,92 @@
+import heapq
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+
+class CacheRankings:
+    """
+    Top cache size items of every cache, ranked by the request counts summed over the clients of the cache,
+    ties by item. Counts only grow by one request at a time, so an item that is not ranked can only replace
+    the lowest ranked item of its cache, which a heap over the ranked items finds in O(log k). Items without
+    requests from the clients of a cache are not ranked.
+    """
+
+    cache_size: int
+
+    """
+    Counts of the requested items of every cache.
+    """
+    _counts: List[Dict[int, int]]
+
+    """
+    Ranked items of every cache.
+    """
+    _ranked: List[Set[int]]
+
+    """
+    Min-heap of (count, -item) of the ranked items of every cache, so that the lowest count and of those the
+    highest item is on top. Entries whose item is no longer ranked or whose count is outdated are skipped.
+    """
+    _heaps: List[List[Tuple[int, int]]]
+
+    """
+    Caches whose ranked items changed since they were last taken.
+    """
+    _changed_caches: Set[int]
+
+    def __init__(self, cache_count: int, cache_size: int):
+        self.cache_size = cache_size
+        self._counts = [dict() for _ in range(cache_count)]
+        self._ranked = [set() for _ in range(cache_count)]
+        self._heaps = [[] for _ in range(cache_count)]
+        self._changed_caches = set()
+
+    def add(self, cache: int, item: int) -> None:
+        """
+        Counts a request for an item at a cache.
+
+        :param cache: Cache the request was routed to
+        :param item: Requested item
+        :return: None
+        """
+        counts, ranked, heap = self._counts[cache], self._ranked[cache], self._heaps[cache]
+        count = counts.get(item, 0) + 1
+        counts[item] = count
+        if item not in ranked:
+            if len(ranked) == self.cache_size:
+                lowest_count, lowest_item = self._get_lowest(cache)
+                if (count, -item) < (lowest_count, lowest_item):
+                    return
+                heapq.heappop(heap)
+                ranked.remove(-lowest_item)
+            ranked.add(item)
+            self._changed_caches.add(cache)
+
+        heapq.heappush(heap, (count, -item))
+        if len(heap) > 2 * len(ranked) + 16:
+            self._heaps[cache] = [(counts[ranked_item], -ranked_item) for ranked_item in ranked]
+            heapq.heapify(self._heaps[cache])
+
+    def get_ranking(self, cache: int) -> np.ndarray:
+        """
+        :param cache: Cache
+        :return: Ranked items of the cache in item order
+        """
+        return np.sort(np.fromiter(self._ranked[cache], dtype=np.int64, count=len(self._ranked[cache])))
+
+    def pop_changed_caches(self) -> List[int]:
+        """
+        Takes the caches whose ranked items changed since they were last taken. A cache can be reported
+        although its ranked items ended up as they were, e.g. when an item was replaced and then came back.
+
+        :return: Caches in increasing order
+        """
+        changed_caches, self._changed_caches = self._changed_caches, set()
+        return sorted(changed_caches)
+
+    def _get_lowest(self, cache: int) -> Tuple[int, int]:
+        counts, ranked, heap = self._counts[cache], self._ranked[cache], self._heaps[cache]
+        while -heap[0][1] not in ranked or counts[-heap[0][1]] != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import List, Union, Iterator, Tuple, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class ClientCacheIncidence:
+    """
+    Client x cache incidence matrix in CSR form, built once from the connection lists and shared by the
+    policies and the simulation. Connections keep the order of the lists, so that requests are routed to
+    the caches in the same order as by walking the lists.
+    """
+
+    client_count: int
+    cache_count: int
+
+    """
+    Clients x caches, 1 where a client is connected to a cache.
+    """
+    matrix: csr_matrix
+
+    """
+    Caches x clients, the transpose of matrix.
+    """
+    _cache_clients: csr_matrix
+
+    """
+    Client of every connection, in the order of matrix.indices.
+    """
+    _connection_clients: np.ndarray
+
+    """
+    Caches with at least one client, in the order in which the connection lists first mention them.
+    """
+    _connected_caches: np.ndarray
+
+    def __init__(self, matrix: csr_matrix):
+        self.matrix = matrix
+        self.client_count, self.cache_count = matrix.shape
+        self._cache_clients = matrix.transpose().tocsr()
+        self._connection_clients = np.repeat(np.arange(self.client_count), np.diff(matrix.indptr))
+        caches, first_connections = np.unique(matrix.indices, return_index=True)
+        self._connected_caches = caches[np.argsort(first_connections)]
+
+    @staticmethod
+    def from_connections(
+            client_cache_connections: List[List[int]],
+            cache_count: Optional[int] = None
+    ) -> ClientCacheIncidence:
+        """
+        Builds the incidence matrix from connection lists.
+
+        :param client_cache_connections: Caches every client is connected to
+        :param cache_count: Number of caches, the largest connected cache + 1 if not set
+        :return: Incidence
+        """
+        indptr = np.cumsum([0] + [len(caches) for caches in client_cache_connections])
+        indices = np.array([cache for caches in client_cache_connections for cache in caches], dtype=np.int64)
+        if cache_count is None:
+            cache_count = int(indices.max(initial=-1)) + 1
+        assert indices.size == 0 or indices.max() < cache_count
+        matrix = csr_matrix(
+            (np.ones(indices.size), indices, indptr),
+            shape=(len(client_cache_connections), cache_count)
+        )
+        return ClientCacheIncidence(matrix)
+
+    @staticmethod
+    def get(
+            client_cache_connections: ClientCacheConnections,
+            cache_count: Optional[int] = None
+    ) -> ClientCacheIncidence:
+        if isinstance(client_cache_connections, ClientCacheIncidence):
+            assert cache_count is None or client_cache_connections.cache_count == cache_count
+            return client_cache_connections
+        return ClientCacheIncidence.from_connections(client_cache_connections, cache_count)
+
+    @property
+    def connection_count(self) -> int:
+        return self.matrix.indices.size
+
+    def get_caches(self, client: int) -> np.ndarray:
+        return self.matrix.indices[self.matrix.indptr[client]:self.matrix.indptr[client + 1]]
+
+    def get_clients(self, cache: int) -> np.ndarray:
+        return self._cache_clients.indices[self._cache_clients.indptr[cache]:self._cache_clients.indptr[cache + 1]]
+
+    def get_connection_requests(self, requests: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the request that travels over every connection.
+
+        :param requests: Request of every client
+        :return: Cache and request of every connection
+        """
+        return self.matrix.indices, np.round(requests).astype(np.int64)[self._connection_clients]
+
+    def get_hits(self, configuration: np.ndarray, requests: np.ndarray) -> int:
+        """
+        Counts the connections whose cache holds the request of the client.
+
+        :param configuration: Caches x catalog configuration, rounded to decide if an item is cached
+        :param requests: Request of every client
+        :return: Number of hits
+        """
+        caches, connection_requests = self.get_connection_requests(requests)
+        return int(np.count_nonzero(np.round(configuration[caches, connection_requests]) == 1))
+
+    def get_coverage(self, configuration: np.ndarray) -> np.ndarray:
+        """
+        Sums the configuration over the caches of every client.
+
+        :param configuration: Caches x catalog configuration
+        :return: Clients x catalog sums
+        """
+        return np.asarray(self.matrix @ configuration)
+
+    def route(self, requests: np.ndarray) -> Iterator[Tuple[int, List[int]]]:
+        """
+        Routes the requests of the clients to their caches.
+
+        :param requests: Request of every client
+        :return: Every connected cache with the requests of its clients, in client order
+        """
+        requests = np.round(requests).astype(np.int64)
+        for cache in self._connected_caches.tolist():
+            yield cache, requests[self.get_clients(cache)].tolist()
+
+
+ClientCacheConnections = Union[List[List[int]], ClientCacheIncidence]
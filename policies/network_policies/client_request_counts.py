@@ -0,0 +1,108 @@
+from typing import Dict
+
+import numpy as np
+
+
+class ClientRequestCounts:
+    """
+    Request counts of every client, only stored for the items that were requested at least once. Every
+    requested item gets a column in order of its first request, and the column array grows by doubling,
+    so memory scales with the number of distinct requested items instead of the catalog size.
+    """
+
+    catalog_size: int
+
+    """
+    Items of the columns, in order of their first request.
+    """
+    _items: np.ndarray
+    _item_count: int
+
+    """
+    Maps a requested item to its column.
+    """
+    _columns: Dict[int, int]
+
+    """
+    Clients x allocated columns, only the first _item_count columns are used.
+    """
+    _counts: np.ndarray
+
+    def __init__(self, client_count: int, catalog_size: int, initial_columns: int = 64):
+        """
+        :param client_count: Number of rows
+        :param catalog_size: Catalog size
+        :param initial_columns: Number of columns to allocate up front
+        """
+        assert initial_columns > 0
+        self.catalog_size = catalog_size
+        self._items = np.zeros(initial_columns, dtype=np.int64)
+        self._item_count = 0
+        self._columns = dict()
+        self._counts = np.zeros((client_count, initial_columns))
+
+    @property
+    def items(self) -> np.ndarray:
+        return self._items[:self._item_count]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        :return: Clients x requested items view of the counts, columns in the order of items
+        """
+        return self._counts[:, :self._item_count]
+
+    def __contains__(self, item: int) -> bool:
+        return item in self._columns
+
+    def add(self, client: int, item: int, count: float = 1) -> None:
+        column = self._get_column(int(item))
+        self._counts[client, column] += count
+
+    def assign(self, client: int, counts: np.ndarray) -> None:
+        """
+        Replaces the counts of a client with a dense catalog-sized vector, of which only the nonzero entries
+        are stored.
+
+        :param client: Row to replace
+        :param counts: Counts of every item of the catalog
+        :return: None
+        """
+        items = np.flatnonzero(counts)
+        columns = [self._get_column(item) for item in items.tolist()]
+        self._counts[client, :self._item_count] = 0
+        self._counts[client, columns] = counts[items]
+
+    def get_random_unrequested_items(self, count: int) -> np.ndarray:
+        """
+        Draws distinct items that were never requested, uniformly at random. Items are drawn from the catalog
+        and requested ones rejected while the requested items are at most half of it, otherwise the draw is
+        from the list of never requested items.
+
+        :param count: Number of items, fewer if the catalog runs out
+        :return: Items in random order
+        """
+        count = min(count, self.catalog_size - self._item_count)
+        if 2 * self._item_count > self.catalog_size:
+            items = np.setdiff1d(np.arange(self.catalog_size), self.items, assume_unique=True)
+            return np.random.permutation(items)[:count]
+
+        items = np.zeros(0, dtype=np.int64)
+        while items.size < count:
+            draws = np.random.randint(0, self.catalog_size, size=2 * (count - items.size))
+            items = np.union1d(items, draws[~np.isin(draws, self.items)])
+        return np.random.permutation(items)[:count]
+
+    def _get_column(self, item: int) -> int:
+        column = self._columns.get(item)
+        if column is not None:
+            return column
+
+        if self._item_count == self._items.size:
+            self._items = np.concatenate([self._items, np.zeros(self._items.size, dtype=np.int64)])
+            self._counts = np.concatenate([self._counts, np.zeros(self._counts.shape)], axis=1)
+        column = self._item_count
+        self._items[column] = item
+        self._columns[item] = column
+        self._item_count += 1
+        return column
@@ -1,36 +1,64 @@
 import random
-from typing import List, Dict
+from typing import List, Optional
 
 import numpy as np
 
+from policies.cache_store import CacheStore
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
 from policies.network_policies.network_policy import NetworkPolicy
 from policies.policy import Policy
+from profiling import phase
 
 
 class DecentralizedNetworkPolicy(NetworkPolicy):
 
+    """
+    Network of independent single cache policies. The configuration is a byte per cache and item, which is
+    kept up to date with the insertions and evictions the policies' caches report.
+    """
+
     policies: List[Policy]
 
+    """
+    Cache of every policy whose changes are applied to the configuration, None before the first update.
+    """
+    _tracked_caches: List[Optional[CacheStore]]
+
+    def __init__(
+            self,
+            cache_count: int,
+            client_cache_connections: ClientCacheConnections,
+            catalog_size: int,
+            cache_size: int
+    ):
+        super().__init__(cache_count, client_cache_connections, catalog_size, cache_size)
+        self.configuration = np.zeros((cache_count, catalog_size + 1), dtype=np.int8)
+        self._tracked_caches = [None] * cache_count
+
     def update(self, requests: np.ndarray) -> None:
         super().update(requests)
-        cache_requests_map: Dict[int, set[int]] = dict()
-        for client, request in enumerate(requests):
-            for cache in self.client_cache_connections[client]:
-                if cache not in cache_requests_map:
-                    cache_requests_map[cache] = set()
-                cache_requests_map[cache].add(int(request))
-
-        for cache, requests in cache_requests_map.items():
-            requests = list(requests)
-            random.shuffle(requests)
-            for request in requests:
-                self.policies[cache].update(request)
-
-        self.configuration = np.zeros(self.configuration.shape)
-        for cache, policy in enumerate(self.policies):
-            for file in policy.cache:
-                if file is not None:
-                    self.configuration[cache][file] = 1
+        with phase("cache policies"):
+            for cache, cache_requests in self.incidence.route(requests):
+                cache_requests = list(set(cache_requests))
+                random.shuffle(cache_requests)
+                for request in cache_requests:
+                    self.policies[cache].update(request)
 
+        self._update_configuration()
 
+    """
+    Applies the changes of the caches to the configuration. A cache that was replaced rather than changed,
+    e.g. by a reset, is copied into the configuration and tracked from then on.
+    """
+    def _update_configuration(self) -> None:
+        for cache, policy in enumerate(self.policies):
+            if policy.cache is not self._tracked_caches[cache]:
+                self.configuration[cache] = 0
+                self.configuration[cache][policy.cache.get_items()] = 1
+                policy.cache.track_changes()
+                self._tracked_caches[cache] = policy.cache
+                continue
 
+            inserted, evicted = policy.cache.pop_changes()
+            self.configuration[cache][evicted] = 0
+            self.configuration[cache][inserted] = 1
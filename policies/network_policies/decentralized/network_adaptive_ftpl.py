@@ -2,6 +2,7 @@ from typing import List
 
 from factories.cache_factory import get_expert_iawm_policy
 from policies.expert_policies.iawm_policy import IAWMPolicy
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
 from policies.network_policies.decentralized.decentralized_policy import DecentralizedNetworkPolicy
 
 
@@ -12,7 +13,7 @@ class NetworkAdaptiveFTPL(DecentralizedNetworkPolicy):
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             cache_size: int,
             discount_rates: List[float],
@@ -1,6 +1,7 @@
 from typing import List
 
 from policies.ftpl_policy import FTPLPolicy
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
 from policies.network_policies.decentralized.decentralized_policy import DecentralizedNetworkPolicy
 
 
@@ -11,7 +12,7 @@ class NetworkFTPL(DecentralizedNetworkPolicy):
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             cache_size: int,
             time_horizon: int
@@ -1,6 +1,5 @@
-from typing import List
-
 from policies.lfu_policy import LFUPolicy
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
 from policies.network_policies.decentralized.decentralized_policy import DecentralizedNetworkPolicy
 
 
@@ -9,7 +8,7 @@ class NetworkLFU(DecentralizedNetworkPolicy):
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             cache_size: int
     ):
@@ -1,61 +1,274 @@
-from typing import List
+from typing import Optional, Tuple
 
 import numpy as np
+from scipy.special import ndtri
 
+from policies.network_policies.cache_rankings import CacheRankings
+from policies.network_policies.client_cache_incidence import ClientCacheConnections
+from policies.network_policies.client_request_counts import ClientRequestCounts
 from policies.network_policies.network_policy import NetworkPolicy
-from policies.network_policies.solvers.lead_cache_solver import get_opt_lead_cache, LeadCacheSolverParams
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolverParams, LeadCacheSolver, \
+    get_fractional_lead_cache, pipage_round
+from profiling import profiled
+
+
+class ResolveSchedule:
+    """
+    Decides at which time steps LeadCache solves the relaxation again. In between, the last rounded
+    configuration is kept. EVERY_STEP solves at every step, PERIODIC every resolve period steps and
+    RANKING_CHANGE whenever the top cache size items of a cache change, ranked by the unperturbed counts
+    summed over the clients of the cache, ties by item. The perturbation is only drawn to solve, since
+    fresh noise would change the ranking at every step.
+    """
+    EVERY_STEP: str = "every step"
+    PERIODIC: str = "periodic"
+    RANKING_CHANGE: str = "ranking change"
+
+
+def _get_top_normal_samples(population: int, count: int, rows: int) -> np.ndarray:
+    """
+    Draws the count largest of population standard normal samples, independently for every row, without
+    drawing the others. The top uniform order statistics are the products U_(n) = V_1^(1/n),
+    U_(n-1) = U_(n) V_2^(1/(n-1)), ... of independent uniforms, which are mapped with the inverse normal CDF.
+    They are computed as logarithms, so that values close to 1 keep their precision.
+
+    :param population: Number of samples
+    :param count: Number of largest samples to draw
+    :param rows: Number of rows
+    :return: Rows x count samples, in decreasing order
+    """
+    log_uniforms = np.cumsum(
+        np.log(np.random.uniform(size=(rows, count))) / (population - np.arange(count)),
+        axis=1
+    )
+    return -ndtri(-np.expm1(log_uniforms))
 
 
 class LeadCache(NetworkPolicy):
     """
     Regret-optimal caching policy for bi-partite networks with non-linear reward functions.
+    Counts are only kept for requested items, and the relaxation is only solved over the candidate items:
+    the requested items and representatives of the never requested ones. The perturbed counts of the never
+    requested items are pure noise, of which mostly the largest values of every client compete for the caches.
+    Every client gets cache size representatives, never requested items drawn uniformly at random, that carry
+    its cache size largest of the noise values of all never requested items, and plain noise values for the
+    other clients. This is a distributional approximation and not the dense perturbation: the top values of
+    every client are exact, but a never requested item whose noise summed over the clients of a cache is large
+    without being among the top values of any one client has no representative. If there are no more never
+    requested items than representatives, all of them are candidates with plain noise, which is exact.
     """
 
-    request_counts: np.ndarray
+    request_counts: ClientRequestCounts
+    catalog_size: int
     max_degree: int
 
+    """
+    One of the LeadCacheSolver values.
+    """
+    solver: str
+
+    """
+    If set, every solve starts from the previous fractional configuration.
+    """
+    warm_start: bool
+
+    """
+    One of the ResolveSchedule values.
+    """
+    resolve_schedule: str
+    resolve_period: int
+
+    """
+    Number of times the relaxation was solved.
+    """
+    solve_count: int
+
+    """
+    Solution of the last relaxation, before rounding, and the candidate items of its columns.
+    """
+    _fractional_configuration: Optional[np.ndarray]
+    _fractional_items: Optional[np.ndarray]
+
+    """
+    Top items of every cache at the last solve in item order, caches x cache size, padded with -1 and only
+    kept for RANKING_CHANGE.
+    """
+    _rankings: Optional[np.ndarray]
+
+    """
+    Top items of every cache, kept up to date as the requests are counted. None for schedules other than
+    RANKING_CHANGE and for policies that replace the counts instead of adding to them, which rank the items
+    of every cache from the counts.
+    """
+    _cache_rankings: Optional[CacheRankings]
+
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             max_degree: int,
-            cache_size: int
+            cache_size: int,
+            solver: str = LeadCacheSolver.SLSQP,
+            warm_start: bool = False,
+            resolve_schedule: str = ResolveSchedule.EVERY_STEP,
+            resolve_period: int = 1
     ):
+        """
+        :param cache_count: Number of caches
+        :param client_cache_connections: Caches of every client, as lists or as an incidence shared by policies
+        :param catalog_size: Catalog size
+        :param max_degree: Largest number of caches of a client
+        :param cache_size: Cache size
+        :param solver: One of the LeadCacheSolver values
+        :param warm_start: If set, every solve starts from the previous fractional configuration
+        :param resolve_schedule: One of the ResolveSchedule values
+        :param resolve_period: Number of steps between solves for PERIODIC
+        """
         super().__init__(cache_count, client_cache_connections, catalog_size, cache_size)
-        self.request_counts = np.ndarray((len(client_cache_connections), catalog_size))
+        assert solver in [LeadCacheSolver.SLSQP, LeadCacheSolver.LINEAR_PROGRAM]
+        assert resolve_schedule in [
+            ResolveSchedule.EVERY_STEP, ResolveSchedule.PERIODIC, ResolveSchedule.RANKING_CHANGE
+        ]
+        assert resolve_period > 0
+        self.solver = solver
+        self.warm_start = warm_start
+        self.resolve_schedule = resolve_schedule
+        self.resolve_period = resolve_period
+        self.configuration = np.zeros(self.configuration.shape, dtype=np.int8)
+        self.request_counts = ClientRequestCounts(self.incidence.client_count, catalog_size)
+        self.catalog_size = catalog_size
         self.max_degree = max_degree
+        self.solve_count = 0
+        self._fractional_configuration = None
+        self._fractional_items = None
+        self._rankings = None
+        self._cache_rankings = CacheRankings(cache_count, cache_size) \
+            if resolve_schedule == ResolveSchedule.RANKING_CHANGE else None
+
+    def get_name(self) -> str:
+        return self._get_schedule_name("LeadCache")
 
-    @staticmethod
-    def get_name() -> str:
-        return "LeadCache"
+    def get_solve_count(self) -> Optional[int]:
+        return self.solve_count
 
     def update(self, requests: np.ndarray) -> None:
         super().update(requests)
         self._update_counts(requests)
+        if self.resolve_schedule == ResolveSchedule.PERIODIC and (self.time - 1) % self.resolve_period != 0:
+            return
 
-        learning_rate = (len(self.client_cache_connections) ** 3 / 4) * np.sqrt(
+        if self.resolve_schedule == ResolveSchedule.RANKING_CHANGE and not self._update_rankings():
+            return
+
+        candidates, o_t = self._get_perturbed_counts()
+        params = LeadCacheSolverParams(
+            theta=o_t,
+            incidence=self.incidence,
+            catalog_size=candidates.size,
+            cache_count=self.cache_count,
+            cache_size=self.cache_size,
+            solver=self.solver,
+            initial=self._get_initial_configuration(candidates) if self.warm_start else None
+        )
+        self._fractional_configuration = get_fractional_lead_cache(params)
+        self._fractional_items = candidates
+        self.configuration[:] = 0
+        self.configuration[:, candidates] = pipage_round(self._fractional_configuration, params)
+        self.solve_count += 1
+
+    @profiled("perturbation")
+    def _get_perturbed_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Perturbs the counts of the candidate items.
+
+        :return: Candidate items and their perturbed counts, clients x candidates
+        """
+        learning_rate = (self.incidence.client_count ** 3 / 4) * np.sqrt(
             self.time / (self.cache_size * self.cache_count)
         ) / (
-                2 * self.max_degree * (np.log(self.request_counts.shape[1] / self.cache_size) + 1)
+                2 * self.max_degree * (np.log(self.catalog_size / self.cache_size) + 1)
         ) ** (1 / 4)
 
-        o_t = self.request_counts + np.random.normal(
-            loc=0,
-            scale=learning_rate,
-            size=self.request_counts.shape
-        )
-
-        self.configuration = get_opt_lead_cache(
-            LeadCacheSolverParams(
-                theta=o_t,
-                client_cache_map=self.client_cache_connections,
-                catalog_size=self.request_counts.shape[1],
-                cache_count=self.cache_count,
-                cache_size=self.cache_size
+        client_count = self.incidence.client_count
+        requested = self.request_counts.items
+        unrequested_count = self.catalog_size - requested.size
+        representative_count = min(client_count * self.cache_size, unrequested_count)
+        candidates = np.concatenate([requested, self.request_counts.get_random_unrequested_items(representative_count)])
+        counts = np.zeros((client_count, candidates.size))
+        counts[:, :requested.size] = self.request_counts.counts
+        noise = np.random.normal(loc=0, scale=learning_rate, size=counts.shape)
+        if representative_count < unrequested_count:
+            columns = requested.size + np.arange(representative_count).reshape((client_count, self.cache_size))
+            noise[np.arange(client_count)[:, None], columns] = learning_rate * _get_top_normal_samples(
+                unrequested_count, self.cache_size, client_count
             )
+        return candidates, counts + noise
+
+    def _get_initial_configuration(self, candidates: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Maps the last fractional configuration onto the columns of the candidates, new candidates start at 0.
+        """
+        if self._fractional_configuration is None:
+            return None
+        initial = np.zeros((self.cache_count, candidates.size))
+        _, columns, previous_columns = np.intersect1d(
+            candidates,
+            self._fractional_items,
+            assume_unique=True,
+            return_indices=True
         )
+        initial[:, columns] = self._fractional_configuration[:, previous_columns]
+        return initial
+
+    def _update_rankings(self) -> bool:
+        """
+        Updates the top items of every cache. Only the caches whose top items changed are ranked again if
+        the rankings are kept up to date, otherwise all caches are ranked from the counts.
+
+        :return: True if the top items of any cache changed since the last solve
+        """
+        if self._cache_rankings is None:
+            rankings = self._rank_caches()
+        else:
+            rankings = np.full((self.cache_count, self.cache_size), -1, dtype=np.int64) \
+                if self._rankings is None else np.copy(self._rankings)
+            for cache in self._cache_rankings.pop_changed_caches():
+                ranking = self._cache_rankings.get_ranking(cache)
+                rankings[cache] = -1
+                rankings[cache, :ranking.size] = ranking
+        if self._rankings is not None and np.array_equal(rankings, self._rankings):
+            return False
+        self._rankings = rankings
+        return True
+
+    def _rank_caches(self) -> np.ndarray:
+        """
+        Ranks the requested items of every cache by the counts of its clients, ties by item. Items without
+        requests from the clients of a cache are left out of its ranking.
+
+        :return: Top items of every cache in item order, caches x cache size, padded with -1
+        """
+        items = self.request_counts.items
+        cache_counts = np.asarray(self.incidence.matrix.T @ self.request_counts.counts)
+        rankings = np.full((self.cache_count, self.cache_size), -1, dtype=np.int64)
+        for cache, counts in enumerate(cache_counts):
+            top = np.lexsort((items, -counts))[:self.cache_size]
+            top = top[counts[top] > 0]
+            rankings[cache, :top.size] = np.sort(items[top])
+        return rankings
+
+    def _get_schedule_name(self, name: str) -> str:
+        if self.resolve_schedule == ResolveSchedule.PERIODIC:
+            name = f'{name}, every {self.resolve_period} steps'
+        elif self.resolve_schedule == ResolveSchedule.RANKING_CHANGE:
+            name = f'{name}, on ranking change'
+        return f'{name}, warm start' if self.warm_start else name
 
     def _update_counts(self, requests: np.ndarray) -> None:
         for client, request in enumerate(requests):
-            self.request_counts[client][round(request)] += 1
+            item = round(request)
+            self.request_counts.add(client, item)
+            if self._cache_rankings is not None:
+                for cache in self.incidence.get_caches(client).tolist():
+                    self._cache_rankings.add(cache, item)
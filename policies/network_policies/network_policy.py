@@ -1,12 +1,15 @@
-from typing import List
+from typing import Optional
 
 import numpy as np
 
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence, ClientCacheConnections
+from policies.snapshotable import Snapshotable
 
-class NetworkPolicy:
+
+class NetworkPolicy(Snapshotable):
 
     cache_count: int
-    client_cache_connections: List[List[int]]
+    incidence: ClientCacheIncidence
     time: int
     cache_size: int
     configuration: np.ndarray
@@ -15,12 +18,18 @@ class NetworkPolicy:
     def __init__(
             self,
             cache_count: int,
-            client_cache_connections: List[List[int]],
+            client_cache_connections: ClientCacheConnections,
             catalog_size: int,
             cache_size: int
     ):
+        """
+        :param cache_count: Number of caches
+        :param client_cache_connections: Caches of every client, as lists or as an incidence shared by policies
+        :param catalog_size: Catalog size
+        :param cache_size: Cache size
+        """
         self.cache_count = cache_count
-        self.client_cache_connections = client_cache_connections
+        self.incidence = ClientCacheIncidence.get(client_cache_connections, cache_count)
         self.cache_size = cache_size
         self.configuration = np.zeros((cache_count, catalog_size + 1))
         self.time = 0
@@ -30,6 +39,12 @@ class NetworkPolicy:
     def get_name() -> str:
         pass
 
+    def get_solve_count(self) -> Optional[int]:
+        """
+        :return: Number of optimization problems solved so far, None for policies that do not solve any
+        """
+        return None
+
     def update(self, requests: np.ndarray) -> None:
         """
         Updates the cache configuration from new requests.
@@ -41,8 +56,4 @@ class NetworkPolicy:
         self.time += 1
 
     def _update_reward(self, requests: np.ndarray) -> None:
-        for client, request in enumerate(requests):
-            self.reward += len(list(filter(
-                lambda connection: round(self.configuration[connection][round(request)]) == 1,
-                self.client_cache_connections[client]
-            )))
+        self.reward += self.incidence.get_hits(self.configuration, requests)
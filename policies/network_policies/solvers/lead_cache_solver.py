@@ -1,35 +1,212 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 import numpy as np
-from scipy.optimize import minimize
+from scipy.optimize import minimize, linprog
+from scipy.sparse import csr_matrix, vstack, hstack, identity
+
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence
+from profiling import profiled, count
+
+
+INTEGRALITY_TOLERANCE: float = 0.0001
+
+
+class LeadCacheSolver:
+    """
+    Solvers of the relaxation. SLSQP maximizes the concave objective directly, the linear program replaces
+    every min(1, sum of y) term with a variable bounded by both and is solved with HiGHS.
+    """
+    SLSQP: str = "slsqp"
+    LINEAR_PROGRAM: str = "linear program"
 
 
 @dataclass
 class LeadCacheSolverParams:
     theta: np.ndarray
-    client_cache_map: List[List[int]]
+    incidence: ClientCacheIncidence
     cache_size: int
     catalog_size: int
     cache_count: int
+    solver: str = LeadCacheSolver.SLSQP
+
+    """
+    Fractional configuration to start SLSQP from, zeros if not set. HiGHS does not take a starting point.
+    """
+    initial: Optional[np.ndarray] = None
 
 
-def get_opt_lead_cache(params: LeadCacheSolverParams) -> np.ndarray:
+def get_linear_program_configuration(params: LeadCacheSolverParams) -> np.ndarray:
     """
-    Gets the optimal non-integral cache configuration.
+    Solves the relaxation as the linear program
+    max sum theta+_if z_if, s.t. z_if <= sum_(j in N(i)) y_jf, sum_f y_jf <= cache size, 0 <= y, z <= 1.
+    Only pairs with a positive theta get a variable z, the other pairs do not change the objective.
 
     :param params: Cache solver parameters
     :return: Optimal non-integral configuration
     """
+    configuration_size = params.cache_count * params.catalog_size
+    clients, files = np.nonzero(params.theta > 0)
+    client_caches = params.incidence.matrix[clients]
+    degrees = np.diff(client_caches.indptr)
+
+    coverage = csr_matrix(
+        (
+            -client_caches.data,
+            (
+                np.repeat(np.arange(clients.size), degrees),
+                client_caches.indices * params.catalog_size + np.repeat(files, degrees)
+            )
+        ),
+        shape=(clients.size, configuration_size)
+    )
+    cache_sizes = csr_matrix(
+        (
+            np.ones(configuration_size),
+            (np.repeat(np.arange(params.cache_count), params.catalog_size), np.arange(configuration_size))
+        ),
+        shape=(params.cache_count, configuration_size)
+    )
+    constraints = vstack([
+        hstack([coverage, identity(clients.size, format='csr')]),
+        hstack([cache_sizes, csr_matrix((params.cache_count, clients.size))])
+    ], format='csr')
+
+    result = linprog(
+        c=np.concatenate([np.zeros(configuration_size), -params.theta[clients, files]]),
+        A_ub=constraints,
+        b_ub=np.concatenate([np.zeros(clients.size), np.full(params.cache_count, params.cache_size)]),
+        bounds=(0, 1),
+        method='highs'
+    )
+    assert result.success, result.message
+    count("solver iterations", result.nit)
+    return np.clip(result.x[:configuration_size], 0, 1).reshape((params.cache_count, params.catalog_size))
+
+
+@dataclass
+class _CacheNeighbourhood:
+    """
+    Clients of a cache and the caches of those clients, as concatenated rows of the incidence matrix.
+    """
+    clients: np.ndarray
+    caches: np.ndarray
+    row_starts: np.ndarray
+    is_cache: np.ndarray
+
+
+def _get_cache_neighbourhoods(incidence: ClientCacheIncidence) -> List[_CacheNeighbourhood]:
+    neighbourhoods = []
+    for cache in range(incidence.cache_count):
+        clients = np.unique(incidence.get_clients(cache))
+        rows = incidence.matrix[clients]
+        neighbourhoods.append(_CacheNeighbourhood(
+            clients=clients,
+            caches=rows.indices,
+            row_starts=rows.indptr[:-1],
+            is_cache=rows.indices == cache
+        ))
+    return neighbourhoods
+
+
+def _is_integral(value: float) -> bool:
+    return abs(round(value) - value) < INTEGRALITY_TOLERANCE
+
+
+def _get_pipage_step(
+        configuration: np.ndarray,
+        objective_constant: np.ndarray,
+        neighbourhood: _CacheNeighbourhood,
+        cache: int,
+        files: List[int]
+) -> np.ndarray:
+    """
+    Gets the new values of two fractional files of a cache. The mass moves from one file to the other until
+    one of them is integral, in the direction that gives the larger rounding objective
+    sum theta+_if (1 - prod_(j in N(i)) (1 - y_jf)). Only the terms of the cache's clients for the two files
+    differ between the directions, so only those are computed.
+
+    :return: New values of the files
+    """
+    y_1, y_2 = configuration[cache, files]
+    e_1 = min(y_1, 1 - y_2)
+    e_2 = min(1 - y_1, y_2)
+    candidates = np.array([[y_1 - e_1, y_2 + e_1], [y_1 + e_2, y_2 - e_2]])
+
+    if neighbourhood.clients.size == 0:
+        return candidates[0]
+    factors = np.tile(1 - configuration[neighbourhood.caches[:, None], files], 2)
+    factors[neighbourhood.is_cache] = 1 - candidates.ravel()
+    products = np.multiply.reduceat(factors, neighbourhood.row_starts, axis=0)
+    terms = np.tile(objective_constant[neighbourhood.clients[:, None], files], 2) * (1 - products)
+    objectives = terms.sum(axis=0)
+    return candidates[0] if objectives[0] + objectives[1] >= objectives[2] + objectives[3] else candidates[1]
+
+
+@profiled("pipage rounding")
+def pipage_round(configuration: np.ndarray, params: LeadCacheSolverParams) -> np.ndarray:
+    """
+    Rounds a fractional configuration without decreasing the rounding objective in expectation. Caches take
+    turns: each turn moves mass between the two lowest fractional files of a cache until one is integral, a
+    last fractional file is rounded. Values within INTEGRALITY_TOLERANCE of an integer count as integral.
+
+    :param configuration: Fractional caches x catalog configuration
+    :param params: Cache solver parameters
+    :return: Integral configuration
+    """
+    configuration = np.copy(configuration)
+    is_integral = np.abs(np.round(configuration) - configuration) < INTEGRALITY_TOLERANCE
+    configuration[is_integral] = np.round(configuration[is_integral])
+
+    objective_constant = np.maximum(params.theta, 0)
+    neighbourhoods = _get_cache_neighbourhoods(params.incidence)
+    """
+    Fractional files of every cache, the lowest last.
+    """
+    fractionals = [np.flatnonzero(~is_integral[cache])[::-1].tolist() for cache in range(configuration.shape[0])]
+    active_caches = [cache for cache in range(configuration.shape[0]) if len(fractionals[cache]) > 0]
+    while len(active_caches) > 0:
+        for cache in active_caches:
+            files = fractionals[cache]
+            if len(files) == 1:
+                configuration[cache, files[0]] = np.around(configuration[cache, files[0]])
+                files.pop()
+                continue
+
+            fractional_count = len(files)
+            lowest_files = [files.pop(), files.pop()]
+            configuration[cache, lowest_files] = _get_pipage_step(
+                configuration, objective_constant, neighbourhoods[cache], cache, lowest_files
+            )
+            for file in reversed(lowest_files):
+                if _is_integral(configuration[cache, file]):
+                    configuration[cache, file] = round(configuration[cache, file])
+                else:
+                    files.append(file)
+            assert len(files) < fractional_count
+        active_caches = [cache for cache in active_caches if len(fractionals[cache]) > 0]
+
+    return configuration
+
+
+@profiled("relaxation")
+def get_fractional_lead_cache(params: LeadCacheSolverParams) -> np.ndarray:
+    """
+    Solves the relaxation with the solver of the parameters.
+
+    :param params: Cache solver parameters
+    :return: Optimal non-integral configuration
+    """
+    if params.solver == LeadCacheSolver.LINEAR_PROGRAM:
+        return get_linear_program_configuration(params)
+
     cache_shape = (params.cache_count, params.catalog_size)
 
-    objective_constant = np.maximum(params.theta, np.zeros(params.theta.shape))
+    objective_constant = np.maximum(params.theta, 0)
 
     def objective(cache_configuration: np.ndarray) -> float:
         cache_configuration = cache_configuration.reshape(cache_shape)
-        z = np.ones((len(params.client_cache_map), params.catalog_size))
-        for i in range(len(params.client_cache_map)):
-            z[i] = np.minimum(z[i], cache_configuration[params.client_cache_map[i]].sum(axis=0))
+        z = np.minimum(1, params.incidence.get_coverage(cache_configuration))
 
         return -np.sum(objective_constant * z)
 
@@ -42,63 +219,9 @@ def get_opt_lead_cache(params: LeadCacheSolverParams) -> np.ndarray:
         """
         return params.cache_size - np.sum(cache)
 
-    def is_integral(configuration: np.ndarray, cache: int, file: int) -> bool:
-        was_integral = abs(round(configuration[cache][file]) - configuration[cache][file]) < 0.0001
-        if was_integral:
-            configuration[cache][file] = round(configuration[cache][file])
-        return was_integral
-
-    def round_and_check_is_integral(configuration: np.ndarray) -> bool:
-        for c in range(configuration.shape[0]):
-            for f in range(configuration.shape[1]):
-                if not is_integral(configuration, c, f):
-                    return False
-        return True
-
-    def get_updated_configuration(configuration: np.ndarray, cache: int, non_integrals: List[int]) -> np.ndarray:
-
-        def round_objective(y: np.ndarray) -> float:
-            total = 0
-            for i, o in enumerate(params.theta):
-                o_i = np.maximum(np.zeros(o.size), o)
-                for f, o_i_f in enumerate(o_i):
-                    connected_product = 1
-                    for connected_cache in params.client_cache_map[i]:
-                        connected_product *= 1 - y[connected_cache][f]
-                    total += o_i_f * (1 - connected_product)
-            return total
-
-        assert len(non_integrals) == 2
-        non_integral_cache = configuration[cache]
-        y_1, y_2 = non_integrals[0], non_integrals[1]
-        y_1_value, y_2_value = non_integral_cache[y_1], non_integral_cache[y_2]
-        e_1 = min([y_1_value, 1 - y_2_value])
-        e_2 = min([1 - y_1_value, y_2_value])
-        a = np.copy(configuration)
-        b = np.copy(configuration)
-        a[cache][y_1] = y_1_value - e_1
-        a[cache][y_2] = y_2_value + e_1
-        b[cache][y_1] = y_1_value + e_2
-        b[cache][y_2] = y_2_value - e_2
-        return max([a, b], key=lambda config: round_objective(config))
-
-    def pipage_round(configuration: np.ndarray) -> np.ndarray:
-        while not round_and_check_is_integral(configuration):
-            for c in range(configuration.shape[0]):
-                fractionals = []
-                for f in range(configuration.shape[1]):
-                    if not is_integral(configuration, c, f):
-                        fractionals.append(f)
-                    if len(fractionals) == 2:
-                        configuration = get_updated_configuration(configuration, c, fractionals)
-                        break
-                if len(fractionals) == 1:
-                    configuration[c] = np.around(configuration[c])
-
-        return configuration
-
     flattened_configuration_size = params.catalog_size * params.cache_count
-    initial = np.zeros(flattened_configuration_size)
+    initial = np.zeros(flattened_configuration_size) if params.initial is None \
+        else np.clip(params.initial, 0, 1).ravel()
     bounds = tuple([(0, 1)] * flattened_configuration_size)
     constraints = list(map(lambda c: {
             'type': 'ineq',
@@ -107,4 +230,15 @@ def get_opt_lead_cache(params: LeadCacheSolverParams) -> np.ndarray:
             )
         }, range(params.cache_count)))
     solution = minimize(objective, initial, bounds=bounds, constraints=constraints)
-    return pipage_round(solution.x.reshape(cache_shape))
+    count("solver iterations", solution.nit)
+    return solution.x.reshape(cache_shape)
+
+
+def get_opt_lead_cache(params: LeadCacheSolverParams) -> np.ndarray:
+    """
+    Gets the optimal integral cache configuration, by rounding the solution of the relaxation.
+
+    :param params: Cache solver parameters
+    :return: Optimal integral configuration
+    """
+    return pipage_round(get_fractional_lead_cache(params), params)
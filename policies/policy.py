@@ -1,12 +1,19 @@
+import time
+from typing import Optional
+
 import numpy as np
 
+from policies.cache_store import CacheStore
+from policies.snapshotable import Snapshotable
+from profiling import get_profiler, profiled, Profiler
+
 
-class Policy:
+class Policy(Snapshotable):
 
     """
-    Cache of objects. None elements represent free slots.
+    Cache of items with O(1) lookup, insertion and eviction.
     """
-    cache: np.ndarray
+    cache: CacheStore
 
     """
     Current time.
@@ -15,7 +22,7 @@ class Policy:
 
     def __init__(self, capacity: int):
         self.time = 0
-        self.cache = np.empty(capacity, dtype=object)
+        self.cache = CacheStore(capacity)
 
     @staticmethod
     def get_name() -> str:
@@ -27,13 +34,60 @@ class Policy:
     def update(self, request: int) -> None:
         self.advance_time()
 
+    @profiled("run_trace")
+    def run_trace(self, trace: np.ndarray) -> np.ndarray:
+        """
+        Serves the requests in order, as is_present followed by update for every request would.
+        Policies override this with faster loops that leave them in an equivalent state, timed as a
+        run_trace phase as well.
+
+        :param trace: Requests
+        :return: Whether each request was a hit
+        """
+        return self._serve_requests(trace)
+
+    """
+    Serves the requests with is_present and update, timing both if profiling is enabled.
+    """
+    def _serve_requests(self, trace: np.ndarray) -> np.ndarray:
+        profiler = get_profiler()
+        if profiler is not None:
+            return self._run_profiled_trace(trace, profiler)
+
+        hits = np.zeros(trace.size, dtype=bool)
+        for index, request in enumerate(trace):
+            hits[index] = self.is_present(request)
+            self.update(request)
+        return hits
+
+    """
+    Serves the requests like run_trace, timing is_present and update separately.
+    """
+    def _run_profiled_trace(self, trace: np.ndarray, profiler: Profiler) -> np.ndarray:
+        hits = np.zeros(trace.size, dtype=bool)
+        lookup_seconds = 0.0
+        for index, request in enumerate(trace):
+            start = time.perf_counter()
+            hits[index] = self.is_present(request)
+            lookup_seconds += time.perf_counter() - start
+            with profiler.phase("update"):
+                self.update(request)
+        profiler.add("is_present", lookup_seconds, trace.size)
+        return hits
+
     """
     Resets the cache, deleting all entries.
     """
     def reset(self) -> None:
-        self.cache = np.empty(len(self.cache), dtype=object)
+        self.cache = CacheStore(self.cache.size)
         self.time = 1
 
+    """
+    Seeds the random generator of the policy, for policies that keep their own.
+    """
+    def seed_random(self, seed: Optional[int] = None) -> None:
+        pass
+
     """
     Checks if a file is present in the cache.
     """
@@ -41,10 +95,10 @@ class Policy:
         return file in self.cache
 
     """
-    Checks if the cache is full, i.e if it has any None elements which represent free slots.
+    Checks if the cache is full, i.e if it has no free slots.
     """
     def is_full(self) -> bool:
-        return None not in self.cache
+        return self.cache.is_full()
 
     """
     Advances time.
@@ -0,0 +1,54 @@
+import copy
+import random
+from typing import Dict, Any, TypeVar
+
+import numpy as np
+
+
+S = TypeVar('S', bound='Snapshotable')
+
+RANDOM_STATE: str = "random_state"
+NUMPY_RANDOM_STATE: str = "numpy_random_state"
+
+
+class Snapshotable:
+    """
+    Allows saving and restoring the complete state of a policy, e.g. request counts, expert losses
+    and weights, cache contents and time. Policies draw their noise from the global random states of the
+    random module and of NumPy, so snapshots carry those too.
+    """
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Gets a copy of the current state, which is not affected by later updates, together with the
+        current global random states.
+
+        :return: Snapshot of the state
+        """
+        return {
+            "state": copy.deepcopy(vars(self)),
+            RANDOM_STATE: random.getstate(),
+            NUMPY_RANDOM_STATE: np.random.get_state()
+        }
+
+    def restore_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Restores the state from a snapshot, the snapshot itself can be restored again later. The global
+        random states are restored as well, so that the policy continues with the same random sequence.
+        This also resets them for everything else that draws from them, e.g. other policies on threads.
+
+        :param snapshot: Snapshot obtained with get_snapshot
+        :return: None
+        """
+        self.__dict__ = copy.deepcopy(snapshot["state"])
+        random.setstate(snapshot[RANDOM_STATE])
+        np.random.set_state(snapshot[NUMPY_RANDOM_STATE])
+
+    def fork(self: S) -> S:
+        """
+        Gets an independent copy that continues from the current state. The global random states are not
+        copied, forks that draw noise continue the shared random sequence.
+
+        :return: Forked copy
+        """
+        return copy.deepcopy(self)
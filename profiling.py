@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, Tuple, List, Optional, Iterator, ContextManager, Callable, TypeVar
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass
+class PhaseRecord:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class Profile:
+    """
+    Wall time and call count of every phase, keyed by the path of nested phases that led to it, and totals
+    of the counted events, e.g. solver iterations.
+    """
+    phases: Dict[Tuple[str, ...], PhaseRecord] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    """
+    Peak traced memory in bytes while profiling if tracemalloc was tracing, otherwise the peak resident memory
+    of the process over its lifetime. Both are process-wide: policies profiled concurrently on threads all
+    report the same peak, so the value only describes one policy if it ran alone in its process, e.g. with
+    the process backend.
+    """
+    peak_memory: int = 0
+
+    def get_self_seconds(self, path: Tuple[str, ...]) -> float:
+        """
+        :return: Time spent in the phase outside of its nested phases
+        """
+        children = sum(
+            record.seconds for child, record in self.phases.items()
+            if len(child) == len(path) + 1 and child[:len(path)] == path
+        )
+        return max(self.phases[path].seconds - children, 0.0)
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": [
+                {"path": list(path), "calls": record.calls, "seconds": record.seconds}
+                for path, record in self.phases.items()
+            ],
+            "counters": dict(self.counters),
+            "peak_memory": self.peak_memory
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_folded_stacks(self) -> str:
+        """
+        Gets the phases in the folded stack format of flame graph tools, one "a;b;c microseconds" line per
+        phase, weighted by the time spent outside of nested phases.
+
+        :return: Folded stacks
+        """
+        return "\n".join(
+            f'{";".join(path)} {round(self.get_self_seconds(path) * 1e6)}'
+            for path in self.phases
+        )
+
+
+class Profiler:
+    """
+    Records the phases entered on one thread. Phases nest, and a phase entered within another one is
+    recorded under the path of both.
+    """
+
+    profile: Profile
+    _stack: List[str]
+
+    def __init__(self):
+        self.profile = Profile()
+        self._stack = []
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self._stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(tuple(self._stack), time.perf_counter() - start, 1)
+            self._stack.pop()
+
+    def add(self, name: str, seconds: float, calls: int) -> None:
+        """
+        Records time measured by a caller, e.g. summed over a loop, as a phase nested in the current one.
+
+        :param name: Phase name
+        :param seconds: Wall time
+        :param calls: Number of calls
+        :return: None
+        """
+        self._record(tuple(self._stack) + (name,), seconds, calls)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.profile.counters[name] = self.profile.counters.get(name, 0) + amount
+
+    def finish(self) -> Profile:
+        if tracemalloc.is_tracing():
+            self.profile.peak_memory = tracemalloc.get_traced_memory()[1]
+        elif resource is not None:
+            self.profile.peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return self.profile
+
+    def _record(self, path: Tuple[str, ...], seconds: float, calls: int) -> None:
+        record = self.profile.phases.get(path)
+        if record is None:
+            record = self.profile.phases[path] = PhaseRecord()
+        record.calls += calls
+        record.seconds += seconds
+
+
+Function = TypeVar('Function', bound=Callable)
+
+
+class _ThreadState(threading.local):
+    """
+    Profiler of every thread, None by default so that checking for it is a plain attribute lookup.
+    """
+    profiler: Optional[Profiler] = None
+
+
+_state = _ThreadState()
+_NO_PHASE = nullcontext()
+
+
+def get_profiler() -> Optional[Profiler]:
+    """
+    :return: Profiler of the current thread, None if profiling is disabled
+    """
+    return _state.profiler
+
+
+@contextmanager
+def profiling(enabled: bool = True) -> Iterator[Optional[Profiler]]:
+    """
+    Enables profiling on the current thread, restoring the previous profiler afterwards.
+
+    :param enabled: If not set, profiling stays disabled and None is yielded
+    :return: Profiler, finished when the context exits
+    """
+    if not enabled:
+        yield None
+        return
+
+    previous = get_profiler()
+    profiler = _state.profiler = Profiler()
+    try:
+        yield profiler
+    finally:
+        profiler.finish()
+        _state.profiler = previous
+
+
+def phase(name: str) -> ContextManager:
+    """
+    Times the enclosed code as a phase of the current profiler, does nothing if profiling is disabled.
+    """
+    profiler = get_profiler()
+    return _NO_PHASE if profiler is None else profiler.phase(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    profiler = get_profiler()
+    if profiler is not None:
+        profiler.count(name, amount)
+
+
+def profiled(name: str) -> Callable[[Function], Function]:
+    """
+    Decorates a function so that every call is timed as a phase, only checks if profiling is enabled otherwise.
+
+    :param name: Phase name
+    :return: Decorator
+    """
+    def decorator(function: Function) -> Function:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+from typing import Dict
+
+import numpy as np
+
+
+class OptimalStaticTracker:
+    """
+    Incrementally tracks the hits of the optimal static cache configuration, i.e. the sum of the
+    request counts of the cache_size most requested items seen so far.
+
+    Counts only ever grow by one, so the top-k sum grows by one exactly when the requested item's
+    previous count is at least the k-th largest count. Keeping a histogram of counts is enough to
+    maintain the k-th largest count, which makes every update O(1).
+    """
+
+    cache_size: int
+
+    """
+    Number of hits the optimal static configuration would have had so far.
+    """
+    hits: int
+
+    """
+    Maps an item to how many times it has been requested.
+    """
+    _counts: Dict[int, int]
+
+    """
+    Maps a request count to the number of items with exactly that count.
+    """
+    _count_frequencies: Dict[int, int]
+
+    """
+    The k-th largest count, items with a count of at least this value form the optimal configuration.
+    """
+    _threshold: int
+
+    """
+    Number of items with a count strictly larger than the threshold, always smaller than the cache size.
+    """
+    _above_threshold: int
+
+    def __init__(self, cache_size: int):
+        assert cache_size > 0
+        self.cache_size = cache_size
+        self.reset()
+
+    def update(self, request: int) -> bool:
+        """
+        Registers a new request.
+
+        :param request: Requested item
+        :return: Whether the request was a hit for the optimal static configuration
+        """
+        request = int(request)
+        count = self._counts.get(request, 0)
+        is_hit = count >= self._threshold
+        if is_hit:
+            self.hits += 1
+
+        self._counts[request] = count + 1
+        if count > 0:
+            self._count_frequencies[count] -= 1
+        self._count_frequencies[count + 1] = self._count_frequencies.get(count + 1, 0) + 1
+
+        if count == self._threshold:
+            self._above_threshold += 1
+            if self._above_threshold == self.cache_size:
+                self._threshold += 1
+                self._above_threshold -= self._count_frequencies[self._threshold]
+
+        return is_hit
+
+    def run_trace(self, requests: np.ndarray) -> np.ndarray:
+        """
+        Registers a segment of requests at once, as update for every request would.
+
+        The request with in-segment occurrence j of an item with prior count c raises that item to count
+        c + j + 1, and every request raises exactly one item by one. The threshold reaches a count v > the
+        current threshold once cache_size items have a count of at least v, i.e. at the request that raises
+        the (cache_size - items already at v)-th item to v. Those times are found for all v with one sort.
+
+        :param requests: Requested items
+        :return: Whether each request was a hit for the optimal static configuration
+        """
+        requests = np.asarray(requests, dtype=np.int64)
+        if requests.size == 0:
+            return np.zeros(0, dtype=bool)
+
+        order = np.argsort(requests, kind='stable')
+        sorted_requests = requests[order]
+        group_starts = np.flatnonzero(np.diff(sorted_requests, prepend=sorted_requests[0] - 1))
+        segment_counts = np.diff(group_starts, append=requests.size)
+        items = sorted_requests[group_starts].tolist()
+        prior_counts = np.array([self._counts.get(item, 0) for item in items], dtype=np.int64)
+        counts_before = np.empty(requests.size, dtype=np.int64)
+        counts_before[order] = \
+            np.repeat(prior_counts - group_starts, segment_counts) + np.arange(requests.size)
+
+        raising = np.flatnonzero(counts_before + 1 > self._threshold)
+        raised_counts = counts_before[raising] + 1
+        order = np.argsort(raised_counts * requests.size + raising)
+        raising, raised_counts = raising[order], raised_counts[order]
+        levels, level_starts, level_sizes = np.unique(raised_counts, return_index=True, return_counts=True)
+        missing = self.cache_size - self._get_items_with_count_at_least(levels)
+        reached = level_sizes >= missing
+        threshold_times = raising[level_starts[reached] + missing[reached] - 1]
+
+        thresholds = self._threshold + np.searchsorted(threshold_times, np.arange(requests.size), side='left')
+        is_hit = counts_before >= thresholds
+
+        new_counts = prior_counts + segment_counts
+        self._counts.update(zip(items, new_counts.tolist()))
+        for count, number in zip(*np.unique(prior_counts[prior_counts > 0], return_counts=True)):
+            self._count_frequencies[int(count)] -= int(number)
+        for count, number in zip(*np.unique(new_counts, return_counts=True)):
+            self._count_frequencies[int(count)] = self._count_frequencies.get(int(count), 0) + int(number)
+        self._threshold += threshold_times.size
+        self._above_threshold = sum(
+            number for count, number in self._count_frequencies.items() if count > self._threshold
+        )
+        self.hits += int(np.count_nonzero(is_hit))
+        return is_hit
+
+    def get_hits(self) -> int:
+        """
+        Gets the hits of the optimal static configuration over all requests seen so far.
+
+        :return: Optimal static hits
+        """
+        return self.hits
+
+    def reset(self) -> None:
+        """
+        Forgets all requests.
+
+        :return: None
+        """
+        self.hits = 0
+        self._counts = dict()
+        self._count_frequencies = dict()
+        self._threshold = 0
+        self._above_threshold = 0
+
+    def _get_items_with_count_at_least(self, counts: np.ndarray) -> np.ndarray:
+        frequency_counts = np.array(sorted(self._count_frequencies), dtype=np.int64)
+        frequencies = np.array([self._count_frequencies[count] for count in frequency_counts.tolist()], dtype=np.int64)
+        items_at_least = np.append(np.cumsum(frequencies[::-1])[::-1], 0)
+        return items_at_least[np.searchsorted(frequency_counts, counts, side='left')]
@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field, asdict
+from itertools import product
+from typing import List, Optional, Tuple, Iterable
+
+import numpy as np
+import pandas as pd
+
+from data.loaders import Dataset
+from factories.cache_factory import PolicyType, get_policy
+from policies.policy import Policy
+
+
+@dataclass
+class SweepGrid:
+    """
+    Declarative description of a parameter sweep, every combination of the lists becomes a job.
+    Discount rate sets only multiply the jobs of expert policies. With a warm-up, jobs that only differ
+    in their seed replay the first warm_up requests once and fork from that state.
+    """
+    datasets: List[Dataset]
+    cache_sizes: List[int]
+    policy_types: List[str]
+    discount_rate_sets: List[List[float]] = field(default_factory=lambda: [[1.0]])
+    seeds: List[int] = field(default_factory=lambda: [0])
+    trace_length: Optional[int] = None
+    warm_up: int = 0
+
+
+@dataclass
+class SweepJob:
+    dataset: int
+    dataset_name: str
+    catalog_size: int
+    time_horizon: int
+    policy_type: str
+    cache_size: int
+    discount_rates: Optional[Tuple[float, ...]]
+    seed: int
+
+    def get_policy(self) -> Policy:
+        return get_policy(
+            self.policy_type,
+            self.cache_size,
+            self.catalog_size,
+            self.time_horizon,
+            [] if self.discount_rates is None else list(self.discount_rates)
+        )
+
+    def get_estimated_cost(self) -> float:
+        """
+        Gets a rough, relative estimate of the job's running time, used to schedule long jobs first.
+
+        :return: Estimated cost
+        """
+        if self.policy_type in [PolicyType.LRU, PolicyType.LFU]:
+            return self.time_horizon * self.cache_size
+        ftpl_cost = self.catalog_size * np.log2(max(self.catalog_size, 2))
+        if self.discount_rates is None:
+            return self.time_horizon * ftpl_cost
+        return self.time_horizon * ftpl_cost * (len(set(self.discount_rates) | {1.0}))
+
+
+@dataclass
+class SweepResult:
+    dataset: str
+    catalog_size: int
+    time_horizon: int
+    policy: str
+    cache_size: int
+    discount_rates: Optional[Tuple[float, ...]]
+    seed: int
+    hit_ratio: float
+    regret: float
+    seconds: float
+
+
+def get_sweep_jobs(grid: SweepGrid) -> List[SweepJob]:
+    """
+    Expands the grid into jobs, ordered by decreasing estimated cost.
+
+    :param grid: Sweep grid
+    :return: Jobs, longest first
+    """
+    jobs: List[SweepJob] = []
+    for (index, dataset), cache_size, policy_type, seed in product(
+            enumerate(grid.datasets),
+            grid.cache_sizes,
+            grid.policy_types,
+            grid.seeds
+    ):
+        time_horizon = dataset.trace.size if grid.trace_length is None else min(grid.trace_length, dataset.trace.size)
+        discount_rate_sets = list(map(tuple, grid.discount_rate_sets)) \
+            if policy_type in PolicyType.EXPERTS \
+            else [None]
+        for discount_rates in discount_rate_sets:
+            jobs.append(SweepJob(
+                dataset=index,
+                dataset_name=dataset.name,
+                catalog_size=dataset.catalog_size,
+                time_horizon=time_horizon,
+                policy_type=policy_type,
+                cache_size=cache_size,
+                discount_rates=discount_rates,
+                seed=seed
+            ))
+
+    return sorted(jobs, key=lambda job: job.get_estimated_cost(), reverse=True)
+
+
+def get_sweep_table(results: Iterable[SweepResult]) -> pd.DataFrame:
+    """
+    Collects sweep results into a table with one row per job.
+
+    :param results: Sweep results, for example as they are streamed by SimulationRunner.run_sweep
+    :return: Results table
+    """
+    return pd.DataFrame(map(asdict, results), columns=list(SweepResult.__dataclass_fields__))
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple, Callable, Iterator, TypeVar
+
+import numpy as np
+
+
+T = TypeVar('T')
+
+
+@dataclass
+class SharedTrace:
+    """
+    Describes a trace placed in shared memory. Only the description is pickled when it is sent to a
+    worker process, the worker attaches to the memory block without copying the trace.
+    """
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@contextmanager
+def share_trace(trace: np.ndarray) -> Iterator[SharedTrace]:
+    """
+    Copies the trace into a shared memory block that lives until the context is exited.
+
+    :param trace: Trace of any shape with a numeric dtype
+    :return: Description of the shared trace
+    """
+    assert trace.dtype != object, "Only numeric traces can be placed in shared memory."
+    memory = SharedMemory(create=True, size=max(trace.nbytes, 1))
+    try:
+        np.ndarray(trace.shape, dtype=trace.dtype, buffer=memory.buf)[...] = trace
+        yield SharedTrace(memory.name, trace.shape, trace.dtype.str)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def run_with_shared_trace(shared_trace: SharedTrace, function: Callable[..., T], *args) -> T:
+    """
+    Attaches to a shared trace and calls the function with it as the first argument. The function must
+    not keep references to the trace after returning.
+
+    :param shared_trace: Description of the shared trace
+    :param function: Function to call
+    :param args: Remaining arguments of the function
+    :return: Result of the function
+    """
+    memory = SharedMemory(name=shared_trace.name)
+    try:
+        return function(np.ndarray(shared_trace.shape, dtype=shared_trace.dtype, buffer=memory.buf), *args)
+    finally:
+        memory.close()
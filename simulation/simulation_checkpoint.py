@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import random
+from dataclasses import dataclass
+from typing import Any, List, Tuple, TypeVar
+
+import numpy as np
+
+from policies.network_policies.network_policy import NetworkPolicy
+from policies.policy import Policy
+from simulation.optimal_static_tracker import OptimalStaticTracker
+
+
+C = TypeVar('C', bound='Checkpoint')
+
+
+def get_checkpoint_key(trace: np.ndarray, time_horizon: int, *policy_description) -> str:
+    """
+    Identifies a simulation by its policy, the requests it serves and its time horizon, so that a
+    checkpoint is only resumed by the simulation that wrote it.
+
+    :param trace: Trace, or traces of the clients
+    :param time_horizon: Number of time steps simulated
+    :param policy_description: Values that identify the policy, e.g. its type, name and cache size
+    :return: Checkpoint key
+    """
+    key = hashlib.sha256(json.dumps([time_horizon, list(policy_description)], default=str).encode())
+    key.update(np.ascontiguousarray(trace[..., :time_horizon]))
+    return key.hexdigest()
+
+
+class Checkpoint:
+    """
+    Writes a dataclass checkpoint to a file and reads it back. The series named in SERIES are lists of
+    segments that are not pickled. Only the segments added since the last save are appended to a raw
+    series file next to the checkpoint, so that a save costs the state of the policy and the new
+    requests instead of the whole history. The series files may run ahead of the checkpoint if writing
+    it was interrupted, they are cut back to the time of the checkpoint when it is loaded.
+    """
+    SERIES: Tuple[str, ...] = ()
+
+    time: int
+    key: str
+    random_state: Any
+    numpy_random_state: Any
+
+    """
+    Number of segments of every series that are written to the series files.
+    """
+    saved_segments: int
+
+    @classmethod
+    def load(cls, file_path: str, key: str) -> C:
+        """
+        :param file_path: Checkpoint file
+        :param key: Key of the simulation that resumes the checkpoint
+        :return: Checkpoint with its series read back
+        """
+        with open(file_path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        assert checkpoint.key == key, \
+            f'{file_path} was written for another policy, trace or time horizon, remove it to start over.'
+        for name in cls.SERIES:
+            setattr(checkpoint, name, [Checkpoint._read_series(f'{file_path}.{name}', checkpoint.time)])
+        checkpoint.saved_segments = 1
+        return checkpoint
+
+    @classmethod
+    def remove(cls, file_path: str) -> None:
+        for path in [file_path] + [f'{file_path}.{name}' for name in cls.SERIES]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def save(self, file_path: str) -> None:
+        """
+        Writes the checkpoint, including the current random states, replacing the file atomically.
+
+        :param file_path: Checkpoint file
+        :return: None
+        """
+        self.random_state = random.getstate()
+        self.numpy_random_state = np.random.get_state()
+        for name in self.SERIES:
+            with open(f'{file_path}.{name}', 'ab' if self.saved_segments > 0 else 'wb') as f:
+                for segment in getattr(self, name)[self.saved_segments:]:
+                    f.write(np.ascontiguousarray(segment, dtype=np.float64).tobytes())
+        self.saved_segments = len(getattr(self, self.SERIES[0]))
+
+        temporary_path = f'{file_path}.tmp'
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(
+                dataclasses.replace(self, **{name: [] for name in self.SERIES}),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(temporary_path, file_path)
+
+    def restore_random_state(self) -> None:
+        if self.random_state is not None:
+            random.setstate(self.random_state)
+        if self.numpy_random_state is not None:
+            np.random.set_state(self.numpy_random_state)
+
+    def fork(self: C) -> C:
+        """
+        Gets an independent copy, so that several simulations can continue from the same warm state.
+
+        :return: Forked checkpoint
+        """
+        return copy.deepcopy(self)
+
+    @staticmethod
+    def _read_series(file_path: str, size: int) -> np.ndarray:
+        os.truncate(file_path, size * np.dtype(np.float64).itemsize)
+        return np.fromfile(file_path, dtype=np.float64)
+
+
+@dataclass
+class SimulationCheckpoint(Checkpoint):
+    """
+    State of a single cache simulation after the first time requests, from which it can be resumed.
+    The partial regret and hit ratio series are kept as the segments in which they were computed.
+    The random states are the global states of the random module and of NumPy, which threads share.
+    """
+    SERIES = ("regret", "hit_ratios")
+
+    policy: Policy
+    optimum: OptimalStaticTracker
+    time: int
+    hits: int
+    misses: int
+    regret: List[np.ndarray]
+    hit_ratios: List[np.ndarray]
+    key: str = ""
+    random_state: Any = None
+    numpy_random_state: Any = None
+    saved_segments: int = 0
+
+    @staticmethod
+    def get_initial(policy: Policy, key: str = "") -> SimulationCheckpoint:
+        return SimulationCheckpoint(
+            policy=policy,
+            optimum=OptimalStaticTracker(policy.cache.size),
+            time=0,
+            hits=0,
+            misses=0,
+            regret=[np.zeros(0)],
+            hit_ratios=[np.zeros(0)],
+            key=key
+        )
+
+
+@dataclass
+class NetworkSimulationCheckpoint(Checkpoint):
+    """
+    State of a bi-partite network simulation after the first time steps, from which it can be resumed.
+    The rewards are kept as the segments in which they were computed.
+    """
+    SERIES = ("rewards",)
+
+    policy: NetworkPolicy
+    time: int
+    rewards: List[np.ndarray]
+    key: str = ""
+    random_state: Any = None
+    numpy_random_state: Any = None
+    saved_segments: int = 0
+
+    @staticmethod
+    def get_initial(policy: NetworkPolicy, key: str = "") -> NetworkSimulationCheckpoint:
+        return NetworkSimulationCheckpoint(policy=policy, time=0, rewards=[np.zeros(0)], key=key)
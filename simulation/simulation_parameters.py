@@ -1,6 +1,10 @@
+import os
+from typing import Optional
+
 import numpy as np
 
 from policies.policy import Policy
+from simulation.statistics_collector import SamplingParameters
 
 
 class SimulationParameters:
@@ -8,7 +12,53 @@ class SimulationParameters:
     time: int
     policies: [Policy]
 
-    def __init__(self, trace: np.ndarray, policies: [Policy], time=None):
+    """
+    If set, the runner only records packed hit masks and metrics are computed after the simulation.
+    """
+    record_hit_masks: bool
+
+    """
+    If set, every policy writes a checkpoint to this directory every checkpoint_interval requests.
+    Running the same parameters again resumes from the checkpoints that are present, checkpoints that
+    were written for another policy, trace or time horizon are refused.
+    """
+    checkpoint_directory: Optional[str]
+    checkpoint_interval: int
+
+    """
+    If set, the runner only records the statistics at the sampled time steps.
+    """
+    sampling: Optional[SamplingParameters]
+
+    """
+    If set, every policy is profiled and its statistics carry the profile.
+    """
+    profile: bool
+
+    def __init__(
+            self,
+            trace: np.ndarray,
+            policies: [Policy],
+            time=None,
+            record_hit_masks: bool = False,
+            checkpoint_directory: Optional[str] = None,
+            checkpoint_interval: int = 0,
+            sampling: Optional[SamplingParameters] = None,
+            profile: bool = False
+    ):
+        assert checkpoint_directory is None or checkpoint_interval > 0
+        assert sampling is None or not record_hit_masks
         self.trace = trace
         self.time = self.trace.size if time is None else time
         self.policies = policies
+        self.record_hit_masks = record_hit_masks
+        self.checkpoint_directory = checkpoint_directory
+        self.checkpoint_interval = checkpoint_interval
+        self.sampling = sampling
+        self.profile = profile
+
+    def get_checkpoint_path(self, policy_index: int) -> Optional[str]:
+        if self.checkpoint_directory is None:
+            return None
+        os.makedirs(self.checkpoint_directory, exist_ok=True)
+        return os.path.join(self.checkpoint_directory, f'policy_{policy_index}.pkl')
@@ -1,25 +1,52 @@
-from concurrent.futures import ThreadPoolExecutor, Future
-from typing import List, Dict
+import heapq
+import os
+import random
+import time as timer
+from concurrent.futures import ThreadPoolExecutor, Future, Executor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager, nullcontext, ExitStack
+from typing import List, Dict, Iterator, Union, Callable, Optional, Tuple, Iterable
 
 import numpy as np
 
 from data.loaders import BiPartiteDataset
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence
 from policies.network_policies.network_policy import NetworkPolicy
 from policies.policy import Policy
+from profiling import profiling, phase, Profile
+from simulation.optimal_static_tracker import OptimalStaticTracker
+from simulation.parameter_sweep import SweepGrid, SweepJob, SweepResult, get_sweep_jobs
+from simulation.simulation_checkpoint import SimulationCheckpoint, NetworkSimulationCheckpoint, get_checkpoint_key
+from simulation.shared_trace import SharedTrace, share_trace, run_with_shared_trace
 from simulation.simulation_parameters import SimulationParameters
-from simulation.simulation_statistics import SimulationStatistics, BiPartiteSimulationStatistics
+from simulation.simulation_statistics import SimulationStatistics, BiPartiteSimulationStatistics, \
+    HitMaskSimulationStatistics, SampledSimulationStatistics
+from simulation.statistics_collector import StatisticsCollector, SamplingParameters
 from utilities import get_hit_ratio
 
 
-def _get_optimal_static_configuration_hits(trace: np.ndarray, cache_size: int, time: int) -> int:
-    _, counts = np.unique(trace[:time], return_counts=True)
-    return int(np.sum(-np.sort(-counts)[:cache_size]))
+HIT_MASK_BLOCK_SIZE: int = 8192
+NETWORK_OPT_BLOCK_SIZE: int = 8192
+
+
+def _pack_hits(requests: np.ndarray, run_trace: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    hit_mask = np.zeros((requests.size + 7) // 8, dtype=np.uint8)
+    for start in range(0, requests.size, HIT_MASK_BLOCK_SIZE):
+        block = np.packbits(run_trace(requests[start:start + HIT_MASK_BLOCK_SIZE]))
+        hit_mask[start // 8:start // 8 + block.size] = block
+    return hit_mask
+
+
+def _get_times(time: int, size: int) -> np.ndarray:
+    return np.arange(time + 1, time + size + 1)
+
+
+def _advance_optimal_static_hit_ratios(requests: np.ndarray, optimum: OptimalStaticTracker, time: int) -> np.ndarray:
+    hits = optimum.get_hits() + np.cumsum(optimum.run_trace(requests))
+    return hits / _get_times(time, requests.size)
 
 
 def _get_optimal_static_statistics(trace: np.ndarray, time_horizon: int, cache_size: int) -> SimulationStatistics:
-    hit_ratio = np.zeros(time_horizon)
-    for time, request in enumerate(trace[0:time_horizon], start=1):
-        hit_ratio[time - 1] = _get_optimal_static_configuration_hits(trace, cache_size, time) / time
+    hit_ratio = _advance_optimal_static_hit_ratios(trace[0:time_horizon], OptimalStaticTracker(cache_size), 0)
     return SimulationStatistics(
         "OPT",
         hit_ratio[time_horizon - 1],
@@ -28,131 +55,608 @@ def _get_optimal_static_statistics(trace: np.ndarray, time_horizon: int, cache_s
     )
 
 
+def _get_optimal_static_hit_mask(trace: np.ndarray, time_horizon: int, cache_size: int) -> np.ndarray:
+    return _pack_hits(trace[0:time_horizon], OptimalStaticTracker(cache_size).run_trace)
+
+
 def _get_optimal_network_statistics(
         traces: np.ndarray,
-        client_cache_connections: List[List[int]],
+        incidence: ClientCacheIncidence,
         cache_size: int,
-        caches: int
+        sampling: Optional[SamplingParameters] = None
 ) -> BiPartiteSimulationStatistics:
-    time_horizon = traces[0].size
-    rewards = np.zeros(time_horizon)
-    cache_trace_map: Dict[int, List[int]] = dict()
+    """
+    Gets the reward of the optimal static configuration of every cache. Each cache sees the requests of its
+    clients, in client order within a time step, and tracks its top-k count sum incrementally.
+    Caches without clients never have hits.
+    """
+    time_horizon = traces.shape[1]
+    collector = None if sampling is None else StatisticsCollector(time_horizon, sampling, "opt")
+    optima = [
+        (incidence.get_clients(cache), OptimalStaticTracker(cache_size))
+        for cache in range(incidence.cache_count)
+        if incidence.get_clients(cache).size > 0
+    ]
+    hits: List[np.ndarray] = []
+    for start in range(0, time_horizon, NETWORK_OPT_BLOCK_SIZE):
+        block_hits = np.zeros(min(NETWORK_OPT_BLOCK_SIZE, time_horizon - start), dtype=np.int64)
+        for clients, optimum in optima:
+            requests = np.round(traces[clients, start:start + NETWORK_OPT_BLOCK_SIZE]).astype(np.int64)
+            cache_hits = optimum.run_trace(requests.T.ravel()).reshape(-1, clients.size)
+            block_hits += np.count_nonzero(cache_hits, axis=1)
+        if collector is None:
+            hits.append(block_hits)
+        else:
+            collector.add(block_hits)
 
-    for t in range(time_horizon):
-        for client in range(len(client_cache_connections)):
-            for cache in client_cache_connections[client]:
-                if cache not in cache_trace_map:
-                    cache_trace_map[cache] = []
-                cache_trace_map[cache].append(traces[client][t])
+    if collector is not None:
+        return collector.get_bipartite_statistics("OPT")
+    return BiPartiteSimulationStatistics(
+        policy="OPT",
+        rewards=np.cumsum(np.concatenate(hits)) / _get_times(0, time_horizon)
+    )
 
-        reward = 0
-        for cache in range(caches):
-            trace = np.array(cache_trace_map[cache])
-            reward += _get_optimal_static_configuration_hits(trace, cache_size, trace.size)
 
-        rewards[t] = reward / (t + 1)
+def _advance_single_cache_simulation(requests: np.ndarray, checkpoint: SimulationCheckpoint) -> None:
+    with phase("optimum"):
+        optimal_hits = checkpoint.optimum.get_hits() + np.cumsum(checkpoint.optimum.run_trace(requests))
+    with phase("policy"):
+        hit_mask = checkpoint.policy.run_trace(requests)
 
-    return BiPartiteSimulationStatistics(
-        policy="OPT",
-        rewards=rewards
+    with phase("statistics"):
+        hits = checkpoint.hits + np.cumsum(hit_mask)
+        times = _get_times(checkpoint.time, requests.size)
+
+        checkpoint.time += requests.size
+        checkpoint.hits += int(np.count_nonzero(hit_mask))
+        checkpoint.misses += requests.size - int(np.count_nonzero(hit_mask))
+        checkpoint.regret.append((optimal_hits - hits) / times)
+        checkpoint.hit_ratios.append(hits / times)
+
+
+def _get_advanced_checkpoint(requests: np.ndarray, checkpoint: SimulationCheckpoint) -> SimulationCheckpoint:
+    _advance_single_cache_simulation(requests, checkpoint)
+    return checkpoint
+
+
+def _get_checkpoint_statistics(checkpoint: SimulationCheckpoint) -> SimulationStatistics:
+    return SimulationStatistics(
+        checkpoint.policy.get_name(),
+        get_hit_ratio(checkpoint.hits, checkpoint.misses),
+        np.concatenate(checkpoint.regret),
+        np.concatenate(checkpoint.hit_ratios)
     )
 
 
+def _resume_single_cache_simulation(
+        trace: np.ndarray,
+        time_horizon: int,
+        checkpoint: SimulationCheckpoint,
+        checkpoint_interval: int = 0,
+        checkpoint_path: Optional[str] = None
+) -> SimulationStatistics:
+    assert time_horizon > 0
+    assert trace.size > 0
+    assert checkpoint.time <= time_horizon
+
+    interval = checkpoint_interval if checkpoint_interval > 0 else time_horizon
+    while checkpoint.time < time_horizon:
+        until = min(checkpoint.time + interval, time_horizon)
+        _advance_single_cache_simulation(trace[checkpoint.time:until], checkpoint)
+        if checkpoint_path is not None and checkpoint.time < time_horizon:
+            checkpoint.save(checkpoint_path)
+
+    if checkpoint_path is not None:
+        SimulationCheckpoint.remove(checkpoint_path)
+
+    return _get_checkpoint_statistics(checkpoint)
+
+
 def _run_single_cache_simulation(
         trace: np.ndarray,
         time_horizon: int,
-        policy: Policy
+        policy: Policy,
+        checkpoint_interval: int = 0,
+        checkpoint_path: Optional[str] = None,
+        profile: bool = False
 ) -> SimulationStatistics:
+    """
+    Runs the policy over the trace. If checkpoint_path is given, a checkpoint is written to it every
+    checkpoint_interval requests, and an existing checkpoint there is resumed instead of the given policy.
+    The checkpoint must have been written for the same policy, trace and time horizon.
+    The profile only covers the requests served by this call.
+    """
+    assert policy is not None
+
+    key = "" if checkpoint_path is None else get_checkpoint_key(
+        trace, time_horizon, type(policy).__qualname__, policy.get_name(), policy.cache.size
+    )
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        checkpoint = SimulationCheckpoint.load(checkpoint_path, key)
+        checkpoint.restore_random_state()
+    else:
+        checkpoint = SimulationCheckpoint.get_initial(policy, key)
+
+    with profiling(profile) as profiler:
+        statistics = _resume_single_cache_simulation(
+            trace,
+            time_horizon,
+            checkpoint,
+            checkpoint_interval,
+            checkpoint_path
+        )
+    statistics.profile = None if profiler is None else profiler.profile
+    return statistics
+
+
+def _run_single_cache_hit_mask_simulation(
+        trace: np.ndarray,
+        time_horizon: int,
+        policy: Policy,
+        profile: bool = False
+) -> Tuple[np.ndarray, Optional[Profile]]:
     assert time_horizon > 0
     assert trace.size > 0
     assert policy is not None
 
-    hits = misses = 0
-    regret = np.zeros(time_horizon)
-    hit_ratio = np.zeros(time_horizon)
-    for time, request in enumerate(trace[0:time_horizon], start=1):
-        if policy.is_present(request):
-            hits += 1
-        else:
-            misses += 1
-        regret[time - 1] = (_get_optimal_static_configuration_hits(trace, policy.cache.size, time) - hits) / time
-        hit_ratio[time - 1] = get_hit_ratio(hits, misses)
-        policy.update(request)
+    with profiling(profile) as profiler:
+        with phase("policy"):
+            hit_mask = _pack_hits(trace[0:time_horizon], policy.run_trace)
+    return hit_mask, None if profiler is None else profiler.profile
+
+
+def _run_single_cache_sampled_simulation(
+        trace: np.ndarray,
+        time_horizon: int,
+        policy: Policy,
+        sampling: SamplingParameters,
+        name: str,
+        profile: bool = False
+) -> SampledSimulationStatistics:
+    assert time_horizon > 0
+    assert policy is not None
+
+    collector = StatisticsCollector(time_horizon, sampling, name)
+    optimum = OptimalStaticTracker(policy.cache.size)
+    with profiling(profile) as profiler:
+        for start in range(0, time_horizon, HIT_MASK_BLOCK_SIZE):
+            requests = trace[start:min(start + HIT_MASK_BLOCK_SIZE, time_horizon)]
+            with phase("policy"):
+                hits = policy.run_trace(requests)
+            with phase("optimum"):
+                optimal_hits = optimum.run_trace(requests)
+            with phase("statistics"):
+                collector.add(hits, optimal_hits)
+    statistics = collector.get_statistics(policy.get_name())
+    statistics.profile = None if profiler is None else profiler.profile
+    return statistics
 
-    return SimulationStatistics(
-        policy.get_name(),
-        get_hit_ratio(hits, misses),
-        regret,
-        hit_ratio
-    )
 
+def _get_optimal_static_sampled_statistics(
+        trace: np.ndarray,
+        time_horizon: int,
+        cache_size: int,
+        sampling: SamplingParameters
+) -> SampledSimulationStatistics:
+    collector = StatisticsCollector(time_horizon, sampling, "opt")
+    optimum = OptimalStaticTracker(cache_size)
+    for start in range(0, time_horizon, HIT_MASK_BLOCK_SIZE):
+        hits = optimum.run_trace(trace[start:min(start + HIT_MASK_BLOCK_SIZE, time_horizon)])
+        collector.add(hits, hits)
+    return collector.get_statistics("OPT")
 
-def _execute_system_synchronously(policy: NetworkPolicy, data: BiPartiteDataset) -> np.ndarray:
-    clients, time_horizon = data.traces.shape
+
+def _execute_system_sampled(policy: NetworkPolicy, traces: np.ndarray, collector: StatisticsCollector) -> None:
+    """
+    Serves the requests time step by time step and passes the rewards to the collector in blocks.
+    """
+    time_horizon = traces.shape[1]
+    for start in range(0, time_horizon, NETWORK_OPT_BLOCK_SIZE):
+        block = traces[:, start:start + NETWORK_OPT_BLOCK_SIZE]
+        rewards = np.zeros(block.shape[1], dtype=np.int64)
+        for t in range(block.shape[1]):
+            reward = policy.reward
+            with phase("update"):
+                policy.update(block[:, t].astype(float))
+            rewards[t] = policy.reward - reward
+        with phase("statistics"):
+            collector.add(rewards)
+
+
+def _execute_system_synchronously(policy: NetworkPolicy, traces: np.ndarray, time: int = 0) -> np.ndarray:
+    """
+    Serves the requests time step by time step, the traces start after the first time steps.
+
+    :return: Average reward up to every time step
+    """
+    clients, time_horizon = traces.shape
     rewards = np.zeros(time_horizon)
     for t in range(time_horizon):
         requests = np.zeros(clients)
         for client in range(clients):
-            requests[client] = data.traces[client][t]
-        policy.update(requests)
-        rewards[t] = policy.reward / (t + 1)
+            requests[client] = traces[client][t]
+        with phase("update"):
+            policy.update(requests)
+        rewards[t] = policy.reward / (time + t + 1)
 
     return rewards
 
 
+def _resume_bipartite_simulation(
+        traces: np.ndarray,
+        checkpoint: NetworkSimulationCheckpoint,
+        checkpoint_interval: int = 0,
+        checkpoint_path: Optional[str] = None
+) -> np.ndarray:
+    time_horizon = traces.shape[1]
+    assert checkpoint.time <= time_horizon
+
+    interval = checkpoint_interval if checkpoint_interval > 0 else time_horizon
+    while checkpoint.time < time_horizon:
+        until = min(checkpoint.time + interval, time_horizon)
+        checkpoint.rewards.append(
+            _execute_system_synchronously(checkpoint.policy, traces[:, checkpoint.time:until], checkpoint.time)
+        )
+        checkpoint.time = until
+        if checkpoint_path is not None and checkpoint.time < time_horizon:
+            checkpoint.save(checkpoint_path)
+
+    if checkpoint_path is not None:
+        NetworkSimulationCheckpoint.remove(checkpoint_path)
+
+    return np.concatenate(checkpoint.rewards)
+
+
 def _run_bipartite_simulation(
+        traces: np.ndarray,
         policy: NetworkPolicy,
-        data: BiPartiteDataset
+        sampling: Optional[SamplingParameters] = None,
+        name: str = "policy",
+        profile: bool = False,
+        checkpoint_interval: int = 0,
+        checkpoint_path: Optional[str] = None
 ) -> BiPartiteSimulationStatistics:
-    rewards = _execute_system_synchronously(policy, data)
-    return BiPartiteSimulationStatistics(
-        policy=policy.get_name(),
-        rewards=rewards
+    """
+    Runs the policy over the traces. If checkpoint_path is given, a checkpoint is written to it every
+    checkpoint_interval time steps, and an existing checkpoint there is resumed instead of the given policy.
+    The run time and the profile only cover the time steps served by this call.
+    """
+    if checkpoint_path is not None:
+        assert sampling is None, "Sampled simulations do not support checkpoints."
+        key = get_checkpoint_key(
+            traces, traces.shape[1], type(policy).__qualname__, policy.get_name(), policy.cache_size
+        )
+        if os.path.exists(checkpoint_path):
+            checkpoint = NetworkSimulationCheckpoint.load(checkpoint_path, key)
+            checkpoint.restore_random_state()
+            policy = checkpoint.policy
+        else:
+            checkpoint = NetworkSimulationCheckpoint.get_initial(policy, key)
+
+    start = timer.perf_counter()
+    with profiling(profile) as profiler:
+        if sampling is not None:
+            collector = StatisticsCollector(traces.shape[1], sampling, name)
+            _execute_system_sampled(policy, traces, collector)
+        elif checkpoint_path is not None:
+            rewards = _resume_bipartite_simulation(traces, checkpoint, checkpoint_interval, checkpoint_path)
+        else:
+            rewards = _execute_system_synchronously(policy, traces)
+
+    if sampling is not None:
+        statistics = collector.get_bipartite_statistics(
+            policy.get_name(),
+            run_time=timer.perf_counter() - start,
+            solve_count=policy.get_solve_count()
+        )
+    else:
+        statistics = BiPartiteSimulationStatistics(
+            policy=policy.get_name(),
+            rewards=rewards,
+            run_time=timer.perf_counter() - start,
+            solve_count=policy.get_solve_count()
+        )
+    statistics.profile = None if profiler is None else profiler.profile
+    return statistics
+
+
+def _warm_up_sweep_job(trace: np.ndarray, job: SweepJob, warm_up: int) -> SimulationCheckpoint:
+    random.seed(job.seed)
+    np.random.seed(job.seed)
+    checkpoint = SimulationCheckpoint.get_initial(job.get_policy())
+    _advance_single_cache_simulation(trace[0:min(warm_up, job.time_horizon)], checkpoint)
+    return checkpoint
+
+
+def _run_sweep_job(
+        trace: np.ndarray,
+        job: SweepJob,
+        warm_checkpoint: Optional[SimulationCheckpoint] = None
+) -> SweepResult:
+    random.seed(job.seed)
+    np.random.seed(job.seed)
+    start = timer.perf_counter()
+    if warm_checkpoint is None:
+        checkpoint = SimulationCheckpoint.get_initial(job.get_policy())
+    else:
+        checkpoint = warm_checkpoint.fork()
+        checkpoint.policy.seed_random(job.seed)
+    statistics = _resume_single_cache_simulation(trace, job.time_horizon, checkpoint)
+    return SweepResult(
+        dataset=job.dataset_name,
+        catalog_size=job.catalog_size,
+        time_horizon=job.time_horizon,
+        policy=statistics.policy,
+        cache_size=job.cache_size,
+        discount_rates=job.discount_rates,
+        seed=job.seed,
+        hit_ratio=statistics.hit_ratio,
+        regret=float(statistics.regret[-1]),
+        seconds=timer.perf_counter() - start
     )
 
 
+class ExecutionBackend:
+    """
+    Threads share the policies with the caller, but pure Python policies barely run in parallel.
+    Processes run in parallel, they read the traces from shared memory and work on copies of the policies.
+    """
+    THREADS: str = "threads"
+    PROCESSES: str = "processes"
+
+
 class SimulationRunner:
     """
     Simulation runner class that is able to run multiple policies concurrently.
     """
-    _executor: ThreadPoolExecutor
+    _executor: Executor
+    _backend: str
+    _workers: int
 
-    def __init__(self, threads: int = 1):
+    def __init__(self, threads: int = 1, backend: str = ExecutionBackend.THREADS):
+        """
+        :param threads: Number of workers, threads or processes depending on the backend
+        :param backend: One of the ExecutionBackend values
+        """
         assert threads >= 1
-        self._executor = ThreadPoolExecutor(max_workers=threads)
+        assert backend in [ExecutionBackend.THREADS, ExecutionBackend.PROCESSES]
+        self._backend = backend
+        self._workers = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads) \
+            if backend == ExecutionBackend.THREADS \
+            else ProcessPoolExecutor(max_workers=threads)
+
+    @contextmanager
+    def _share(self, trace: np.ndarray) -> Iterator[Union[np.ndarray, SharedTrace]]:
+        with share_trace(trace) if self._backend == ExecutionBackend.PROCESSES else nullcontext(trace) as shared:
+            yield shared
+
+    def _submit(self, function: Callable, trace: Union[np.ndarray, SharedTrace], *args) -> Future:
+        if isinstance(trace, SharedTrace):
+            return self._executor.submit(run_with_shared_trace, trace, function, *args)
+        return self._executor.submit(function, trace, *args)
 
-    def run_simulations(self, parameters: SimulationParameters) -> List[SimulationStatistics]:
+    def run_simulations(
+            self,
+            parameters: SimulationParameters
+    ) -> List[Union[SimulationStatistics, HitMaskSimulationStatistics]]:
         assert parameters is not None
         assert parameters.policies is not None and len(parameters.policies) > 0
 
-        futures: List[Future] = [
-            self._executor.submit(_run_single_cache_simulation, parameters.trace, parameters.time, policy)
-            for policy in parameters.policies
-        ]
+        if parameters.record_hit_masks:
+            return self._run_hit_mask_simulations(parameters)
+        if parameters.sampling is not None:
+            return self._run_sampled_simulations(parameters)
+
+        with self._share(parameters.trace) as trace:
+            futures: List[Future] = [
+                self._submit(
+                    _run_single_cache_simulation,
+                    trace,
+                    parameters.time,
+                    policy,
+                    parameters.checkpoint_interval,
+                    parameters.get_checkpoint_path(index),
+                    parameters.profile
+                )
+                for index, policy in enumerate(parameters.policies)
+            ]
+            statistics = list(map(lambda f: f.result(), futures))
 
-        return list(map(lambda f: f.result(), futures)) + [
+        return statistics + [
             _get_optimal_static_statistics(parameters.trace, parameters.time, parameters.policies[0].cache.size)
         ]
 
+    def _run_sampled_simulations(self, parameters: SimulationParameters) -> List[SampledSimulationStatistics]:
+        assert parameters.checkpoint_directory is None, "Sampled simulations do not support checkpoints."
+        with self._share(parameters.trace) as trace:
+            futures: List[Future] = [
+                self._submit(
+                    _run_single_cache_sampled_simulation,
+                    trace,
+                    parameters.time,
+                    policy,
+                    parameters.sampling,
+                    f'policy_{index}',
+                    parameters.profile
+                )
+                for index, policy in enumerate(parameters.policies)
+            ]
+            statistics = list(map(lambda f: f.result(), futures))
+
+        return statistics + [
+            _get_optimal_static_sampled_statistics(
+                parameters.trace,
+                parameters.time,
+                parameters.policies[0].cache.size,
+                parameters.sampling
+            )
+        ]
+
+    def _run_hit_mask_simulations(self, parameters: SimulationParameters) -> List[HitMaskSimulationStatistics]:
+        assert parameters.checkpoint_directory is None, "Hit mask simulations do not support checkpoints."
+        with self._share(parameters.trace) as trace:
+            futures: List[Future] = [
+                self._submit(_run_single_cache_hit_mask_simulation, trace, parameters.time, policy, parameters.profile)
+                for policy in parameters.policies
+            ]
+            optimal_hit_masks: Dict[int, np.ndarray] = {
+                cache_size: _get_optimal_static_hit_mask(parameters.trace, parameters.time, cache_size)
+                for cache_size in set(map(lambda p: p.cache.size, parameters.policies))
+            }
+            hit_masks, profiles = zip(*map(lambda f: f.result(), futures))
+
+        optimal_hit_mask = optimal_hit_masks[parameters.policies[0].cache.size]
+        return [
+            HitMaskSimulationStatistics(
+                policy.get_name(),
+                hit_mask,
+                optimal_hit_masks[policy.cache.size],
+                parameters.time,
+                profile
+            )
+            for policy, hit_mask, profile in zip(parameters.policies, hit_masks, profiles)
+        ] + [
+            HitMaskSimulationStatistics("OPT", optimal_hit_mask, optimal_hit_mask, parameters.time)
+        ]
+
+    def run_streaming_simulations(
+            self,
+            chunks: Iterable[np.ndarray],
+            policies: List[Policy]
+    ) -> List[SimulationStatistics]:
+        """
+        Runs the policies over a trace that is given as consecutive chunks, e.g. from stream_movielens,
+        so that only one chunk of the trace is in memory at a time. With the process backend the policy
+        states travel to the workers and back with every chunk, so chunks should be large.
+
+        :param chunks: Consecutive parts of the trace
+        :param policies: Policies to simulate
+        :return: Statistics of every policy and of the optimal static configuration
+        """
+        assert len(policies) > 0
+
+        checkpoints = list(map(SimulationCheckpoint.get_initial, policies))
+        optimum = OptimalStaticTracker(policies[0].cache.size)
+        optimal_hit_ratios: List[np.ndarray] = []
+        time = 0
+        for chunk in chunks:
+            futures: List[Future] = [
+                self._executor.submit(_get_advanced_checkpoint, chunk, checkpoint)
+                for checkpoint in checkpoints
+            ]
+            optimal_hit_ratios.append(_advance_optimal_static_hit_ratios(chunk, optimum, time))
+            time += chunk.size
+            checkpoints = list(map(lambda f: f.result(), futures))
+
+        assert time > 0
+        optimal_hit_ratio = np.concatenate(optimal_hit_ratios)
+        return list(map(_get_checkpoint_statistics, checkpoints)) + [
+            SimulationStatistics("OPT", optimal_hit_ratio[-1], np.zeros(optimal_hit_ratio.size), optimal_hit_ratio)
+        ]
+
     def run_bipartite_simulations(
             self,
             policies: List[NetworkPolicy],
-            data: BiPartiteDataset
+            data: BiPartiteDataset,
+            sampling: Optional[SamplingParameters] = None,
+            profile: bool = False,
+            checkpoint_directory: Optional[str] = None,
+            checkpoint_interval: int = 0
     ) -> List[BiPartiteSimulationStatistics]:
+        """
+        Runs the network policies over the traces of the clients.
+
+        :param policies: Policies to simulate
+        :param data: Traces of the clients
+        :param sampling: If set, rewards are only recorded at the sampled time steps
+        :param profile: If set, every policy is profiled and its statistics carry the profile
+        :param checkpoint_directory: If set, every policy writes a checkpoint to this directory every
+        checkpoint_interval time steps, and running the same policies again resumes from them
+        :param checkpoint_interval: Number of time steps between checkpoints
+        :return: Statistics of every policy and of the optimal static configurations
+        """
         assert len(policies) > 0
         assert data.traces.size > 0
+        assert checkpoint_directory is None or checkpoint_interval > 0
+        assert checkpoint_directory is None or sampling is None, "Sampled simulations do not support checkpoints."
 
-        futures: List[Future] = [
-            self._executor.submit(_run_bipartite_simulation, policy, data)
-            for policy in policies
-        ]
+        if checkpoint_directory is not None:
+            os.makedirs(checkpoint_directory, exist_ok=True)
+        with self._share(data.traces) as traces:
+            futures: List[Future] = [
+                self._submit(
+                    _run_bipartite_simulation,
+                    traces,
+                    policy,
+                    sampling,
+                    f'policy_{index}',
+                    profile,
+                    checkpoint_interval,
+                    None if checkpoint_directory is None
+                    else os.path.join(checkpoint_directory, f'network_policy_{index}.pkl')
+                )
+                for index, policy in enumerate(policies)
+            ]
+            statistics = list(map(lambda f: f.result(), futures))
 
-        return list(map(lambda f: f.result(), futures)) + [
+        return statistics + [
             _get_optimal_network_statistics(
                 data.traces,
-                policies[0].client_cache_connections,
+                policies[0].incidence,
                 policies[0].cache_size,
-                len(policies)
+                sampling
             )
         ]
 
+    def run_sweep(self, grid: SweepGrid) -> Iterator[SweepResult]:
+        """
+        Runs every job of the grid, longest jobs first, and yields the results as the jobs finish.
+        With a warm-up, jobs that only differ in their seed share one warm-up run and fork from its state.
+        Tasks are only handed to the executor when a worker is free, so that forked jobs that become ready
+        later still start before shorter jobs. A warm-up counts as long as the longest job it warms up.
+        Seeds are only reproducible with the process backend, threads share the global random state.
+
+        :param grid: Sweep grid
+        :return: Results in order of completion
+        """
+        jobs = get_sweep_jobs(grid)
+        assert len(jobs) > 0
+
+        with ExitStack() as stack:
+            traces = [stack.enter_context(self._share(dataset.trace)) for dataset in grid.datasets]
+            """
+            Tasks that are ready to run, as (-estimated cost, sequence, function, job, arguments, forked jobs).
+            """
+            ready: List[Tuple[float, int, Callable, SweepJob, tuple, List[SweepJob]]] = []
+            if grid.warm_up > 0:
+                warm_up_groups: Dict[Tuple, List[SweepJob]] = dict()
+                for job in jobs:
+                    key = (job.dataset, job.time_horizon, job.policy_type, job.cache_size, job.discount_rates)
+                    warm_up_groups.setdefault(key, []).append(job)
+                for group in warm_up_groups.values():
+                    cost = group[0].get_estimated_cost()
+                    ready.append((-cost, len(ready), _warm_up_sweep_job, group[0], (grid.warm_up,), group))
+            else:
+                for job in jobs:
+                    ready.append((-job.get_estimated_cost(), len(ready), _run_sweep_job, job, (), []))
+            heapq.heapify(ready)
+            sequence = len(ready)
+
+            pending: Dict[Future, List[SweepJob]] = dict()
+            while len(pending) > 0 or len(ready) > 0:
+                while len(ready) > 0 and len(pending) < self._workers:
+                    _, _, function, job, arguments, forked_jobs = heapq.heappop(ready)
+                    pending[self._submit(function, traces[job.dataset], job, *arguments)] = forked_jobs
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    forked_jobs = pending.pop(future)
+                    if len(forked_jobs) == 0:
+                        yield future.result()
+                    for job in forked_jobs:
+                        heapq.heappush(
+                            ready,
+                            (-job.get_estimated_cost(), sequence, _run_sweep_job, job, (future.result(),), [])
+                        )
+                        sequence += 1
@@ -1,8 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
 
 import numpy as np
 
+from profiling import Profile
+
 
 class HitMissLogs:
     hits: int = 0
@@ -19,8 +23,105 @@ class SimulationStatistics(Statistics):
     hit_ratio: float
     regret: np.ndarray
     hit_ratios: np.ndarray
+    profile: Optional[Profile] = None
+
+    @property
+    def times(self) -> np.ndarray:
+        return np.arange(1, self.hit_ratios.size + 1)
+
+
+@dataclass
+class SampledSimulationStatistics(Statistics):
+    """
+    Statistics recorded at sampled time steps only, as float32 arrays that may be memory mapped.
+    """
+    hit_ratio: float
+    times: np.ndarray
+    regret: np.ndarray
+    hit_ratios: np.ndarray
+
+    """
+    Hit ratio over the sliding window ending at every sampled time step, None if no window was set.
+    """
+    windowed_hit_ratios: Optional[np.ndarray] = None
+    profile: Optional[Profile] = None
+
+
+def get_cumulative_hits(hit_mask: np.ndarray, time_horizon: int) -> np.ndarray:
+    """
+    Gets the number of hits up to and including every time step from a packed hit mask.
+
+    :param hit_mask: Bitmask packed with np.packbits, where bit t is set if request t was a hit
+    :param time_horizon: Number of requests in the mask
+    :return: 1 x T array of cumulative hits
+    """
+    return np.cumsum(np.unpackbits(hit_mask, count=time_horizon), dtype=np.int64)
+
+
+@dataclass
+class HitMaskSimulationStatistics(Statistics):
+    """
+    Statistics that only store packed hit/miss bitmasks of the policy and of the optimal static
+    configuration. The per-step metrics are computed from them when first accessed.
+    """
+    hit_mask: np.ndarray
+    optimal_hit_mask: np.ndarray
+    time_horizon: int
+    profile: Optional[Profile] = None
+
+    @property
+    def times(self) -> np.ndarray:
+        return np.arange(1, self.time_horizon + 1)
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = int(np.unpackbits(self.hit_mask, count=self.time_horizon).sum())
+        return 0 if self.time_horizon == 0 else hits / self.time_horizon
+
+    @cached_property
+    def hit_ratios(self) -> np.ndarray:
+        return get_cumulative_hits(self.hit_mask, self.time_horizon) / np.arange(1, self.time_horizon + 1)
+
+    @cached_property
+    def regret(self) -> np.ndarray:
+        hits = get_cumulative_hits(self.hit_mask, self.time_horizon)
+        optimal_hits = get_cumulative_hits(self.optimal_hit_mask, self.time_horizon)
+        return (optimal_hits - hits) / np.arange(1, self.time_horizon + 1)
+
+    def get_windowed_hit_ratios(self, window: int) -> np.ndarray:
+        """
+        Gets the hit ratio over the last window requests at every time step.
+
+        :param window: Number of requests in the sliding window
+        :return: 1 x T array of windowed hit ratios
+        """
+        assert window > 0
+        hits = np.concatenate(([0], get_cumulative_hits(self.hit_mask, self.time_horizon)))
+        times = np.arange(1, self.time_horizon + 1)
+        window_starts = np.maximum(times - window, 0)
+        return (hits[times] - hits[window_starts]) / (times - window_starts)
 
 
 @dataclass
 class BiPartiteSimulationStatistics(Statistics):
     rewards: np.ndarray
+
+    """
+    Wall-clock seconds the policy spent serving the traces.
+    """
+    run_time: float = 0.0
+
+    """
+    Number of optimization problems the policy solved, None for policies that do not solve any.
+    """
+    solve_count: Optional[int] = None
+
+    """
+    Time steps of the rewards, None if they were recorded at every time step.
+    """
+    sample_times: Optional[np.ndarray] = None
+    profile: Optional[Profile] = None
+
+    @property
+    def times(self) -> np.ndarray:
+        return np.arange(1, self.rewards.size + 1) if self.sample_times is None else self.sample_times
@@ -0,0 +1,228 @@
+import glob
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from simulation.simulation_statistics import SampledSimulationStatistics, BiPartiteSimulationStatistics
+
+
+SPILL_FILE_SUFFIX: str = ".spill"
+
+
+class Sampling:
+    """
+    Time steps at which the statistics are recorded. EVERY records every interval requests and LOG records
+    points logarithmically spaced time steps. The last time step is always recorded.
+    """
+    EVERY: str = "every"
+    LOG: str = "log"
+
+
+@dataclass
+class SamplingParameters:
+    sampling: str = Sampling.EVERY
+    interval: int = 1
+    points: int = 1000
+
+    """
+    Number of requests in the sliding window of the windowed hit ratios, none are recorded if 0.
+    """
+    window: int = 0
+
+    """
+    If set, the series are written to np.memmap files in this directory instead of being kept in memory.
+    Every collector writes a new file with its sampled time steps followed by its series. The files are kept
+    after the run since the statistics read from them, remove_spill_files deletes them once those are done.
+    With the process backend the statistics are pickled back to the caller, which copies the series into
+    its memory, so the memory bound only holds within the workers.
+    """
+    spill_directory: Optional[str] = None
+
+    def __post_init__(self):
+        assert self.sampling in [Sampling.EVERY, Sampling.LOG]
+        assert self.interval > 0
+        assert self.points > 0
+        assert self.window >= 0
+
+    def get_spill_path(self, name: str) -> Optional[str]:
+        """
+        Creates a new, uniquely named spill file, so that runs into the same directory never overwrite the
+        series behind earlier statistics.
+
+        :param name: Prefix of the file name
+        :return: Path of the file, None if the series are kept in memory
+        """
+        if self.spill_directory is None:
+            return None
+        os.makedirs(self.spill_directory, exist_ok=True)
+        file, spill_path = tempfile.mkstemp(suffix=SPILL_FILE_SUFFIX, prefix=f'{name}_', dir=self.spill_directory)
+        os.close(file)
+        return spill_path
+
+    def remove_spill_files(self) -> None:
+        """
+        Removes the spill files of all collectors in the spill directory. Statistics that read from them must
+        not be used afterwards.
+
+        :return: None
+        """
+        if self.spill_directory is None:
+            return
+        for spill_path in glob.glob(os.path.join(glob.escape(self.spill_directory), f'*{SPILL_FILE_SUFFIX}')):
+            os.remove(spill_path)
+
+
+class StatisticsCollector:
+    """
+    Records the hit ratio, the regret and the windowed hit ratio of a simulation at the sampled time steps,
+    from hits that arrive in blocks. Series are stored as float32 and only the counters and the last window
+    of cumulative hits are kept between blocks, so memory does not grow with the trace unless every request
+    is sampled, and not at all when the series are spilled to disk.
+    """
+
+    RATIOS: int = 0
+    REGRET: int = 1
+    WINDOWED_RATIOS: int = 2
+
+    time_horizon: int
+    time: int
+    hits: int
+    optimal_hits: int
+
+    """
+    Number of sampled time steps, and the number of them that are recorded so far.
+    """
+    sample_count: int
+    _recorded: int
+
+    """
+    Sampled time steps, and series x samples values at those time steps.
+    """
+    times: np.ndarray
+    series: np.ndarray
+
+    _parameters: SamplingParameters
+
+    """
+    Logarithmically spaced time steps, only used for LOG sampling.
+    """
+    _log_times: np.ndarray
+
+    """
+    Cumulative hits at the last window time steps, zeros before the first one.
+    """
+    _recent_hits: np.ndarray
+
+    def __init__(self, time_horizon: int, parameters: SamplingParameters, name: str = "statistics"):
+        """
+        :param time_horizon: Number of requests that will be added
+        :param parameters: Sampling parameters
+        :param name: Prefix of the names of the spill files
+        """
+        assert time_horizon > 0
+        self.time_horizon = time_horizon
+        self.time = 0
+        self.hits = 0
+        self.optimal_hits = 0
+        self._recorded = 0
+        self._parameters = parameters
+        self._recent_hits = np.zeros(parameters.window, dtype=np.int64)
+        if parameters.sampling == Sampling.LOG:
+            self._log_times = np.unique(np.round(np.geomspace(1, time_horizon, parameters.points)).astype(np.int64))
+            self.sample_count = self._log_times.size
+        else:
+            self._log_times = np.zeros(0, dtype=np.int64)
+            self.sample_count = -(-time_horizon // parameters.interval)
+
+        spill_path = parameters.get_spill_path(name)
+        if spill_path is None:
+            self.times = np.zeros(self.sample_count, dtype=np.int64)
+            self.series = np.zeros((3, self.sample_count), dtype=np.float32)
+        else:
+            times_size = self.sample_count * np.dtype(np.int64).itemsize
+            os.truncate(spill_path, times_size + 3 * self.sample_count * np.dtype(np.float32).itemsize)
+            self.times = np.memmap(spill_path, dtype=np.int64, mode='r+', shape=(self.sample_count,))
+            self.series = np.memmap(
+                spill_path,
+                dtype=np.float32,
+                mode='r+',
+                offset=times_size,
+                shape=(3, self.sample_count)
+            )
+
+    def add(self, hits: np.ndarray, optimal_hits: Optional[np.ndarray] = None) -> None:
+        """
+        Adds the hits of the next requests.
+
+        :param hits: Hits, or rewards, of every request
+        :param optimal_hits: Hits of the optimal static configuration for every request, if regret is recorded
+        :return: None
+        """
+        assert self.time + hits.size <= self.time_horizon
+        start = self.time
+        cumulative = self.hits + np.cumsum(hits, dtype=np.int64)
+        times = self._get_sample_times(start, start + hits.size)
+        offsets = times - start - 1
+        samples = slice(self._recorded, self._recorded + times.size)
+
+        self.times[samples] = times
+        self.series[StatisticsCollector.RATIOS, samples] = cumulative[offsets] / times
+        if optimal_hits is not None:
+            optimal_cumulative = self.optimal_hits + np.cumsum(optimal_hits, dtype=np.int64)
+            self.series[StatisticsCollector.REGRET, samples] = \
+                (optimal_cumulative[offsets] - cumulative[offsets]) / times
+            self.optimal_hits = int(optimal_cumulative[-1]) if hits.size > 0 else self.optimal_hits
+        if self._parameters.window > 0:
+            window = self._parameters.window
+            extended = np.concatenate([self._recent_hits, cumulative])
+            self.series[StatisticsCollector.WINDOWED_RATIOS, samples] = \
+                (extended[offsets + window] - extended[offsets]) / np.minimum(times, window)
+            self._recent_hits = extended[-window:]
+
+        self.hits = int(cumulative[-1]) if hits.size > 0 else self.hits
+        self.time += hits.size
+        self._recorded += times.size
+
+    def get_statistics(self, policy: str) -> SampledSimulationStatistics:
+        assert self.time == self.time_horizon
+        return SampledSimulationStatistics(
+            policy=policy,
+            hit_ratio=self.hits / self.time,
+            times=self.times,
+            hit_ratios=self.series[StatisticsCollector.RATIOS],
+            regret=self.series[StatisticsCollector.REGRET],
+            windowed_hit_ratios=self.series[StatisticsCollector.WINDOWED_RATIOS] if self._parameters.window > 0
+            else None
+        )
+
+    def get_bipartite_statistics(
+            self,
+            policy: str,
+            run_time: float = 0.0,
+            solve_count: Optional[int] = None
+    ) -> BiPartiteSimulationStatistics:
+        assert self.time == self.time_horizon
+        return BiPartiteSimulationStatistics(
+            policy=policy,
+            rewards=self.series[StatisticsCollector.RATIOS],
+            run_time=run_time,
+            solve_count=solve_count,
+            sample_times=self.times
+        )
+
+    def _get_sample_times(self, start: int, end: int) -> np.ndarray:
+        """
+        :return: Sampled time steps in (start, end], counting from 1
+        """
+        if self._parameters.sampling == Sampling.LOG:
+            return self._log_times[np.searchsorted(self._log_times, start, side='right'):
+                                   np.searchsorted(self._log_times, end, side='right')]
+
+        interval = self._parameters.interval
+        times = np.arange((start // interval + 1) * interval, end + 1, interval, dtype=np.int64)
+        if start < end == self.time_horizon and self.time_horizon % interval != 0:
+            times = np.append(times, end)
+        return times
@@ -0,0 +1,68 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from policies.network_policies.cache_rankings import CacheRankings
+from policies.network_policies.lead_cache import LeadCache, ResolveSchedule
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolver
+
+CONNECTIONS: List[List[int]] = [[0, 1], [1, 2], [2, 3], [0, 3], [1], [0, 2, 3]]
+CACHE_COUNT: int = 5
+CATALOG_SIZE: int = 30
+CACHE_SIZE: int = 3
+
+
+def _get_ranking(counts: np.ndarray, cache_size: int) -> np.ndarray:
+    top = np.lexsort((np.arange(counts.size), -counts))[:cache_size]
+    return np.sort(top[counts[top] > 0])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rankings_match_sorted_counts(seed):
+    rng = np.random.default_rng(seed)
+    rankings = CacheRankings(CACHE_COUNT, CACHE_SIZE)
+    counts = np.zeros((CACHE_COUNT, CATALOG_SIZE), dtype=np.int64)
+    changed_caches = set()
+    for _ in range(3000):
+        cache, item = int(rng.integers(CACHE_COUNT)), int(rng.zipf(1.5) % CATALOG_SIZE)
+        previous_ranking = _get_ranking(counts[cache], CACHE_SIZE)
+        counts[cache, item] += 1
+        rankings.add(cache, item)
+        np.testing.assert_array_equal(rankings.get_ranking(cache), _get_ranking(counts[cache], CACHE_SIZE))
+        if not np.array_equal(previous_ranking, rankings.get_ranking(cache)):
+            changed_caches.add(cache)
+        if rng.random() < 0.1:
+            assert set(rankings.pop_changed_caches()) >= changed_caches
+            changed_caches = set()
+
+
+def _get_policy() -> LeadCache:
+    return LeadCache(
+        CACHE_COUNT,
+        CONNECTIONS,
+        CATALOG_SIZE,
+        3,
+        CACHE_SIZE,
+        LeadCacheSolver.LINEAR_PROGRAM,
+        resolve_schedule=ResolveSchedule.RANKING_CHANGE
+    )
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_lead_cache_solves_at_the_same_steps(seed):
+    """
+    Runs LeadCache with incremental rankings next to one that ranks every cache from the counts at every step.
+    """
+    incremental, full = _get_policy(), _get_policy()
+    full._cache_rankings = None
+    traces = np.random.default_rng(seed).zipf(1.3, size=(len(CONNECTIONS), 200)) % CATALOG_SIZE
+    for requests in traces.T.astype(float):
+        np.random.seed(incremental.time)
+        incremental.update(requests)
+        np.random.seed(full.time)
+        full.update(requests)
+        np.testing.assert_array_equal(incremental._rankings, full._rankings)
+        np.testing.assert_array_equal(incremental.configuration, full.configuration)
+    assert incremental.solve_count == full.solve_count
+    assert incremental.solve_count < 200
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from policies.expert_policies.expert_bank import ExpertBank
+from policies.ftpl_policy import FTPLPolicy
+
+CATALOG_SIZE: int = 50
+CACHE_SIZE: int = 5
+TRACE_LENGTH: int = 400
+DISCOUNT_RATES = [0, 0.5, 1, 1.5]
+
+
+def _get_trace() -> np.ndarray:
+    weights = 1 / np.arange(1, CATALOG_SIZE + 1)
+    return np.random.default_rng(0).choice(CATALOG_SIZE, size=TRACE_LENGTH, p=weights / weights.sum())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rows_match_independent_experts(seed):
+    """
+    The bank draws its perturbation matrix from the same random stream as FTPL experts created in the
+    order of their discount rates, so every row has to make the same choices as its expert.
+    """
+    np.random.seed(seed)
+    bank = ExpertBank(CACHE_SIZE, CATALOG_SIZE, TRACE_LENGTH, DISCOUNT_RATES)
+    np.random.seed(seed)
+    experts = [FTPLPolicy(CACHE_SIZE, CATALOG_SIZE, TRACE_LENGTH, rate) for rate in DISCOUNT_RATES]
+
+    misses = np.zeros(len(experts), dtype=np.int64)
+    for request in _get_trace().tolist():
+        misses += [not expert.is_present(request) for expert in experts]
+        bank.update(request)
+        for row, expert in enumerate(experts):
+            expert.update(request)
+            assert set(bank.caches[row].tolist()) == set(expert.cache), DISCOUNT_RATES[row]
+            np.testing.assert_allclose(bank.get_request_counts(row), expert.file_request_counts, rtol=1e-9)
+
+    np.testing.assert_array_equal(bank.losses, misses)
@@ -0,0 +1,127 @@
+import random
+from typing import Dict, List, Tuple
+
+import pytest
+
+from policies.frequency_buckets import FrequencyBuckets, TieBreak
+
+
+class _ReferenceBuckets:
+    """
+    Keeps the counts in a plain dict and finds the victims by scanning all items.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = dict()
+        self.added: Dict[int, int] = dict()
+        self.changed: Dict[int, int] = dict()
+        self.time = 0
+
+    def add(self, item: int, count: int) -> None:
+        self.counts[item] = count
+        self.added[item] = self.changed[item] = self._tick()
+
+    def increment(self, item: int) -> None:
+        self.counts[item] += 1
+        self.changed[item] = self._tick()
+
+    def remove(self, item: int) -> None:
+        del self.counts[item], self.added[item], self.changed[item]
+
+    def get_candidates(self) -> List[int]:
+        lowest = min(self.counts.values())
+        return [item for item, count in self.counts.items() if count == lowest]
+
+    def get_victim(self, tie_break: str) -> int:
+        order = self.added if tie_break == TieBreak.FIFO else self.changed
+        return min(self.get_candidates(), key=order.get)
+
+    def _tick(self) -> int:
+        self.time += 1
+        return self.time
+
+
+def _get_operations(seed: int, size: int = 2000, catalog: int = 30) -> List[Tuple[str, int, int]]:
+    rng = random.Random(seed)
+    operations, items = [], set()
+    for _ in range(size):
+        item = rng.randrange(catalog)
+        if item not in items:
+            operations.append(("add", item, rng.choice([0, 0, 1, 3])))
+            items.add(item)
+        elif rng.random() < 0.2:
+            operations.append(("remove", item, 0))
+            items.remove(item)
+        else:
+            operations.append(("increment", item, 0))
+    return operations
+
+
+def _apply(buckets, operation: Tuple[str, int, int]) -> None:
+    name, item, count = operation
+    if name == "add":
+        buckets.add(item, count)
+    elif name == "remove":
+        buckets.remove(item)
+    else:
+        buckets.increment(item)
+
+
+@pytest.mark.parametrize("tie_break", [TieBreak.FIFO, TieBreak.LRU])
+@pytest.mark.parametrize("seed", range(3))
+def test_victim_order(tie_break, seed):
+    buckets, reference = FrequencyBuckets(tie_break), _ReferenceBuckets()
+    for operation in _get_operations(seed):
+        _apply(buckets, operation)
+        _apply(reference, operation)
+        if len(reference.counts) > 0:
+            assert buckets.get_victim() == reference.get_victim(tie_break)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_victim_has_lowest_count(seed):
+    random.seed(seed)
+    buckets, reference = FrequencyBuckets(TieBreak.RANDOM), _ReferenceBuckets()
+    victims = set()
+    for operation in _get_operations(seed):
+        _apply(buckets, operation)
+        _apply(reference, operation)
+        if len(reference.counts) > 0:
+            victim = buckets.get_victim()
+            assert victim in reference.get_candidates()
+            victims.add(victim)
+    assert len(victims) > 1
+
+
+def test_random_victims_are_spread_over_ties():
+    random.seed(0)
+    buckets = FrequencyBuckets(TieBreak.RANDOM)
+    for item in range(4):
+        buckets.add(item)
+    buckets.increment(3)
+    draws = [buckets.get_victim() for _ in range(3000)]
+    assert set(draws) == {0, 1, 2}
+    assert min(draws.count(item) for item in range(3)) > 800
+
+
+@pytest.mark.parametrize("tie_break", [TieBreak.FIFO, TieBreak.LRU, TieBreak.RANDOM])
+@pytest.mark.parametrize("seed", range(3))
+def test_ordered_items_restore_victims(tie_break, seed):
+    operations = _get_operations(seed)
+    buckets = FrequencyBuckets(tie_break)
+    for operation in operations[:1000]:
+        _apply(buckets, operation)
+
+    rebuilt = FrequencyBuckets(tie_break)
+    for item, count in buckets.get_ordered_items():
+        rebuilt.add(item, count)
+    assert sorted(rebuilt.get_ordered_items()) == sorted(buckets.get_ordered_items())
+
+    for operation in operations[1000:]:
+        _apply(buckets, operation)
+        _apply(rebuilt, operation)
+        if len(buckets) > 0:
+            random.seed(seed)
+            victim = buckets.get_victim()
+            random.seed(seed)
+            assert rebuilt.get_victim() == victim
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from policies.ftpl_policy import FTPLPolicy, LOG_SCALE_LIMIT
+
+CATALOG_SIZE: int = 20
+TRACE_LENGTH: int = 12_000
+
+
+def _get_trace() -> np.ndarray:
+    weights = 1 / np.arange(1, CATALOG_SIZE + 1)
+    return np.random.default_rng(0).choice(CATALOG_SIZE, size=TRACE_LENGTH, p=weights / weights.sum())
+
+
+@pytest.mark.parametrize("discount_rate", [0, 0.5, 0.99])
+def test_log_scale_counts_match_eager_discounting(discount_rate):
+    """
+    Compares the discounted counts with the recurrence that discounts every count on every request.
+    """
+    if discount_rate > 0:
+        assert TRACE_LENGTH * -np.log(discount_rate) > 2 * LOG_SCALE_LIMIT
+    np.random.seed(0)
+    policy = FTPLPolicy(2, CATALOG_SIZE, TRACE_LENGTH, discount_rate)
+    counts = np.zeros(CATALOG_SIZE)
+    rescales = 0
+    for request in _get_trace().tolist():
+        log_scale = policy._log_scale
+        policy.update(request)
+        rescales += policy._log_scale > log_scale
+        if policy.time == 1:
+            counts[request] += 1.0
+        else:
+            counts *= discount_rate
+            counts[request] += policy.time - discount_rate * (policy.time - 1)
+        np.testing.assert_allclose(policy.file_request_counts, counts, rtol=1e-9, atol=1e-12 * counts.max())
+
+    if discount_rate > 0:
+        assert rescales >= 2
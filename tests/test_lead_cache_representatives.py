@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from policies.network_policies.lead_cache import LeadCache
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolver
+
+CONNECTIONS: List[List[int]] = [[0, 1], [1, 2], [2, 3], [0, 3], [1], [0, 2, 3]]
+CACHE_COUNT: int = 4
+CATALOG_SIZE: int = 120
+CACHE_SIZE: int = 3
+TIME_HORIZON: int = 80
+SEEDS = range(6)
+
+
+class _DenseLeadCache(LeadCache):
+    """
+    LeadCache that perturbs the counts of every item of the catalog, as in the original formulation.
+    """
+
+    def _get_perturbed_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        learning_rate = (self.incidence.client_count ** 3 / 4) * np.sqrt(
+            self.time / (self.cache_size * self.cache_count)
+        ) / (
+                2 * self.max_degree * (np.log(self.catalog_size / self.cache_size) + 1)
+        ) ** (1 / 4)
+        counts = np.zeros((self.incidence.client_count, self.catalog_size))
+        counts[:, self.request_counts.items] = self.request_counts.counts
+        return np.arange(self.catalog_size), counts + np.random.normal(0, learning_rate, counts.shape)
+
+
+def _run(policy_type: type, seed: int) -> Tuple[float, float, float]:
+    """
+    :return: Reward per step, share of the cached items that were never requested and their mean item
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, CATALOG_SIZE + 1) ** 1.2
+    traces = rng.permutation(CATALOG_SIZE)[
+        rng.choice(CATALOG_SIZE, size=(len(CONNECTIONS), TIME_HORIZON), p=weights / weights.sum())
+    ]
+    np.random.seed(seed)
+    policy = policy_type(CACHE_COUNT, CONNECTIONS, CATALOG_SIZE, 3, CACHE_SIZE, LeadCacheSolver.LINEAR_PROGRAM)
+    unrequested_shares, unrequested_items = [], []
+    for requests in traces.T.astype(float):
+        policy.update(requests)
+        cached = np.flatnonzero(policy.configuration[:, :CATALOG_SIZE].any(axis=0))
+        unrequested = cached[~np.isin(cached, policy.request_counts.items)]
+        unrequested_shares.append(unrequested.size / cached.size)
+        unrequested_items.extend(unrequested.tolist())
+    return policy.reward / TIME_HORIZON, float(np.mean(unrequested_shares)), float(np.mean(unrequested_items))
+
+
+def test_representatives_match_dense_perturbation():
+    """
+    Compares the representatives with the dense perturbation over several seeds. The rewards and the share of
+    cache slots spent on never requested items have to agree, and the never requested items that get cached
+    have to be spread over the catalog instead of being the lowest ones.
+    """
+    dense = np.mean([_run(_DenseLeadCache, seed) for seed in SEEDS], axis=0)
+    representatives = np.mean([_run(LeadCache, seed) for seed in SEEDS], axis=0)
+    assert abs(representatives[0] - dense[0]) < 0.1
+    assert abs(representatives[1] - dense[1]) < 0.08
+    assert abs(representatives[2] - (CATALOG_SIZE - 1) / 2) < 0.1 * CATALOG_SIZE
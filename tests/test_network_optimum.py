@@ -0,0 +1,96 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolverParams, LeadCacheSolver, \
+    get_opt_lead_cache
+from simulation.simulation_runner import _get_optimal_network_statistics
+
+CATALOG_SIZE: int = 15
+CACHE_SIZE: int = 3
+TIME_HORIZON: int = 120
+
+"""
+Cache 4 has no clients, so the cache count is larger than the number of connected caches.
+"""
+OVERLAPPING: List[List[int]] = [[0, 1], [1, 2], [2, 3], [0, 3], [1], [0, 2, 3]]
+DISJOINT: List[List[int]] = [[0], [1], [1], [2], [3], [0]]
+CACHE_COUNT: int = 5
+
+
+def _get_traces(client_count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, CATALOG_SIZE + 1) ** 0.9
+    traces = np.array([
+        rng.permutation(CATALOG_SIZE)[rng.choice(CATALOG_SIZE, size=TIME_HORIZON, p=weights / weights.sum())]
+        for _ in range(client_count)
+    ])
+    return traces.astype(float)
+
+
+def _get_recomputed_rewards(traces: np.ndarray, incidence: ClientCacheIncidence) -> np.ndarray:
+    """
+    Recomputes the top-k count sum of every cache from all requests its clients made so far.
+    """
+    rewards = np.zeros(TIME_HORIZON)
+    for time in range(TIME_HORIZON):
+        for cache in range(incidence.cache_count):
+            requests = traces[incidence.get_clients(cache), :time + 1].astype(np.int64).ravel()
+            counts = np.bincount(requests, minlength=CATALOG_SIZE)
+            rewards[time] += np.sort(counts)[::-1][:CACHE_SIZE].sum()
+        rewards[time] /= time + 1
+    return rewards
+
+
+def _get_lead_cache_reward(traces: np.ndarray, incidence: ClientCacheIncidence) -> float:
+    """
+    Gets the number of requests the best static configuration serves, as found by the LeadCache solver for the
+    request counts of the whole horizon.
+    """
+    theta = np.array([np.bincount(trace.astype(np.int64), minlength=CATALOG_SIZE) for trace in traces], dtype=float)
+    params = LeadCacheSolverParams(
+        theta=theta,
+        incidence=incidence,
+        cache_size=CACHE_SIZE,
+        catalog_size=CATALOG_SIZE,
+        cache_count=incidence.cache_count,
+        solver=LeadCacheSolver.LINEAR_PROGRAM
+    )
+    configuration = get_opt_lead_cache(params)
+    assert np.all(configuration.sum(axis=1) <= CACHE_SIZE)
+    return float(np.sum(theta * np.minimum(1, incidence.get_coverage(configuration))))
+
+
+@pytest.mark.parametrize("connections", [OVERLAPPING, DISJOINT])
+@pytest.mark.parametrize("seed", range(3))
+def test_rewards_match_recomputed_optimum(connections, seed):
+    incidence = ClientCacheIncidence.from_connections(connections, CACHE_COUNT)
+    traces = _get_traces(len(connections), seed)
+    statistics = _get_optimal_network_statistics(traces, incidence, CACHE_SIZE)
+    np.testing.assert_allclose(statistics.rewards, _get_recomputed_rewards(traces, incidence))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_disjoint_reward_matches_lead_cache_optimum(seed):
+    """
+    With one cache per client no request can be served twice, so the per-cache optima are the optimum of the
+    LeadCache objective.
+    """
+    incidence = ClientCacheIncidence.from_connections(DISJOINT, CACHE_COUNT)
+    traces = _get_traces(len(DISJOINT), seed)
+    statistics = _get_optimal_network_statistics(traces, incidence, CACHE_SIZE)
+    assert statistics.rewards[-1] * TIME_HORIZON == pytest.approx(_get_lead_cache_reward(traces, incidence))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_overlapping_reward_bounds_lead_cache_optimum(seed):
+    """
+    With overlapping caches every cache counts the hits of its own clients, so a request that several caches
+    hold is counted once per cache and the reward is at least the LeadCache optimum.
+    """
+    incidence = ClientCacheIncidence.from_connections(OVERLAPPING, CACHE_COUNT)
+    traces = _get_traces(len(OVERLAPPING), seed)
+    statistics = _get_optimal_network_statistics(traces, incidence, CACHE_SIZE)
+    assert statistics.rewards[-1] * TIME_HORIZON >= _get_lead_cache_reward(traces, incidence) - 1e-6
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from simulation.optimal_static_tracker import OptimalStaticTracker
+
+
+def _get_top_count_sums(trace: np.ndarray, cache_size: int) -> np.ndarray:
+    """
+    :return: Sum of the cache_size largest request counts after every request, from the sorted counts
+    """
+    sums = np.zeros(trace.size, dtype=np.int64)
+    for time in range(trace.size):
+        _, counts = np.unique(trace[:time + 1], return_counts=True)
+        sums[time] = np.sort(counts)[::-1][:cache_size].sum()
+    return sums
+
+
+def _get_expected_hits(trace: np.ndarray, cache_size: int) -> np.ndarray:
+    return np.diff(_get_top_count_sums(trace, cache_size), prepend=0) == 1
+
+
+TRACES = {
+    "zipf": np.random.default_rng(0).zipf(1.3, size=600) % 40,
+    "uniform": np.random.default_rng(1).integers(0, 15, size=600),
+    "ties": np.tile(np.arange(8), 50),
+    "single item": np.zeros(100, dtype=np.int64)
+}
+
+
+@pytest.mark.parametrize("trace_name", TRACES)
+@pytest.mark.parametrize("cache_size", [1, 3, 8, 50])
+def test_update_matches_top_count_sum(trace_name: str, cache_size: int):
+    trace = TRACES[trace_name]
+    tracker = OptimalStaticTracker(cache_size)
+
+    hits = np.array([tracker.update(request) for request in trace])
+
+    np.testing.assert_array_equal(hits, _get_expected_hits(trace, cache_size))
+    assert tracker.get_hits() == _get_top_count_sums(trace, cache_size)[-1]
+
+
+@pytest.mark.parametrize("trace_name", TRACES)
+@pytest.mark.parametrize("cache_size", [1, 3, 8, 50])
+@pytest.mark.parametrize("block_size", [1, 7, 600])
+def test_run_trace_matches_top_count_sum(trace_name: str, cache_size: int, block_size: int):
+    trace = TRACES[trace_name]
+    tracker = OptimalStaticTracker(cache_size)
+
+    hits = np.concatenate([
+        tracker.run_trace(trace[start:start + block_size]) for start in range(0, trace.size, block_size)
+    ])
+
+    np.testing.assert_array_equal(hits, _get_expected_hits(trace, cache_size))
+    assert tracker.get_hits() == _get_top_count_sums(trace, cache_size)[-1]
+
+
+@pytest.mark.parametrize("trace_name", TRACES)
+@pytest.mark.parametrize("cache_size", [1, 3, 50])
+def test_mixed_update_and_run_trace_match_top_count_sum(trace_name: str, cache_size: int):
+    trace = TRACES[trace_name]
+    tracker = OptimalStaticTracker(cache_size)
+    hits = []
+    rng = np.random.default_rng(2)
+    start = 0
+    while start < trace.size:
+        size = int(rng.integers(1, 30))
+        if rng.uniform() < 0.5:
+            hits.extend(tracker.update(request) for request in trace[start:start + size])
+        else:
+            hits.extend(tracker.run_trace(trace[start:start + size]))
+        start += size
+
+    np.testing.assert_array_equal(np.array(hits), _get_expected_hits(trace, cache_size))
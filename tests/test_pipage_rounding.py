@@ -0,0 +1,91 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from policies.network_policies.client_cache_incidence import ClientCacheIncidence
+from policies.network_policies.solvers.lead_cache_solver import LeadCacheSolverParams, LeadCacheSolver, \
+    pipage_round, get_fractional_lead_cache
+
+CONNECTIONS: List[List[int]] = [[0, 1], [1, 2], [2, 3], [0, 3], [1], [0, 2, 3]]
+CACHE_COUNT: int = 4
+CATALOG_SIZE: int = 12
+CACHE_SIZE: int = 3
+
+
+def _round_with_full_objective(configuration: np.ndarray, params: LeadCacheSolverParams) -> np.ndarray:
+    """
+    Pipage rounding as it was before it was vectorized: every cache in turn moves mass between its first two
+    fractional files, in the direction of the larger objective computed over all clients and files.
+    """
+    configuration = np.copy(configuration)
+
+    def is_integral(cache: int, file: int) -> bool:
+        was_integral = abs(round(configuration[cache][file]) - configuration[cache][file]) < 0.0001
+        if was_integral:
+            configuration[cache][file] = round(configuration[cache][file])
+        return was_integral
+
+    def round_objective(y: np.ndarray) -> float:
+        total = 0
+        for client, theta in enumerate(np.maximum(params.theta, 0)):
+            for file, theta_file in enumerate(theta):
+                product = 1
+                for cache in params.incidence.get_caches(client):
+                    product *= 1 - y[cache][file]
+                total += theta_file * (1 - product)
+        return total
+
+    while not all(is_integral(c, f) for c in range(configuration.shape[0]) for f in range(configuration.shape[1])):
+        for cache in range(configuration.shape[0]):
+            fractionals = []
+            for file in range(configuration.shape[1]):
+                if not is_integral(cache, file):
+                    fractionals.append(file)
+                if len(fractionals) == 2:
+                    y_1, y_2 = configuration[cache][fractionals[0]], configuration[cache][fractionals[1]]
+                    e_1, e_2 = min(y_1, 1 - y_2), min(1 - y_1, y_2)
+                    a, b = np.copy(configuration), np.copy(configuration)
+                    a[cache][fractionals] = [y_1 - e_1, y_2 + e_1]
+                    b[cache][fractionals] = [y_1 + e_2, y_2 - e_2]
+                    configuration = max([a, b], key=round_objective)
+                    break
+            if len(fractionals) == 1:
+                configuration[cache] = np.around(configuration[cache])
+    return configuration
+
+
+def _get_params(rng: np.random.Generator) -> LeadCacheSolverParams:
+    return LeadCacheSolverParams(
+        theta=rng.normal(size=(len(CONNECTIONS), CATALOG_SIZE)),
+        incidence=ClientCacheIncidence.from_connections(CONNECTIONS, CACHE_COUNT),
+        cache_size=CACHE_SIZE,
+        catalog_size=CATALOG_SIZE,
+        cache_count=CACHE_COUNT,
+        solver=LeadCacheSolver.LINEAR_PROGRAM
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pipage_round_matches_full_objective_rounding(seed: int):
+    rng = np.random.default_rng(seed)
+    params = _get_params(rng)
+    configuration = rng.uniform(size=(CACHE_COUNT, CATALOG_SIZE))
+    configuration[rng.uniform(size=configuration.shape) < 0.3] = 0
+    configuration[rng.uniform(size=configuration.shape) < 0.1] = 1
+
+    rounded = pipage_round(configuration, params)
+
+    np.testing.assert_array_equal(rounded, _round_with_full_objective(configuration, params))
+    assert np.all((rounded == 0) | (rounded == 1))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pipage_round_of_relaxation_matches_full_objective_rounding(seed: int):
+    params = _get_params(np.random.default_rng(seed))
+    configuration = get_fractional_lead_cache(params)
+
+    rounded = pipage_round(configuration, params)
+
+    np.testing.assert_array_equal(rounded, _round_with_full_objective(configuration, params))
+    assert np.all(rounded.sum(axis=1) <= CACHE_SIZE)
@@ -0,0 +1,78 @@
+import random
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from policies.ftpl_policy import FTPLPolicy
+from policies.frequency_buckets import TieBreak
+from policies.lfu_policy import LFUPolicy
+from policies.lru_policy import LRUPolicy
+from policies.policy import Policy
+
+CATALOG_SIZE: int = 200
+CACHE_SIZE: int = 20
+TRACE_LENGTH: int = 5_000
+
+POLICIES = {
+    "LRU": lambda: LRUPolicy(CACHE_SIZE),
+    "LFU": lambda: LFUPolicy(CACHE_SIZE),
+    "LFU, lru ties": lambda: LFUPolicy(CACHE_SIZE, TieBreak.LRU),
+    "LFU, random ties": lambda: LFUPolicy(CACHE_SIZE, TieBreak.RANDOM),
+    "Perfect LFU": lambda: LFUPolicy(CACHE_SIZE, perfect=True),
+    "FTPL": lambda: FTPLPolicy(CACHE_SIZE, CATALOG_SIZE, TRACE_LENGTH),
+    "FTPL, d=0.99": lambda: FTPLPolicy(CACHE_SIZE, CATALOG_SIZE, TRACE_LENGTH, 0.99),
+    "FTPL, fresh noise": lambda: FTPLPolicy(CACHE_SIZE, CATALOG_SIZE, TRACE_LENGTH, fresh_noise=True)
+}
+
+
+def _get_trace() -> np.ndarray:
+    weights = 1 / np.arange(1, CATALOG_SIZE + 1) ** 0.8
+    return np.random.default_rng(0).choice(CATALOG_SIZE, size=TRACE_LENGTH, p=weights / weights.sum())
+
+
+def _get_policy(get_policy: Callable[[], Policy]) -> Policy:
+    random.seed(0)
+    np.random.seed(0)
+    return get_policy()
+
+
+@pytest.mark.parametrize("name", POLICIES)
+@pytest.mark.parametrize("block_size", [1, 97, TRACE_LENGTH])
+def test_run_trace_matches_per_request_protocol(name: str, block_size: int):
+    trace = _get_trace()
+
+    expected_policy = _get_policy(POLICIES[name])
+    expected_hits = np.zeros(trace.size, dtype=bool)
+    for index, request in enumerate(trace):
+        expected_hits[index] = expected_policy.is_present(request)
+        expected_policy.update(request)
+
+    policy = _get_policy(POLICIES[name])
+    hits = np.concatenate([
+        policy.run_trace(trace[start:start + block_size])
+        for start in range(0, trace.size, block_size)
+    ])
+
+    np.testing.assert_array_equal(hits, expected_hits)
+    assert set(policy.cache) == set(expected_policy.cache)
+    assert policy.time == expected_policy.time
+
+
+@pytest.mark.parametrize("name", ["LRU", "LFU", "LFU, lru ties", "Perfect LFU", "FTPL"])
+def test_run_trace_continues_like_per_request_protocol(name: str):
+    trace = _get_trace()
+    half = trace.size // 2
+
+    expected_policy = _get_policy(POLICIES[name])
+    policy = _get_policy(POLICIES[name])
+    policy.run_trace(trace[:half])
+    for request in trace[:half]:
+        expected_policy.is_present(request)
+        expected_policy.update(request)
+
+    for request in trace[half:]:
+        assert policy.is_present(request) == expected_policy.is_present(request)
+        policy.update(request)
+        expected_policy.update(request)
+    assert set(policy.cache) == set(expected_policy.cache)
@@ -0,0 +1,88 @@
+import os
+from typing import List
+
+import numpy as np
+import pytest
+
+from simulation.statistics_collector import StatisticsCollector, SamplingParameters, Sampling, SPILL_FILE_SUFFIX
+
+TIME_HORIZON: int = 1_000
+
+
+def _get_sample_times(parameters: SamplingParameters) -> np.ndarray:
+    if parameters.sampling == Sampling.LOG:
+        return np.unique(np.round(np.geomspace(1, TIME_HORIZON, parameters.points)).astype(np.int64))
+    times = np.arange(parameters.interval, TIME_HORIZON + 1, parameters.interval)
+    return times if times[-1] == TIME_HORIZON else np.append(times, TIME_HORIZON)
+
+
+def _get_blocks(seed: int) -> List[int]:
+    """
+    :return: Block sizes that add up to the time horizon, including empty and single request blocks
+    """
+    rng = np.random.default_rng(seed)
+    cuts = np.sort(np.concatenate([rng.integers(0, TIME_HORIZON + 1, size=12), [0, 1, 1, 500, TIME_HORIZON]]))
+    return np.diff(np.concatenate([[0], cuts, [TIME_HORIZON]])).tolist()
+
+
+PARAMETERS = {
+    "every request": SamplingParameters(Sampling.EVERY, interval=1, window=1),
+    "every 7": SamplingParameters(Sampling.EVERY, interval=7, window=50),
+    "every 250": SamplingParameters(Sampling.EVERY, interval=250),
+    "log": SamplingParameters(Sampling.LOG, points=40, window=64),
+    "log, wide window": SamplingParameters(Sampling.LOG, points=200, window=TIME_HORIZON + 10)
+}
+
+
+@pytest.mark.parametrize("name", PARAMETERS)
+@pytest.mark.parametrize("seed", range(3))
+def test_blocks_match_full_arrays(name, seed):
+    parameters = PARAMETERS[name]
+    rng = np.random.default_rng(seed)
+    hits = rng.random(TIME_HORIZON) < 0.4
+    optimal_hits = hits | (rng.random(TIME_HORIZON) < 0.3)
+
+    collector = StatisticsCollector(TIME_HORIZON, parameters)
+    start = 0
+    for size in _get_blocks(seed):
+        collector.add(hits[start:start + size], optimal_hits[start:start + size])
+        start += size
+    statistics = collector.get_statistics("policy")
+
+    times = _get_sample_times(parameters)
+    cumulative = np.cumsum(hits)
+    padded = np.concatenate([np.zeros(max(parameters.window, 1), dtype=np.int64), cumulative])
+    np.testing.assert_array_equal(statistics.times, times)
+    np.testing.assert_allclose(statistics.hit_ratios, cumulative[times - 1] / times, rtol=1e-6)
+    np.testing.assert_allclose(statistics.regret, (np.cumsum(optimal_hits) - cumulative)[times - 1] / times, atol=1e-6)
+    assert statistics.hit_ratio == cumulative[-1] / TIME_HORIZON
+    if parameters.window > 0:
+        window = parameters.window
+        offset = padded.size - cumulative.size
+        expected = (padded[offset + times - 1] - padded[offset + times - 1 - window]) / np.minimum(times, window)
+        np.testing.assert_allclose(statistics.windowed_hit_ratios, expected, rtol=1e-6)
+    else:
+        assert statistics.windowed_hit_ratios is None
+
+
+def test_spilled_series_use_one_file_that_can_be_removed(tmp_path):
+    spill_directory = str(tmp_path / "spill")
+    parameters = SamplingParameters(Sampling.EVERY, interval=3, window=10, spill_directory=spill_directory)
+    in_memory = SamplingParameters(Sampling.EVERY, interval=3, window=10)
+    hits = np.random.default_rng(0).random(TIME_HORIZON) < 0.5
+
+    collectors = [StatisticsCollector(TIME_HORIZON, parameters, "spilled"), StatisticsCollector(TIME_HORIZON, in_memory)]
+    for collector in collectors:
+        for start in range(0, TIME_HORIZON, 128):
+            collector.add(hits[start:start + 128], hits[start:start + 128])
+    spilled, expected = [collector.get_statistics("policy") for collector in collectors]
+
+    np.testing.assert_array_equal(spilled.times, expected.times)
+    np.testing.assert_array_equal(spilled.hit_ratios, expected.hit_ratios)
+    np.testing.assert_array_equal(spilled.windowed_hit_ratios, expected.windowed_hit_ratios)
+    files = os.listdir(spill_directory)
+    assert len(files) == 1 and files[0].startswith("spilled_") and files[0].endswith(SPILL_FILE_SUFFIX)
+
+    open(os.path.join(spill_directory, "other.dat"), "w").close()
+    parameters.remove_spill_files()
+    assert os.listdir(spill_directory) == ["other.dat"]
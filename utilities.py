@@ -1,8 +1,9 @@
-from typing import List
+from typing import List, Union
 
 from matplotlib import pyplot as plt
 
-from simulation.simulation_statistics import SimulationStatistics, BiPartiteSimulationStatistics
+from simulation.simulation_statistics import SimulationStatistics, BiPartiteSimulationStatistics, \
+    HitMaskSimulationStatistics, SampledSimulationStatistics
 
 
 def get_hit_ratio(hits, misses) -> float:
@@ -12,11 +13,14 @@ def get_hit_ratio(hits, misses) -> float:
     return 0 if total == 0 else hits / total
 
 
-def display_single_level_statistics(statistics: List[SimulationStatistics], print_results: bool = True) -> None:
+def display_single_level_statistics(
+        statistics: List[Union[SimulationStatistics, HitMaskSimulationStatistics, SampledSimulationStatistics]],
+        print_results: bool = True
+) -> None:
     for statistic in statistics:
         if print_results:
             print(f'{statistic.policy} hit rate: {round(statistic.hit_ratio * 100, 2)}%')
-        plt.plot(statistic.regret, label=statistic.policy)
+        plt.plot(statistic.times, statistic.regret, label=statistic.policy)
 
     plt.ylabel(r"$\frac{R_{T}}{T}$", rotation=0, labelpad=15, fontsize=20)
     plt.xlabel(r"$T$", fontsize=15)
@@ -27,7 +31,7 @@ def display_single_level_statistics(statistics: List[SimulationStatistics], prin
     plt.figure()
     best_hit_ratio = 0
     for statistic in statistics:
-        plt.plot(statistic.hit_ratios, label=statistic.policy)
+        plt.plot(statistic.times, statistic.hit_ratios, label=statistic.policy)
         best_hit_ratio = max([best_hit_ratio, statistic.hit_ratio])
 
     plt.ylabel(r"Hit ratio")
@@ -39,7 +43,7 @@ def display_single_level_statistics(statistics: List[SimulationStatistics], prin
 
 def display_multi_level_statistics(statistics: List[BiPartiteSimulationStatistics]) -> None:
     for statistic in statistics:
-        plt.plot(statistic.rewards, label=statistic.policy)
+        plt.plot(statistic.times, statistic.rewards, label=statistic.policy)
 
     plt.ylabel(r"$\frac{q_{T}}{T}$", rotation=0, labelpad=15, fontsize=20)
     plt.xlabel(r"$T$", fontsize=15)
@@ -47,3 +51,13 @@ def display_multi_level_statistics(statistics: List[BiPartiteSimulationStatistic
     plt.ylim([0, max(statistics, key=lambda s: s.rewards[-1]).rewards[-1] * 1.5])
     plt.show()
 
+
+def display_solve_trade_off(statistics: List[BiPartiteSimulationStatistics]) -> None:
+    """
+    Prints the final reward, the run time and the number of solves of every policy, to compare the cost and
+    the reward of re-solve schedules.
+    """
+    for statistic in statistics:
+        solves = "" if statistic.solve_count is None else f', {statistic.solve_count} solves'
+        print(f'{statistic.policy} reward: {round(statistic.rewards[-1], 3)}, '
+              f'{round(statistic.run_time, 2)}s{solves}')